@@ -48,6 +48,47 @@ document.addEventListener('DOMContentLoaded', () => {
     initializeEventListeners();
 });
 
+// Snapshots published longer ago than this are ignored. published_at only moves when a
+// snapshot changed, which is daily while matches are played, so this allows quiet days too
+const SNAPSHOT_MAX_AGE_MS = 7 * 24 * 60 * 60 * 1000;
+let snapshotsFreshPromise = null;
+
+// True if data/manifest.json says the snapshots were published recently enough
+function snapshotsFresh() {
+    if (!snapshotsFreshPromise) {
+        snapshotsFreshPromise = fetch('/data/manifest.json', { cache: 'no-cache' })
+            .then(response => response.ok ? response.json() : null)
+            .then(manifest => {
+                const publishedAt = manifest && Date.parse(manifest.published_at);
+                if (!publishedAt || Date.now() - publishedAt > SNAPSHOT_MAX_AGE_MS) {
+                    console.warn('Snapshots are stale or missing, querying Supabase instead');
+                    return false;
+                }
+                return true;
+            })
+            .catch(() => false);
+    }
+    return snapshotsFreshPromise;
+}
+
+// Load a precomputed read model published by the data pipeline (data/<name>.json)
+// Returns null when it is not available or stale, so callers can fall back to Supabase queries
+async function loadSnapshot(name) {
+    if (!(await snapshotsFresh())) {
+        return null;
+    }
+    try {
+        const response = await fetch(`/data/${name}.json`);
+        if (!response.ok) {
+            return null;
+        }
+        return await response.json();
+    } catch (err) {
+        console.warn(`Snapshot ${name} not available, querying Supabase instead:`, err);
+        return null;
+    }
+}
+
 // Load current user's team
 // Load current user's team
 async function loadUserTeam() {
@@ -237,6 +278,13 @@ async function loadLeaderboard() {
     container.innerHTML = '<p style="color: var(--color-text-secondary); padding: 1rem;">Loading...</p>';
     
     try {
+        // Precomputed leaderboard first
+        const snapshot = await loadSnapshot('leaderboard');
+        if (snapshot) {
+            renderLeaderboard(container, snapshot.teams);
+            return;
+        }
+        
         // Query teams with user information
         const { data, error } = await supabaseClient
             .from('teams')
@@ -255,35 +303,36 @@ async function loadLeaderboard() {
         
         console.log('Leaderboard data:', data);
         
-        // Check if data is empty
-        if (!data || data.length === 0) {
-            container.innerHTML = '<p style="color: var(--color-text-secondary); padding: 1rem;">No teams found</p>';
-            return;
-        }
-        
-        // Clear container
-        container.innerHTML = '';
-        
-        // Render each team
-        data.forEach((team, index) => {
-            const teamData = {
-                id: team.id,
-                name: team.name || 'Unknown User',
-                points: team.current_points || 0,
-                change: 0
-            };
-            
-            const row = createLeaderboardRow(teamData, index + 1);
-            // Remove this line: row.style.animationDelay = `${index * 0.05}s`;
-            container.appendChild(row);
-        });
-        
+        renderLeaderboard(container, (data || []).map(team => ({
+            id: team.id,
+            name: team.name || 'Unknown User',
+            points: team.current_points || 0,
+            change: 0
+        })));
+    
     } catch (err) {
         console.error('Unexpected error loading leaderboard:', err);
         container.innerHTML = '<p style="color: var(--color-danger); padding: 1rem;">Error loading leaderboard</p>';
     }
 }
 
+function renderLeaderboard(container, teams) {
+    // Check if data is empty
+    if (!teams || teams.length === 0) {
+        container.innerHTML = '<p style="color: var(--color-text-secondary); padding: 1rem;">No teams found</p>';
+        return;
+    }
+    
+    // Clear container
+    container.innerHTML = '';
+    
+    // Render each team
+    teams.forEach((team, index) => {
+        const row = createLeaderboardRow(team, index + 1);
+        container.appendChild(row);
+    });
+}
+
 function createLeaderboardRow(team, rank) {
     const row = document.createElement('div');
     row.className = 'table-row';
@@ -291,6 +340,13 @@ function createLeaderboardRow(team, rank) {
     const changeIcon = team.change > 0 ? '▲' : team.change < 0 ? '▼' : '—';
     const changeClass = team.change > 0 ? 'positive' : team.change < 0 ? 'negative' : 'neutral';
     
+    // Movement per window from the published leaderboard, e.g. "run: +1 places, +120 pts"
+    const changeTitle = team.movement
+        ? Object.entries(team.movement)
+            .map(([window, move]) => `${window}: ${move.rank >= 0 ? '+' : ''}${move.rank} places, ${move.points >= 0 ? '+' : ''}${move.points} pts`)
+            .join('\n')
+        : '';
+    
     row.innerHTML = `
         <div class="col-rank">
             <div class="rank-badge ${rank <= 3 ? 'top-3' : ''}">${rank}</div>
@@ -302,7 +358,7 @@ function createLeaderboardRow(team, rank) {
             <div class="points">${team.points}</div>
         </div>
         <div class="col-change">
-            <div class="change ${changeClass}">
+            <div class="change ${changeClass}" title="${changeTitle}">
                 ${changeIcon} ${Math.abs(team.change)}
             </div>
         </div>
@@ -313,6 +369,14 @@ function createLeaderboardRow(team, rank) {
 
 // Matches
 async function loadMatches() {
+    // Precomputed matches are already tagged with the owning teams
+    const snapshot = await loadSnapshot('matches');
+    if (snapshot) {
+        renderMatches(document.getElementById('upcomingMatches'), snapshot.upcoming, false);
+        renderMatches(document.getElementById('recentMatches'), snapshot.recent, true);
+        return;
+    }
+    
     // Load player-team mappings first
     await loadPlayerTeamMappings();
     
@@ -384,7 +448,7 @@ async function loadUpcomingMatches() {
         console.log('Upcoming matches:', data);
         console.log('Points reference map:', pointsMap);
         
-        const filtered = filterMatchesByTeam(data.map(match => {
+        const matches = data.map(match => {
             const player1Team = playerTeamMap[match.player1_id];
             const player2Team = playerTeamMap[match.player2_id];
             
@@ -412,21 +476,10 @@ async function loadUpcomingMatches() {
                 round: match.round_name || 'TBD',
                 pointsAtStake: pointsAtStake
             };
-        }));
-        
-        container.innerHTML = '';
-        
-        if (filtered.length === 0) {
-            container.innerHTML = '<p style="color: var(--color-text-secondary); padding: 1rem;">No upcoming matches</p>';
-            return;
-        }
-        
-        filtered.forEach((match, index) => {
-            const card = createMatchCard(match, false);
-            card.style.animationDelay = `${index * 0.05}s`;
-            container.appendChild(card);
         });
         
+        renderMatches(container, matches, false);
+    
     } catch (err) {
         console.error('Unexpected error loading upcoming matches:', err);
         container.innerHTML = '<p style="color: var(--color-danger); padding: 1rem;">Error loading matches</p>';
@@ -493,7 +546,7 @@ async function loadRecentMatches() {
         console.log('Recent matches:', data);
         console.log('Match points:', pointsMap);
         
-        const filtered = filterMatchesByTeam(data.map(match => {
+        const matches = data.map(match => {
             const player1Team = playerTeamMap[match.player1_id];
             const player2Team = playerTeamMap[match.player2_id];
             
@@ -530,26 +583,33 @@ async function loadRecentMatches() {
                 winner: match.winner_code === 1 ? 'home' : 'away',
                 statusDescription: match.status_description
             };
-        }));
-        
-        container.innerHTML = '';
-        
-        if (filtered.length === 0) {
-            container.innerHTML = '<p style="color: var(--color-text-secondary); padding: 1rem;">No recent matches</p>';
-            return;
-        }
-        
-        filtered.forEach((match, index) => {
-            const card = createMatchCard(match, true);
-            card.style.animationDelay = `${index * 0.05}s`;
-            container.appendChild(card);
         });
         
+        renderMatches(container, matches, true);
+    
     } catch (err) {
         console.error('Unexpected error loading recent matches:', err);
         container.innerHTML = '<p style="color: var(--color-danger); padding: 1rem;">Error loading matches</p>';
     }
 }
+
+// Render match cards, applying the current team filter
+function renderMatches(container, matches, isComplete) {
+    const filtered = filterMatchesByTeam(matches || []);
+    
+    container.innerHTML = '';
+    
+    if (filtered.length === 0) {
+        container.innerHTML = `<p style="color: var(--color-text-secondary); padding: 1rem;">No ${isComplete ? 'recent' : 'upcoming'} matches</p>`;
+        return;
+    }
+    
+    filtered.forEach((match, index) => {
+        const card = createMatchCard(match, isComplete);
+        card.style.animationDelay = `${index * 0.05}s`;
+        container.appendChild(card);
+    });
+}
 // Helper function to format tennis set scores
 function formatTennisSetScores(match, playerPrefix) {
     const sets = [];
@@ -728,6 +788,15 @@ async function loadPlayers() {
     container.innerHTML = '<p style="color: var(--color-text-secondary); padding: 1rem;">Loading...</p>';
     
     try {
+        // Precomputed player list with team assignments, points and match counts
+        const snapshot = await loadSnapshot('players');
+        if (snapshot) {
+            setTeamOptions(snapshot.teams);
+            allPlayers = snapshot.players;
+            renderFilteredPlayers();
+            return;
+        }
+        
         // Fetch players first
         const { data: players, error: playersError } = await supabaseClient
             .from('players')
@@ -748,16 +817,7 @@ async function loadPlayers() {
         if (teamsError) {
             console.error('Error loading teams:', teamsError);
         } else {
-            allTeams = teams || [];
-            populateTeamDropdown();
-            
-            // Set dropdown to user's team if available
-            if (currentUserTeam && currentUserTeam.id) {
-                const dropdown = document.getElementById('teamDropdown');
-                if (dropdown) {
-                    dropdown.value = currentUserTeam.id;
-                }
-            }
+            setTeamOptions(teams);
         }
         
         // Fetch team assignments separately
@@ -899,6 +959,19 @@ function filterPlayers(searchTerm) {
     });
 }
 
+function setTeamOptions(teams) {
+    allTeams = teams || [];
+    populateTeamDropdown();
+    
+    // Set dropdown to user's team if available
+    if (currentUserTeam && currentUserTeam.id) {
+        const dropdown = document.getElementById('teamDropdown');
+        if (dropdown) {
+            dropdown.value = currentUserTeam.id;
+        }
+    }
+}
+
 function populateTeamDropdown() {
     const dropdown = document.getElementById('teamDropdown');
     dropdown.innerHTML = '<option value="">Select a team...</option>';
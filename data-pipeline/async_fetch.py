@@ -0,0 +1,302 @@
+"""
+Concurrent RapidAPI fetching over a single pooled keep-alive HTTP client
+
+anyio and httpx are imported when a fetch starts, not at import time.
+Responses still fresh in the response cache (response_cache.py) are not requested.
+
+All fetches of a process share one rate limit and one in-flight limit
+(shared_limits), so stages fetching at the same time from different threads
+stay within the plan together rather than each on its own.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+from clients import get_rapidapi_key
+from metrics import get_metrics
+from response_cache import get_response_cache
+
+API_HOST = "tennisapi1.p.rapidapi.com"
+
+# Defaults for the RapidAPI plan, overridable with RAPIDAPI_CONCURRENCY
+# (max requests in flight) and RAPIDAPI_RATE_LIMIT (requests per second)
+DEFAULT_CONCURRENCY = 5
+DEFAULT_RATE_LIMIT = 5.0
+REQUEST_TIMEOUT = 30.0
+
+# Returned instead of None for a 404 when the caller treats missing data as an answer
+NOT_FOUND = 'not_found'
+
+def events_endpoint(date_str):
+    """
+    Build the events endpoint for a date
+
+    Args:
+        date_str: Format 'YYYY-MM-DD'
+
+    Returns:
+        Endpoint path in the API's D/M/YYYY format
+    """
+    date_obj = datetime.strptime(date_str, '%Y-%m-%d')
+    return f"/api/tennis/events/{date_obj.day}/{date_obj.month}/{date_obj.year}"
+
+def rankings_endpoint(ranking_type):
+    """Build the rankings endpoint for 'atp' or 'wta'"""
+    return f"/api/tennis/rankings/{ranking_type}"
+
+def statistics_endpoint(match_id):
+    """Build the per-match statistics endpoint"""
+    return f"/api/tennis/event/{match_id}/statistics"
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter, safe to share between event loops in different threads
+
+    Tokens refill continuously at `rate` per second up to `capacity`;
+    each request takes one token and waits while the bucket is empty.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token, returning the seconds to wait before it may be used"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            # The balance may go negative: later callers queue behind earlier reservations
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+    async def acquire(self):
+        import anyio
+        wait = self.reserve()
+        if wait > 0:
+            await anyio.sleep(wait)
+
+class InFlightLimit:
+    """Async context manager capping requests in flight, safe to share between threads"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._semaphore = threading.BoundedSemaphore(limit)
+
+    async def __aenter__(self):
+        import anyio
+        while not self._semaphore.acquire(blocking=False):
+            await anyio.sleep(0.01)
+
+    async def __aexit__(self, *exc_info):
+        self._semaphore.release()
+
+_shared_limits = {}
+_shared_limits_lock = threading.Lock()
+
+def shared_limits(concurrency=None, rate_limit=None):
+    """
+    Process-wide (InFlightLimit, TokenBucket) for a plan's concurrency and rate limit
+
+    Args:
+        concurrency: Maximum requests in flight (defaults to RAPIDAPI_CONCURRENCY)
+        rate_limit: Requests per second (defaults to RAPIDAPI_RATE_LIMIT)
+
+    Returns:
+        The same pair for every caller with the same limits
+    """
+    concurrency = concurrency or int(os.getenv('RAPIDAPI_CONCURRENCY', DEFAULT_CONCURRENCY))
+    rate_limit = rate_limit or float(os.getenv('RAPIDAPI_RATE_LIMIT', DEFAULT_RATE_LIMIT))
+    with _shared_limits_lock:
+        key = (concurrency, rate_limit)
+        if key not in _shared_limits:
+            _shared_limits[key] = (InFlightLimit(concurrency), TokenBucket(rate_limit))
+        return _shared_limits[key]
+
+async def _get_json(client, endpoint, limiter, bucket, stage, allow_missing=False):
+    """Fetch one endpoint and decode it, returning None on any failure (NOT_FOUND on a 404 if allow_missing)"""
+    import httpx
+    metrics = get_metrics()
+    async with limiter:
+        await bucket.acquire()
+        print(f"Requesting: {endpoint}")
+        metrics.count(stage, 'requests')
+        start = time.perf_counter()
+        try:
+            res = await client.get(endpoint)
+        except httpx.HTTPError as e:
+            metrics.count(stage, 'errors')
+            print(f"✗ Error requesting {endpoint}: {e}")
+            return None
+        finally:
+            metrics.observe_latency(stage, time.perf_counter() - start)
+
+    metrics.count(stage, 'bytes_downloaded', len(res.content))
+
+    if res.status_code == 404 and allow_missing:
+        metrics.count(stage, 'not_found')
+        return NOT_FOUND
+
+    if res.status_code != 200:
+        metrics.count(stage, 'errors')
+        print(f"✗ Error: HTTP {res.status_code} for {endpoint}")
+        return None
+
+    if not res.content:
+        metrics.count(stage, 'errors')
+        print(f"✗ Empty response for {endpoint}")
+        return None
+
+    try:
+        with metrics.timer('parse'):
+            return res.json()
+    except ValueError as e:
+        metrics.count(stage, 'errors')
+        print(f"✗ Invalid JSON for {endpoint}: {e}")
+        return None
+
+async def fetch_all(dates=(), ranking_types=(), concurrency=None, rate_limit=None, use_cache=True,
+                    ranking_date=None):
+    """
+    Fetch a window of dates and ranking tours concurrently
+
+    Args:
+        dates: Dates in 'YYYY-MM-DD' format to fetch events for
+        ranking_types: Ranking tours to fetch ('atp', 'wta')
+        concurrency: Maximum requests in flight (defaults to RAPIDAPI_CONCURRENCY)
+        rate_limit: Requests per second allowed by the plan (defaults to RAPIDAPI_RATE_LIMIT)
+        use_cache: If False, always request (fresh responses are still cached)
+        ranking_date: Ranking date the rankings are cached for (defaults to today)
+
+    Returns:
+        Tuple of ({date_str: matches_data}, {ranking_type: rankings_data});
+        failed requests map to None
+    """
+    import anyio
+    import httpx
+
+    concurrency = concurrency or int(os.getenv('RAPIDAPI_CONCURRENCY', DEFAULT_CONCURRENCY))
+    limiter, bucket = shared_limits(concurrency, rate_limit)
+    matches_by_date = {}
+    rankings_by_type = {}
+    cache = get_response_cache()
+
+    # Serve what the cache still considers fresh, request the rest
+    if use_cache:
+        for date_str in dates:
+            cached = cache.get_events(date_str)
+            if cached is not None:
+                matches_by_date[date_str] = cached
+        for ranking_type in ranking_types:
+            cached = cache.get_rankings(ranking_type, ranking_date)
+            if cached is not None:
+                rankings_by_type[ranking_type] = cached
+    dates = [date_str for date_str in dates if date_str not in matches_by_date]
+    ranking_types = [ranking_type for ranking_type in ranking_types if ranking_type not in rankings_by_type]
+    if not dates and not ranking_types:
+        return matches_by_date, rankings_by_type
+
+    headers = {
+        'x-rapidapi-key': get_rapidapi_key() or '',
+        'x-rapidapi-host': API_HOST
+    }
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=f"https://{API_HOST}", headers=headers,
+                                 limits=limits, timeout=REQUEST_TIMEOUT) as client:
+
+        async def fetch_date(date_str):
+            matches_by_date[date_str] = await _get_json(client, events_endpoint(date_str), limiter, bucket,
+                                                        'fetch_matches')
+            cache.put_events(date_str, matches_by_date[date_str])
+
+        async def fetch_ranking(ranking_type):
+            rankings_by_type[ranking_type] = await _get_json(client, rankings_endpoint(ranking_type), limiter,
+                                                              bucket, 'fetch_rankings')
+            cache.put_rankings(ranking_type, rankings_by_type[ranking_type], ranking_date)
+
+        async with anyio.create_task_group() as tg:
+            for date_str in dates:
+                tg.start_soon(fetch_date, date_str)
+            for ranking_type in ranking_types:
+                tg.start_soon(fetch_ranking, ranking_type)
+
+    return matches_by_date, rankings_by_type
+
+def fetch_window(dates=(), ranking_types=(), concurrency=None, rate_limit=None, use_cache=True, ranking_date=None):
+    """
+    Synchronous entry point for fetch_all
+
+    Returns:
+        Tuple of ({date_str: matches_data}, {ranking_type: rankings_data})
+    """
+    import anyio
+
+    start = time.monotonic()
+    results = anyio.run(fetch_all, list(dates), list(ranking_types), concurrency, rate_limit, use_cache,
+                        ranking_date)
+    print(f"✓ Fetched {len(dates)} date(s) and {len(ranking_types)} ranking tour(s) in {time.monotonic() - start:.2f}s")
+    return results
+
+async def fetch_statistics(match_ids, workers=None, rate_limit=None):
+    """
+    Fetch per-match statistics with a fixed pool of workers
+
+    Args:
+        match_ids: Match ids to fetch
+        workers: Number of workers, each with one request in flight (defaults to RAPIDAPI_CONCURRENCY);
+                 requests also count against the process-wide shared_limits
+        rate_limit: Requests per second allowed by the plan (defaults to RAPIDAPI_RATE_LIMIT)
+
+    Returns:
+        {match_id: statistics_data, NOT_FOUND, or None for a failed request}
+    """
+    import anyio
+    import httpx
+
+    workers = workers or int(os.getenv('RAPIDAPI_CONCURRENCY', DEFAULT_CONCURRENCY))
+    limiter, bucket = shared_limits(rate_limit=rate_limit)
+    results = {}
+    # Workers pull from one shared iterator until it is exhausted
+    pending = iter(match_ids)
+
+    headers = {
+        'x-rapidapi-key': get_rapidapi_key() or '',
+        'x-rapidapi-host': API_HOST
+    }
+    limits = httpx.Limits(max_connections=workers, max_keepalive_connections=workers)
+
+    async with httpx.AsyncClient(base_url=f"https://{API_HOST}", headers=headers,
+                                 limits=limits, timeout=REQUEST_TIMEOUT) as client:
+
+        async def worker():
+            for match_id in pending:
+                results[match_id] = await _get_json(client, statistics_endpoint(match_id), limiter, bucket,
+                                                    'fetch_statistics', allow_missing=True)
+
+        async with anyio.create_task_group() as tg:
+            for _ in range(min(workers, len(match_ids))):
+                tg.start_soon(worker)
+
+    return results
+
+def fetch_statistics_window(match_ids, workers=None, rate_limit=None):
+    """
+    Synchronous entry point for fetch_statistics
+
+    Returns:
+        {match_id: statistics_data, NOT_FOUND, or None}
+    """
+    import anyio
+
+    if not match_ids:
+        return {}
+    start = time.monotonic()
+    results = anyio.run(fetch_statistics, list(match_ids), workers, rate_limit)
+    print(f"✓ Fetched statistics for {len(match_ids)} match(es) in {time.monotonic() - start:.2f}s")
+    return results
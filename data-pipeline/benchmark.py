@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the ingestion pipeline on recorded payloads
+
+Every tennis_data/matches_YYYY-MM-DD.json file is one simulated day. For each
+day the suite measures:
+    parse       streaming JSON parse (events/sec)
+    filter      EventFilter with a cold tournament cache (events/sec)
+    transform   transform_match_batch with and without raw_data (events/sec)
+    sync        process_and_upsert_events end to end against FakeSupabase, until
+                the write spool is drained (seconds, upsert requests, bytes sent, peak memory)
+    resync      the same day again, where change detection should skip everything
+api_pulls/*.json files are normalized by feed_adapters and run through the
+same filter and transform (parse+normalize, filter and transform events/sec).
+
+Results are written to BENCHMARK_DIR as JSON so runs can be compared.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --days 5
+    python benchmark.py --compare benchmark_results/bench_20260120_101500.json
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import clients
+import event_filter
+import fetch_api_matches
+from change_detection import MatchStateStore
+from event_filter import EventFilter
+from event_stream import iter_events_from_file
+from fake_supabase import FakeSupabase
+from feed_adapters import iter_feed_events
+from match_transform import transform_match_batch
+from write_spool import WriteSpool, set_write_spool, wait_for_spool
+
+RESULTS_FOLDER = os.getenv('BENCHMARK_DIR', 'benchmark_results')
+MATCH_FIXTURES = os.path.join('tennis_data', 'matches_*.json')
+PULL_FIXTURES = os.path.join('api_pulls', '*.json')
+
+def _rate(count, seconds):
+    return round(count / seconds, 1) if seconds > 0 else None
+
+def _timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def _quiet():
+    """Silence the pipeline's per-row prints so they do not dominate the timings"""
+    return contextlib.redirect_stdout(io.StringIO())
+
+def bench_parse(path):
+    """
+    Parse one recorded payload
+
+    Returns:
+        Tuple of (events, result dictionary)
+    """
+    events, seconds = _timed(lambda: list(iter_events_from_file(path)))
+    return events, {'events': len(events), 'seconds': round(seconds, 4),
+                    'events_per_sec': _rate(len(events), seconds)}
+
+def bench_filter(events):
+    """
+    Filter events with a cold tournament-decision cache
+
+    Returns:
+        Tuple of (included events, result dictionary)
+    """
+    event_filter._tournament_decisions.clear()
+    day_filter = EventFilter()
+    included, seconds = _timed(lambda: [event for event in events if day_filter(event)])
+    return included, {'events': len(events), 'included': len(included), 'seconds': round(seconds, 4),
+                      'events_per_sec': _rate(len(events), seconds)}
+
+def bench_transform(events):
+    """Transform events with and without raw_data"""
+    result = {'events': len(events)}
+    for label, include_raw in (('raw', True), ('no_raw', False)):
+        _, seconds = _timed(transform_match_batch, events, include_raw)
+        result[f'{label}_seconds'] = round(seconds, 4)
+        result[f'{label}_events_per_sec'] = _rate(len(events), seconds)
+    return result
+
+def _sync_and_drain(events, **kwargs):
+    upserted = fetch_api_matches.process_and_upsert_events(events, **kwargs)
+    wait_for_spool()
+    return upserted
+
+def bench_sync(events, db, match_state, trace_memory=False):
+    """
+    Run process_and_upsert_events against the stand-in client
+
+    Args:
+        events: Events of one day
+        db: FakeSupabase shared across days
+        match_state: MatchStateStore shared across days, None to sync every event
+        trace_memory: If True, record peak Python memory with tracemalloc (slower)
+
+    Returns:
+        Result dictionary
+    """
+    requests_before = len(db.requests)
+    bytes_before = db.bytes_sent
+    stand_in_before = db.elapsed
+
+    if trace_memory:
+        tracemalloc.start()
+    with _quiet():
+        upserted, seconds = _timed(_sync_and_drain, events,
+                                   match_state=match_state, skip_unchanged=match_state is not None,
+                                   payload_store=None)
+    result = {
+        'rows': len(upserted),
+        'seconds': round(seconds, 4),
+        'stand_in_seconds': round(db.elapsed - stand_in_before, 4),
+        'requests': len(db.requests) - requests_before,
+        'upsert_requests': sum(1 for _, action in db.requests[requests_before:] if action == 'upsert'),
+        'bytes_sent': db.bytes_sent - bytes_before,
+    }
+    if trace_memory:
+        result['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+def bench_pull(path):
+    """Normalize, filter and transform one api_pulls file"""
+    events, seconds = _timed(lambda: list(iter_feed_events(path)))
+    included, filtered = bench_filter(events)
+    return {'file': os.path.basename(path), 'events': len(events), 'seconds': round(seconds, 4),
+            'events_per_sec': _rate(len(events), seconds), 'filter': filtered,
+            'transform': bench_transform(included)}
+
+def _day_label(path):
+    match = re.search(r'(\d{4}-\d{2}-\d{2})', os.path.basename(path))
+    return match.group(1) if match else os.path.basename(path)
+
+def run_benchmarks(match_files, pull_files=(), trace_memory=True):
+    """
+    Run every stage over the fixtures
+
+    Args:
+        match_files: tennis_data payloads, one simulated day each
+        pull_files: api_pulls payloads (normalize, filter and transform)
+        trace_memory: If True, add a traced sync pass per day for peak memory
+
+    Returns:
+        Results dictionary
+    """
+    state_folder = tempfile.mkdtemp(prefix='bench_state_')
+    db = FakeSupabase()
+    match_state = MatchStateStore(os.path.join(state_folder, 'match_state.json'))
+    original_client = clients.set_supabase(db)
+    spool = WriteSpool(os.path.join(state_folder, 'write_spool.sqlite3'))
+    original_spool = set_write_spool(spool)
+
+    days = []
+    try:
+        for path in match_files:
+            events, parse = bench_parse(path)
+            included, filtered = bench_filter(events)
+            day = {
+                'date': _day_label(path),
+                'parse': parse,
+                'filter': filtered,
+                'transform': bench_transform(included),
+                'sync': bench_sync(events, db, match_state),
+                'resync': bench_sync(events, db, match_state),
+            }
+            if trace_memory:
+                # Separate traced pass on a fresh stand-in so tracing does not skew the timings
+                traced_db = FakeSupabase()
+                clients.set_supabase(traced_db)
+                day['sync']['peak_memory_bytes'] = bench_sync(events, traced_db, None,
+                                                              trace_memory=True)['peak_memory_bytes']
+                clients.set_supabase(db)
+            day['end_to_end_seconds'] = round(parse['seconds'] + day['sync']['seconds'], 4)
+            days.append(day)
+            print(f"✓ {day['date']}: {parse['events']} events, {filtered['included']} included, "
+                  f"{day['sync']['upsert_requests']} upsert request(s), {day['end_to_end_seconds']}s")
+    finally:
+        clients.set_supabase(original_client)
+        spool.stop()
+        set_write_spool(original_spool)
+        shutil.rmtree(state_folder, ignore_errors=True)
+
+    pulls = [bench_pull(path) for path in pull_files]
+
+    def total(stage, key):
+        return sum(day[stage][key] for day in days)
+
+    totals = {}
+    if days:
+        totals = {
+            'days': len(days),
+            'events': total('parse', 'events'),
+            'included': total('filter', 'included'),
+            'parse_events_per_sec': _rate(total('parse', 'events'), total('parse', 'seconds')),
+            'filter_events_per_sec': _rate(total('filter', 'events'), total('filter', 'seconds')),
+            'transform_events_per_sec': _rate(total('transform', 'events'), total('transform', 'raw_seconds')),
+            'transform_no_raw_events_per_sec': _rate(total('transform', 'events'),
+                                                     total('transform', 'no_raw_seconds')),
+            'sync_requests': total('sync', 'requests'),
+            'sync_upsert_requests': total('sync', 'upsert_requests'),
+            'sync_bytes_sent': total('sync', 'bytes_sent'),
+            'resync_requests': total('resync', 'requests'),
+            'end_to_end_seconds_per_day': round(sum(day['end_to_end_seconds'] for day in days) / len(days), 4),
+        }
+        if trace_memory:
+            totals['peak_memory_bytes'] = max(day['sync']['peak_memory_bytes'] for day in days)
+    if pulls:
+        pull_events = sum(pull['events'] for pull in pulls)
+        totals['pull_events_per_sec'] = _rate(pull_events, sum(pull['seconds'] for pull in pulls))
+        totals['pull_included'] = sum(pull['filter']['included'] for pull in pulls)
+        totals['pull_transform_events_per_sec'] = _rate(
+            sum(pull['transform']['events'] for pull in pulls),
+            sum(pull['transform']['raw_seconds'] for pull in pulls))
+    if sys.platform != 'win32':
+        import resource
+        totals['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return {'meta': _run_metadata(len(match_files), len(pull_files)), 'totals': totals, 'days': days,
+            'pulls': pulls}
+
+def _run_metadata(match_count, pull_count):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'match_fixtures': match_count,
+        'pull_fixtures': pull_count,
+    }
+
+def save_results(results, folder=RESULTS_FOLDER):
+    """Write results to folder/bench_YYYYMMDD_HHMMSS.json and return the path"""
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    return path
+
+def print_comparison(results, baseline):
+    """Print each total next to the baseline run's value"""
+    print(f"\nCompared with {baseline['meta'].get('git_commit')} ({baseline['meta'].get('timestamp')}):")
+    for key, value in results['totals'].items():
+        previous = baseline.get('totals', {}).get(key)
+        if isinstance(value, (int, float)) and isinstance(previous, (int, float)) and previous:
+            change = (value - previous) / previous * 100
+            print(f"  {key}: {previous} → {value} ({change:+.1f}%)")
+        else:
+            print(f"  {key}: {previous} → {value}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ingestion pipeline on recorded payloads")
+    parser.add_argument('--days', type=int, default=None, help="Only use the first N tennis_data days")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the traced peak-memory pass")
+    parser.add_argument('--compare', help="Previous results file to compare against")
+    parser.add_argument('--output', default=RESULTS_FOLDER, help="Folder for the results JSON")
+    args = parser.parse_args(argv)
+
+    match_files = sorted(glob.glob(MATCH_FIXTURES))[:args.days]
+    pull_files = sorted(glob.glob(PULL_FIXTURES))
+    if not match_files and not pull_files:
+        print("❌ No fixtures found (run from data-pipeline/)")
+        sys.exit(1)
+
+    results = run_benchmarks(match_files, pull_files, trace_memory=not args.no_memory)
+
+    print(f"\n{'='*60}")
+    print("BENCHMARK SUMMARY")
+    print(f"{'='*60}")
+    for key, value in results['totals'].items():
+        print(f"{key}: {value}")
+    print(f"\nResults saved to: {save_results(results, args.output)}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            print_comparison(results, json.load(f))
+
+if __name__ == "__main__":
+    main()
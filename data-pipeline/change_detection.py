@@ -0,0 +1,121 @@
+"""
+Per-match fingerprints so unchanged matches are not re-upserted
+"""
+
+import hashlib
+import json
+import os
+import time
+
+STATE_FOLDER = os.getenv('PIPELINE_STATE_DIR', '.pipeline_state')
+MATCH_STATE_FILE = os.path.join(STATE_FOLDER, 'match_state.json')
+
+# Fingerprints of matches that started longer ago than this are dropped on save
+STATE_RETENTION_DAYS = 30
+
+def event_fingerprint(event, content_hash=None):
+    """
+    Fingerprint an API event
+
+    Args:
+        event: Single event/match from the API response
+        content_hash: Precomputed sha1 of the canonical event JSON (raw_store.encode_event)
+
+    Returns:
+        Dictionary with the content hash, changeTimestamp and start timestamp
+    """
+    if content_hash is None:
+        content = json.dumps(event, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        content_hash = hashlib.sha1(content.encode('utf-8')).hexdigest()
+    return {
+        'hash': content_hash,
+        'change_ts': event.get('changes', {}).get('changeTimestamp'),
+        'start_ts': event.get('startTimestamp')
+    }
+
+class MatchStateStore:
+    """
+    Local state file of the last synced fingerprint per match_id
+
+    Usage:
+        state = MatchStateStore()
+        changed = state.filter_changed(events)   # or state.accept(event) per event
+        ... upsert changed ...
+        state.commit(upserted_match_ids)
+        state.save()
+    """
+
+    def __init__(self, path=MATCH_STATE_FILE):
+        self.path = path
+        self.fingerprints = {}
+        self.pending = {}
+        self.skipped_count = 0
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.fingerprints = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠ Could not read match state {path}, starting fresh: {e}")
+
+    def is_changed(self, event, fingerprint):
+        """True if the event is new or differs from the last synced version"""
+        previous = self.fingerprints.get(str(event.get('id')))
+        if previous is None:
+            return True
+        return previous['change_ts'] != fingerprint['change_ts'] or previous['hash'] != fingerprint['hash']
+
+    def accept(self, event, content_hash=None):
+        """
+        Check a single event and remember its fingerprint until commit
+
+        Args:
+            event: Single event/match from the API response
+            content_hash: Precomputed content hash, if the caller already has one
+
+        Returns:
+            True if the event is new or modified and should be upserted
+        """
+        fingerprint = event_fingerprint(event, content_hash)
+        if not self.is_changed(event, fingerprint):
+            self.skipped_count += 1
+            return False
+        self.pending[str(event.get('id'))] = fingerprint
+        return True
+
+    def filter_changed(self, events):
+        """
+        Keep only new or modified events
+
+        Args:
+            events: Iterable of API events
+
+        Returns:
+            List of events that need to be upserted
+        """
+        return [event for event in events if self.accept(event)]
+
+    def commit(self, match_ids):
+        """Record the pending fingerprints of matches that were written successfully"""
+        for match_id in match_ids:
+            fingerprint = self.pending.pop(str(match_id), None)
+            if fingerprint is not None:
+                self.fingerprints[str(match_id)] = fingerprint
+
+    def save(self):
+        """Prune old matches and atomically write the state file"""
+        cutoff = time.time() - STATE_RETENTION_DAYS * 86400
+        self.fingerprints = {
+            match_id: fingerprint
+            for match_id, fingerprint in self.fingerprints.items()
+            if not fingerprint.get('start_ts') or fingerprint['start_ts'] >= cutoff
+        }
+
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.fingerprints, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
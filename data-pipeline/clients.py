@@ -0,0 +1,59 @@
+"""
+Lazily created Supabase client and API credentials
+
+Nothing is loaded at import time: the .env file is read and the supabase
+package imported only when a client or key is first needed, so offline
+tools (replay --dry-run, benchmarks) start without credentials.
+"""
+
+import os
+
+_environment_loaded = False
+_supabase = None
+
+def load_environment():
+    """Load the .env file once (existing environment variables win)"""
+    global _environment_loaded
+    if _environment_loaded:
+        return
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        pass
+    else:
+        load_dotenv()
+    _environment_loaded = True
+
+def get_rapidapi_key():
+    """RapidAPI key from RAPIDAPI_KEY"""
+    load_environment()
+    return os.getenv('RAPIDAPI_KEY')
+
+def get_supabase():
+    """
+    Shared Supabase client, created on first use
+
+    Uses SUPABASE_URL and SUPABASE_SERVICE_KEY (falling back to SUPABASE_KEY)
+
+    Returns:
+        Supabase client
+    """
+    global _supabase
+    if _supabase is None:
+        load_environment()
+        from supabase import create_client
+        _supabase = create_client(os.getenv('SUPABASE_URL'),
+                                  os.getenv('SUPABASE_SERVICE_KEY') or os.getenv('SUPABASE_KEY'))
+    return _supabase
+
+def set_supabase(client):
+    """
+    Replace the shared client (for example with fake_supabase.FakeSupabase)
+
+    Returns:
+        The previous client, or None if none was created yet
+    """
+    global _supabase
+    previous = _supabase
+    _supabase = client
+    return previous
@@ -0,0 +1,114 @@
+"""
+ATP/WTA singles event filter with memoized tournament-level decisions
+"""
+
+from collections import Counter
+
+INCLUDED_CATEGORY_NAMES = ('ATP', 'WTA', 'Challenger', 'WTA 125')
+INCLUDED_CATEGORY_SLUGS = ('atp', 'wta', 'challenger', 'wta-125')
+EXCLUDED_KEYWORDS = ('itf', 'junior', 'youth', 'futures', 'u18', 'u21')
+
+REASON_NOT_ATP_WTA = "Not ATP/WTA"
+REASON_DOUBLES_NAME = "Doubles in name"
+REASON_EXCLUDED = "Excluded category"
+REASON_NOT_SINGLES = "Not singles"
+
+# (tournament.id, season.id) -> tuple of rejection reasons, shared by every filter
+_tournament_decisions = {}
+
+def tournament_rejections(event):
+    """
+    Tournament/season-level reasons to reject an event (uncached)
+
+    Args:
+        event: Single event/match from the API response
+
+    Returns:
+        Tuple of rejection reasons, empty if the tournament is included
+    """
+    tournament = event.get('tournament') or {}
+    category = tournament.get('category') or {}
+
+    category_name = (category.get('name') or '').upper()
+    category_slug = (category.get('slug') or '').lower()
+    tournament_name = (tournament.get('name') or '').lower()
+    season_name = ((event.get('season') or {}).get('name') or '').lower()
+
+    reasons = []
+
+    # Check if it's ATP or WTA
+    if category_name not in INCLUDED_CATEGORY_NAMES and category_slug not in INCLUDED_CATEGORY_SLUGS:
+        reasons.append(REASON_NOT_ATP_WTA)
+
+    # Tournament/season name shouldn't contain "doubles"
+    if 'doubles' in tournament_name or 'double' in season_name:
+        reasons.append(REASON_DOUBLES_NAME)
+
+    # Exclude ITF, junior, youth, etc.
+    searchable = (category_name.lower(), category_slug, tournament_name, season_name)
+    if any(keyword in field for keyword in EXCLUDED_KEYWORDS for field in searchable):
+        reasons.append(REASON_EXCLUDED)
+
+    return tuple(reasons)
+
+class EventFilter:
+    """
+    Callable event filter that counts rejections by reason
+
+    The category/tournament decision is made once per tournament.id/season.id
+    and cached; per event only the singles/doubles check runs.
+
+    Usage:
+        event_filter = EventFilter()
+        included = [event for event in events if event_filter(event)]
+        event_filter.print_summary()
+    """
+
+    def __init__(self):
+        self.accepted = 0
+        self.rejected = 0
+        self.rejections = Counter()
+
+    def __call__(self, event):
+        tournament = event.get('tournament') or {}
+        key = (tournament.get('id'), (event.get('season') or {}).get('id'))
+
+        if key[0] is None or key[1] is None:
+            reasons = tournament_rejections(event)
+        else:
+            reasons = _tournament_decisions.get(key)
+            if reasons is None:
+                reasons = _tournament_decisions[key] = tournament_rejections(event)
+
+        # Check if it's singles (not doubles)
+        if 'singles' not in ((event.get('eventFilters') or {}).get('category') or ()):
+            reasons += (REASON_NOT_SINGLES,)
+
+        if reasons:
+            self.rejected += 1
+            self.rejections.update(reasons)
+            return False
+
+        self.accepted += 1
+        return True
+
+    def print_summary(self):
+        """Print accepted/rejected totals and rejection counts by reason"""
+        print(f"Filtered out: {self.rejected} event(s)")
+        for reason, count in self.rejections.most_common():
+            print(f"  ⊘ {reason}: {count}")
+
+_default_filter = EventFilter()
+
+def should_include_event(event):
+    """
+    Check if an event should be included based on filters
+    Only include ATP/WTA singles events, exclude doubles, ITF, and junior/youth events
+
+    Args:
+        event: Single event/match from the API response
+
+    Returns:
+        Boolean: True if event should be included, False otherwise
+    """
+    return _default_filter(event)
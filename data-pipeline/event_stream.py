@@ -0,0 +1,98 @@
+"""
+Incremental parsing of {"events": [...]} payloads, one event at a time
+"""
+
+import codecs
+import json
+import re
+
+CHUNK_SIZE = 64 * 1024
+
+_EVENTS_ARRAY = re.compile(r'"events"\s*:\s*\[')
+_WHITESPACE = ' \t\n\r'
+
+def iter_events(stream, tee=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield the items of the top-level "events" array without loading the document
+
+    Args:
+        stream: Binary file-like object (open file or HTTP response)
+        tee: Optional binary file-like object that receives every raw byte read
+        chunk_size: Bytes read per call
+
+    Yields:
+        Event dictionaries in document order
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    eof = False
+
+    def read_more():
+        nonlocal buffer, eof
+        data = stream.read(chunk_size)
+        if not data:
+            eof = True
+            buffer += utf8.decode(b'', final=True)
+            return
+        if tee is not None:
+            tee.write(data)
+        buffer += utf8.decode(data)
+
+    # Find the start of the events array
+    while True:
+        match = _EVENTS_ARRAY.search(buffer)
+        if match:
+            pos = match.end()
+            break
+        if eof:
+            return
+        # Keep a tail in case the key is split across chunks
+        buffer = buffer[-32:]
+        read_more()
+
+    while True:
+        # Skip separators between events
+        while True:
+            while pos < len(buffer) and (buffer[pos] in _WHITESPACE or buffer[pos] == ','):
+                pos += 1
+            if pos < len(buffer) or eof:
+                break
+            read_more()
+
+        if pos >= len(buffer):
+            raise ValueError("Unexpected end of payload inside the events array")
+
+        if buffer[pos] == ']':
+            # Drain the rest so the tee gets the complete document
+            while not eof:
+                read_more()
+                buffer = ''
+            return
+
+        try:
+            event, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            read_more()
+            continue
+
+        yield event
+
+        # Drop consumed text so memory stays at about one chunk plus one event
+        buffer = buffer[end:]
+        pos = 0
+
+def iter_events_from_file(path):
+    """
+    Yield events from a saved daily matches file
+
+    Args:
+        path: Path of a matches_YYYY-MM-DD.json file
+
+    Yields:
+        Event dictionaries
+    """
+    with open(path, 'rb') as f:
+        yield from iter_events(f)
@@ -0,0 +1,213 @@
+"""
+In-memory stand-in for the Supabase client
+
+Supports the subset of the postgrest query builder the pipeline uses
+(select/eq/in_/range/order/limit, insert, upsert, update, delete) and
+functions.invoke, so pipeline code can be exercised locally without a
+database.
+
+Usage:
+    from fake_supabase import FakeSupabase
+    db = FakeSupabase({'teams': [{'id': 1, 'name': 'Aces', 'current_points': 0}]})
+    engine = TeamPointsEngine(db)
+    ...
+    db.tables['teams']
+"""
+
+import copy
+import json
+import time
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = len(data) if count is None else count
+
+class FakeQuery:
+    """Chainable query against one in-memory table"""
+
+    def __init__(self, db, table_name):
+        self.db = db
+        self.table_name = table_name
+        self.action = 'select'
+        self.columns = None
+        self.payload = None
+        self.on_conflict = None
+        self.ignore_duplicates = False
+        self.filters = []
+        self.order_by = None
+        self.start = None
+        self.end = None
+        self.count = None
+
+    # Actions
+    def select(self, columns='*', count=None, **kwargs):
+        self.action = 'select'
+        self.count = count
+        self.columns = None if columns.strip() == '*' else [c.strip() for c in columns.split(',')]
+        return self
+
+    def insert(self, json, **kwargs):
+        self.action = 'insert'
+        self.payload = json
+        return self
+
+    def upsert(self, json, on_conflict='', ignore_duplicates=False, **kwargs):
+        self.action = 'upsert'
+        self.payload = json
+        self.on_conflict = on_conflict
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, json, **kwargs):
+        self.action = 'update'
+        self.payload = json
+        return self
+
+    def delete(self, **kwargs):
+        self.action = 'delete'
+        return self
+
+    # Filters and modifiers
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def order(self, column, desc=False, **kwargs):
+        self.order_by = (column, desc)
+        return self
+
+    def limit(self, size, **kwargs):
+        self.start, self.end = self.start or 0, (self.start or 0) + size - 1
+        return self
+
+    def range(self, start, end, **kwargs):
+        self.start, self.end = start, end
+        return self
+
+    def _matches(self, row):
+        return all(check(row) for check in self.filters)
+
+    def execute(self):
+        start = time.perf_counter()
+        self.db.requests.append((self.table_name, self.action))
+        if self.payload is not None:
+            self.db.bytes_sent += len(json.dumps(self.payload, default=str).encode('utf-8'))
+        try:
+            response = self._execute()
+        finally:
+            self.db.elapsed += time.perf_counter() - start
+        self.db.bytes_received += len(json.dumps(response.data, default=str).encode('utf-8'))
+        return response
+
+    def _execute(self):
+        rows = self.db.tables.setdefault(self.table_name, [])
+
+        failure = self.db.fail_on(self.table_name, self.action, self.payload) if self.db.fail_on is not None else None
+        if isinstance(failure, BaseException):
+            raise failure
+        if failure:
+            raise Exception(f"Simulated failure on {self.action} {self.table_name}")
+
+        if self.action == 'select':
+            selected = [row for row in rows if self._matches(row)]
+            if self.order_by:
+                column, desc = self.order_by
+                selected.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+            # count='exact' counts every matching row, not just the returned page
+            total = len(selected) if self.count else None
+            if self.start is not None:
+                selected = selected[self.start:self.end + 1]
+            if self.columns:
+                selected = [{column: row.get(column) for column in self.columns} for row in selected]
+            return FakeResponse(copy.deepcopy(selected), total)
+
+        if self.action in ('insert', 'upsert'):
+            records = self.payload if isinstance(self.payload, list) else [self.payload]
+            keys = tuple(key.strip() for key in (self.on_conflict or '').split(',') if key.strip())
+            index = self.db.conflict_index(self.table_name, keys) if self.action == 'upsert' and keys else None
+            written = []
+            for record in records:
+                existing = None
+                if index is not None:
+                    existing = index.get(tuple(record.get(k) for k in keys))
+                if existing is None:
+                    row = copy.deepcopy(record)
+                    rows.append(row)
+                    self.db.index_row(self.table_name, row)
+                    written.append(record)
+                elif not self.ignore_duplicates:
+                    existing.update(copy.deepcopy(record))
+                    written.append(existing)
+            return FakeResponse(copy.deepcopy(written))
+
+        if self.action == 'update':
+            updated = [row for row in rows if self._matches(row)]
+            for row in updated:
+                row.update(copy.deepcopy(self.payload))
+            return FakeResponse(copy.deepcopy(updated))
+
+        if self.action == 'delete':
+            deleted = [row for row in rows if self._matches(row)]
+            self.db.tables[self.table_name] = [row for row in rows if not self._matches(row)]
+            self.db.indexes.pop(self.table_name, None)
+            return FakeResponse(deleted)
+
+        raise ValueError(f"Unsupported action {self.action}")
+
+class FakeFunctions:
+    def __init__(self, db):
+        self.db = db
+
+    def invoke(self, function_name, invoke_options=None):
+        self.db.requests.append((function_name, 'invoke'))
+        return None
+
+class FakeSupabase:
+    """
+    In-memory Supabase client
+    Every request is logged in `requests`; JSON request/response body sizes
+    are summed in `bytes_sent` and `bytes_received` and the time spent in
+    the stand-in itself in `elapsed`.
+
+    Args:
+        tables: Optional {table_name: [rows]} initial contents
+        fail_on: Optional callable (table_name, action, payload) that makes matching
+                 requests raise: True raises a plain Exception, an exception
+                 instance (e.g. ConnectionError() for an outage) is raised as is
+    """
+
+    def __init__(self, tables=None, fail_on=None):
+        self.tables = copy.deepcopy(tables) if tables else {}
+        self.fail_on = fail_on
+        self.requests = []
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.elapsed = 0.0
+        self.indexes = {}
+        self.functions = FakeFunctions(self)
+
+    def table(self, table_name):
+        return FakeQuery(self, table_name)
+
+    def conflict_index(self, table_name, keys):
+        """Rows of a table keyed by the values of the conflict columns (built on first use)"""
+        table_indexes = self.indexes.setdefault(table_name, {})
+        if keys not in table_indexes:
+            table_indexes[keys] = {tuple(row.get(k) for k in keys): row for row in self.tables.get(table_name, [])}
+        return table_indexes[keys]
+
+    def index_row(self, table_name, row):
+        """Add a newly inserted row to the table's conflict indexes"""
+        for keys, index in self.indexes.get(table_name, {}).items():
+            index[tuple(row.get(k) for k in keys)] = row
+
+    def request_count(self, table_name=None, action=None):
+        """Number of requests made, optionally for one table and/or action"""
+        return sum(1 for name, kind in self.requests
+                   if (table_name is None or name == table_name) and (action is None or kind == action))
@@ -0,0 +1,262 @@
+"""
+Feed adapters: read saved payloads of either supported format as normalized events
+
+Two payload formats exist on disk:
+    tennis_api   {"events": [...]} responses of the Tennis API
+                 (tennis_data/matches_YYYY-MM-DD.json, raw archive)
+    api_pulls    {"fetch_date", "date_requested", "data": [{country, stage, matches}]}
+                 dumps of the older scores feed (api_pulls/tennis_matches_YYYY-MM-DD.json)
+
+Every adapter yields events in the Tennis API event shape (tournament,
+season, roundInfo, status, homeTeam/awayTeam, homeScore/awayScore,
+winnerCode, startTimestamp, eventFilters), the record type EventFilter and
+transform_match_batch already consume, so archived pulls go through the
+same filter, transform and sync as fresh API responses.
+
+Note that api_pulls ids (match, player and tournament) come from the other
+provider's id space and do not line up with Tennis API ids, so replay.py
+only uses them for dry runs.
+
+Usage:
+    from feed_adapters import iter_feed_events
+    for event in iter_feed_events('api_pulls/tennis_matches_2026-01-08.json'):
+        ...
+"""
+
+import calendar
+import json
+import re
+from datetime import datetime
+
+from event_stream import iter_events_from_file
+
+SNIFF_BYTES = 4096
+
+# api_pulls country_name -> (category name, category slug, gender, tournament type)
+PULL_CATEGORIES = {
+    'ATP 250': ('ATP', 'atp', 'M', 'p250'),
+    'ATP 500': ('ATP', 'atp', 'M', 'p500'),
+    'ATP 1000': ('ATP', 'atp', 'M', 'p1000'),
+    'ATP Challenger': ('Challenger', 'challenger', 'M', 'lower'),
+    'WTA 250': ('WTA', 'wta', 'F', 'p250'),
+    'WTA 500': ('WTA', 'wta', 'F', 'p500'),
+    'WTA 1000': ('WTA', 'wta', 'F', 'p1000'),
+    'WTA Challenger': ('WTA 125', 'wta-125', 'F', 'lower'),
+}
+GRAND_SLAMS = ('Australian Open', 'Roland Garros', 'French Open', 'Wimbledon', 'US Open')
+
+# Leading digit of the numeric round codes (2001 = first match of the first round) -> (name, cupRoundType)
+PULL_ROUNDS = {
+    '2': ('Round of 128', None),
+    '3': ('Round of 64', None),
+    '4': ('Round of 32', 16),
+    '5': ('Round of 16', 8),
+    '6': ('Quarterfinals', 4),
+    '7': ('Semifinals', 2),
+}
+PULL_ROUND_NAMES = {
+    'final': ('Final', 1),
+    'semi finals': ('Semifinals', 2),
+    'quarter finals': ('Quarterfinals', 4),
+}
+
+_ROUND_CODE = re.compile(r'^(\d)\d{3}$')
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _slugify(name):
+    return re.sub(r'[^a-z0-9]+', '-', (name or '').lower()).strip('-')
+
+def _pull_category(country_name, stage_name):
+    """
+    Category, gender and tournament type of an api_pulls tournament
+
+    Grand slam stages ("Men's Singles", "Women's Qualifiers", ...) carry the
+    tour in the stage name; unknown tours keep their own name so the filter
+    rejects them.
+
+    Returns:
+        Tuple of (category name, category slug, gender, tournament type)
+    """
+    if country_name in PULL_CATEGORIES:
+        return PULL_CATEGORIES[country_name]
+    if country_name in GRAND_SLAMS:
+        stage = (stage_name or '').lower()
+        if stage.startswith("men's"):
+            return ('ATP', 'atp', 'M', 'grand-slam')
+        if stage.startswith("women's"):
+            return ('WTA', 'wta', 'F', 'grand-slam')
+        return (country_name, _slugify(country_name), 'X', 'grand-slam')
+    return (country_name, _slugify(country_name), None, 'lower')
+
+def _pull_round(round_info, qualification):
+    """roundInfo dictionary for an api_pulls match_round_info value"""
+    value = (round_info or '').strip()
+    name, cup_round_type = PULL_ROUND_NAMES.get(value.lower(), (None, None))
+    match = _ROUND_CODE.match(value)
+    if match:
+        name, cup_round_type = PULL_ROUNDS.get(match.group(1), (None, None))
+
+    # Qualifying draws reuse the main-draw codes, only their final is unambiguous
+    if qualification:
+        name = 'Qualification Final' if name == 'Final' else None
+        cup_round_type = None
+    return {'name': name, 'cupRoundType': cup_round_type}
+
+def _pull_team(players, gender):
+    """homeTeam/awayTeam dictionary, doubles pairs are joined with '/'"""
+    players = players or []
+    if len(players) == 1:
+        player = players[0]
+        return {'id': _to_int(player.get('team_id')), 'name': player.get('team_name'),
+                'shortName': player.get('team_name'), 'nameCode': player.get('team_abbreviation'),
+                'gender': gender}
+    return {'id': None, 'name': ' / '.join(player.get('team_name') or '' for player in players) or None,
+            'nameCode': None, 'gender': gender}
+
+def _pull_score(scores, side):
+    """homeScore/awayScore dictionary from the flat api_pulls scores"""
+    score = {}
+    current = _to_int(scores.get(side))
+    if current is not None:
+        score['current'] = current
+        score['display'] = current
+    for set_number in range(1, 6):
+        games = _to_int(scores.get(f'{side}_set{set_number}'))
+        if games is not None:
+            score[f'period{set_number}'] = games
+        tiebreak = _to_int(scores.get(f'{side}_set{set_number}_tiebreak'))
+        if tiebreak is not None:
+            score[f'period{set_number}TieBreak'] = tiebreak
+    return score
+
+def _pull_status(match, scores):
+    if (match.get('match_status') or {}).get('is_in_progress'):
+        return {'type': 'inprogress', 'description': (match.get('match_status') or {}).get('live_time')}
+    if match.get('match_winner') in (1, 2) or scores.get('home') is not None:
+        return {'type': 'finished', 'description': 'Ended'}
+    return {'type': 'notstarted', 'description': 'Not started'}
+
+def _parse_match_date(match_date):
+    """datetime of a 'YYYY-MM-DD HH:MM:SS' match date, None if missing or malformed"""
+    try:
+        return datetime.strptime(match_date, '%Y-%m-%d %H:%M:%S')
+    except (TypeError, ValueError):
+        return None
+
+def normalize_pull_match(match, tournament):
+    """
+    Convert one api_pulls match to the Tennis API event shape
+
+    Args:
+        match: Entry of a tournament's "matches" list
+        tournament: The enclosing {country, stage, matches} entry
+
+    Returns:
+        Event dictionary
+    """
+    country = tournament.get('country') or {}
+    stage = tournament.get('stage') or {}
+    country_name = country.get('country_name') or ''
+    stage_name = stage.get('stage_name') or ''
+
+    category_name, category_slug, gender, tournament_type = _pull_category(country_name, stage_name)
+    home_players = match.get('team_home') or []
+    away_players = match.get('team_away') or []
+    doubles = ('doubles' in stage_name.lower() or len(home_players) > 1 or len(away_players) > 1
+               or any('/' in (player.get('team_name') or '') for player in home_players + away_players))
+
+    # Match dates carry no zone, they are taken as UTC
+    match_date = _parse_match_date(match.get('match_date'))
+    start_timestamp = calendar.timegm(match_date.timetuple()) if match_date else None
+    year = match_date.year if match_date else None
+    scores = match.get('scores') or {}
+    winner = match.get('match_winner')
+
+    return {
+        'id': _to_int(match.get('match_id')),
+        'tournament': {
+            'id': _to_int(stage.get('stage_id')),
+            'name': stage_name,
+            'slug': stage.get('stage_code'),
+            'category': {'name': category_name, 'slug': category_slug},
+            'uniqueTournament': {'name': country_name, 'slug': country.get('country_code')},
+        },
+        'season': {'id': year, 'name': f"{country_name} {year}" if year else country_name,
+                   'year': str(year) if year else None},
+        'roundInfo': _pull_round(match.get('match_round_info'), 'qualif' in stage_name.lower()),
+        'status': _pull_status(match, scores),
+        'winnerCode': winner if winner in (1, 2) else None,
+        'homeTeam': _pull_team(home_players, gender),
+        'awayTeam': _pull_team(away_players, gender),
+        'homeScore': _pull_score(scores, 'home'),
+        'awayScore': _pull_score(scores, 'away'),
+        'startTimestamp': start_timestamp,
+        'eventFilters': {
+            'category': ['doubles' if doubles else 'singles'],
+            'gender': [gender] if gender else [],
+            'level': ['pro'],
+            'tournament': [tournament_type],
+        },
+    }
+
+class TennisApiFeed:
+    """{"events": [...]} payloads, streamed one event at a time"""
+
+    name = 'tennis_api'
+
+    def detect(self, head):
+        return '"events"' in head
+
+    def iter_events(self, path):
+        yield from iter_events_from_file(path)
+
+class ApiPullsFeed:
+    """api_pulls dumps (tournaments with nested matches, a few hundred kB per day)"""
+
+    name = 'api_pulls'
+
+    def detect(self, head):
+        return '"date_requested"' in head or '"total_tournaments"' in head
+
+    def iter_events(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        for tournament in payload.get('data') or []:
+            for match in tournament.get('matches') or []:
+                yield normalize_pull_match(match, tournament)
+
+FEED_ADAPTERS = (ApiPullsFeed(), TennisApiFeed())
+
+def detect_feed(path):
+    """
+    Adapter for a saved payload, chosen from the keys in its first few kB
+
+    Returns:
+        Feed adapter
+
+    Raises:
+        ValueError: If no adapter recognizes the file
+    """
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        head = f.read(SNIFF_BYTES)
+    for adapter in FEED_ADAPTERS:
+        if adapter.detect(head):
+            return adapter
+    raise ValueError(f"Unrecognized payload format: {path}")
+
+def iter_feed_events(path):
+    """
+    Yield normalized events from a saved payload of any supported format
+
+    Args:
+        path: Path of a tennis_api or api_pulls JSON file
+
+    Yields:
+        Event dictionaries in the Tennis API shape
+    """
+    yield from detect_feed(path).iter_events(path)
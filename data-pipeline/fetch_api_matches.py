@@ -3,279 +3,285 @@ import json
 import sys
 from datetime import datetime, timedelta
 import os
-from supabase import create_client, Client
-from dotenv import load_dotenv
+import time
+from supabase_batch import DEFAULT_BATCH_SIZE
+from async_fetch import fetch_window, events_endpoint
+from change_detection import MatchStateStore
+from event_stream import iter_events
+from raw_archive import RawArchive, ARCHIVE_FOLDER
+from event_filter import EventFilter
+from match_transform import transform_match_data
+from raw_store import encode_event, get_payload_store
+from scoring import score_changed_matches, is_scorable, SCORING_COLUMNS
+from match_enrichment import enrich_matches
+from metrics import get_metrics, start_run, log, CountingReader, EVENTS
+from clients import get_supabase, get_rapidapi_key
+from player_snapshot import get_player_snapshot
+from response_cache import get_response_cache
+from write_spool import spool_upsert, replay_spool, wait_and_warn, print_spool_summary
 
-# Load environment variables from .env file
-load_dotenv()
+# Configuration (credentials are read from the environment/.env on first use, see clients.py)
+UPSERT_BATCH_SIZE = int(os.getenv('UPSERT_BATCH_SIZE', DEFAULT_BATCH_SIZE))
+# Dates fetched concurrently at a time by bulk_fetch_and_store; only one chunk of payloads is held in memory
+FETCH_CHUNK_DAYS = int(os.getenv('FETCH_CHUNK_DAYS', 7))
 
-# Configuration
-RAPIDAPI_KEY = os.getenv('RAPIDAPI_KEY')
-SUPABASE_URL = os.getenv('SUPABASE_URL')
-SUPABASE_KEY = os.getenv('SUPABASE_SERVICE_KEY')
-OUTPUT_FOLDER = "tennis_data"
+class MatchSyncSummary:
+    """
+    Running totals of a multi-date sync
+    
+    Upserted rows are folded in as soon as they are synced and then released,
+    so memory stays flat however wide the date window is. Only the columns
+    scoring needs are kept, and only for finished matches.
+    """
+    
+    def __init__(self):
+        self.dates = 0
+        self.matches = 0
+        self.category_counts = {}
+        self.gender_counts = {}
+        self.scoring_records = {}
+    
+    def add(self, records):
+        """Count upserted tennis_matches rows"""
+        for record in records:
+            self.matches += 1
+            category = record.get('category_name', 'Unknown')
+            gender = record.get('gender', 'Unknown')
+            self.category_counts[category] = self.category_counts.get(category, 0) + 1
+            self.gender_counts[gender] = self.gender_counts.get(gender, 0) + 1
+            if is_scorable(record):
+                self.scoring_records[record['match_id']] = {column: record.get(column) for column in SCORING_COLUMNS}
 
-# Initialize Supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+def get_raw_archive(subfolder=None):
+    """Raw event archive, optionally in a subfolder of ARCHIVE_FOLDER"""
+    if subfolder:
+        return RawArchive(os.path.join(ARCHIVE_FOLDER, subfolder))
+    return RawArchive()
 
-def ensure_folder_exists(folder_path):
-    """Create folder if it doesn't exist"""
-    if not os.path.exists(folder_path):
-        os.makedirs(folder_path)
+def save_matches_file(matches, date_str, subfolder=None):
+    """
+    Archive a day's API response in the compressed raw archive
+    
+    Args:
+        matches: Raw JSON data from API
+        date_str: Format 'YYYY-MM-DD'
+        subfolder: Optional subfolder within ARCHIVE_FOLDER
+    
+    Returns:
+        Tuple of (events written, unchanged events skipped)
+    """
+    archive = get_raw_archive(subfolder)
+    written, skipped = archive.append_day(date_str, matches.get('events', []))
+    print(f"✓ Archived {date_str}: {written} new/changed event(s), {skipped} unchanged ({archive.folder})")
+    return written, skipped
 
-def get_tennis_matches(date_str, save_to_file=True, subfolder=None):
+def get_tennis_matches(date_str, save_to_file=True, subfolder=None, use_cache=True):
     """
     Get tennis fixtures for a specific date
     
     Args:
         date_str: Format 'YYYY-MM-DD' (e.g., '2026-01-23')
-        save_to_file: If True, saves the response to a JSON file
-        subfolder: Optional subfolder within OUTPUT_FOLDER
+        save_to_file: If True, saves the response to the raw archive
+        subfolder: Optional subfolder within ARCHIVE_FOLDER
+        use_cache: If False, always request (the fresh response is still cached)
     """
+    cache = get_response_cache()
+    matches = cache.get_events(date_str) if use_cache else None
+    if matches is not None:
+        if save_to_file:
+            save_matches_file(matches, date_str, subfolder)
+        return matches
+    
     conn = http.client.HTTPSConnection("tennisapi1.p.rapidapi.com")
     
     headers = {
-        'x-rapidapi-key': RAPIDAPI_KEY,
+        'x-rapidapi-key': get_rapidapi_key(),
         'x-rapidapi-host': "tennisapi1.p.rapidapi.com"
     }
     
-    # Convert date string to datetime object
-    date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-    
-    # Format as D/M/YYYY
-    day = date_obj.day
-    month = date_obj.month
-    year = date_obj.year
-    
-    # Construct the endpoint path
-    endpoint = f"/api/tennis/events/{day}/{month}/{year}"
+    # Construct the endpoint path (D/M/YYYY)
+    endpoint = events_endpoint(date_str)
     
     print(f"Requesting: {endpoint} for date {date_str}")
     
+    metrics = get_metrics()
+    metrics.count('fetch_matches', 'requests')
+    
     try:
+        start = time.perf_counter()
         conn.request("GET", endpoint, headers=headers)
         res = conn.getresponse()
         data = res.read()
+        metrics.observe_latency('fetch_matches', time.perf_counter() - start)
+        metrics.count('fetch_matches', 'bytes_downloaded', len(data))
         
         if res.status != 200:
+            metrics.count('fetch_matches', 'errors')
             print(f"✗ Error: HTTP {res.status}")
             return None
         
         if not data:
+            metrics.count('fetch_matches', 'errors')
             print("✗ Empty response")
             return None
         
-        matches = json.loads(data.decode("utf-8"))
+        with metrics.timer('parse'):
+            matches = json.loads(data.decode("utf-8"))
+        cache.put_events(date_str, matches)
         
         # Save to file if requested
         if save_to_file:
-            if subfolder:
-                save_path = os.path.join(OUTPUT_FOLDER, subfolder)
-            else:
-                save_path = OUTPUT_FOLDER
-            
-            ensure_folder_exists(save_path)
-            
-            filename = f"matches_{date_str}.json"
-            filepath = os.path.join(save_path, filename)
-            
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(matches, f, indent=2, ensure_ascii=False)
-            
-            print(f"✓ Saved to: {filepath}")
+            with metrics.timer('archive'):
+                save_matches_file(matches, date_str, subfolder)
         
         return matches
         
     except Exception as e:
+        metrics.count('fetch_matches', 'errors')
         print(f"✗ Error: {e}")
         return None
     finally:
         conn.close()
 
-def should_include_event(event):
+def stream_tennis_matches(date_str, save_to_file=True, subfolder=None, use_cache=True):
     """
-    Check if an event should be included based on filters
-    Only include ATP/WTA singles events, exclude doubles, ITF, and junior/youth events
+    Stream tennis fixtures for a specific date one event at a time
+    Events are parsed straight from the HTTP response and archived as they
+    arrive, so memory stays flat regardless of payload size
+    A fresh cached response is served from the response cache; streamed
+    responses are not added to it, since that would mean holding them whole
     
     Args:
-        event: Single event/match from the API response
+        date_str: Format 'YYYY-MM-DD' (e.g., '2026-01-23')
+        save_to_file: If True, appends the events to the raw archive
+        subfolder: Optional subfolder within ARCHIVE_FOLDER
+        use_cache: If False, always request
     
-    Returns:
-        Boolean: True if event should be included, False otherwise
+    Yields:
+        Event dictionaries; request and stream errors are logged and end the
+        stream early like an HTTP error does
     """
-    # Get category information
-    category_name = event.get('tournament', {}).get('category', {}).get('name', '').upper()
-    category_slug = event.get('tournament', {}).get('category', {}).get('slug', '').lower()
-    
-    # Get tournament and season names for additional filtering
-    tournament_name = event.get('tournament', {}).get('name', '').lower()
-    season_name = event.get('season', {}).get('name', '').lower()
-    
-    # Get match type from eventFilters
-    event_filters = event.get('eventFilters', {})
-    match_categories = event_filters.get('category', [])
-    
-    # Check if it's ATP or WTA
-    is_atp_or_wta = category_name in ['ATP', 'WTA', 'Challenger', 'WTA 125'] or category_slug in ['atp', 'wta', 'challenger', 'wta-125']
-    
-    # Check if it's singles (not doubles)
-    is_singles = 'singles' in match_categories
-    
-    # Additional check: tournament/season name shouldn't contain "doubles"
-    has_doubles_in_name = 'doubles' in tournament_name or 'doubles' in season_name or 'double' in season_name
-    
-    # Exclude ITF, junior, youth, etc.
-    excluded_keywords = ['itf', 'junior', 'youth', 'futures', 'u18', 'u21']
-    is_excluded = any(keyword in category_name.lower() for keyword in excluded_keywords)
-    is_excluded = is_excluded or any(keyword in category_slug for keyword in excluded_keywords)
-    is_excluded = is_excluded or any(keyword in tournament_name for keyword in excluded_keywords)
-    is_excluded = is_excluded or any(keyword in season_name for keyword in excluded_keywords)
-    
-    # Include only if it's ATP/WTA, singles, and not excluded
-    should_include = is_atp_or_wta and is_singles and not has_doubles_in_name and not is_excluded
-    
-    if not should_include:
-        player1 = event.get('homeTeam', {}).get('shortName', 'Unknown')
-        player2 = event.get('awayTeam', {}).get('shortName', 'Unknown')
-        reason = []
-        if not is_atp_or_wta:
-            reason.append(f"Not ATP/WTA ({category_name})")
-        if not is_singles:
-            reason.append(f"Not singles ({', '.join(match_categories)})")
-        if has_doubles_in_name:
-            reason.append("Doubles in name")
-        if is_excluded:
-            reason.append("Excluded category")
-        
-        print(f"  ⊘ Filtered out: {player1} vs {player2} - {' | '.join(reason)}")
-    
-    return should_include
+    cached = get_response_cache().get_events(date_str) if use_cache else None
+    if cached is not None:
+        if save_to_file:
+            save_matches_file(cached, date_str, subfolder)
+        yield from cached.get('events', [])
+        return
+    
+    conn = http.client.HTTPSConnection("tennisapi1.p.rapidapi.com")
+    
+    headers = {
+        'x-rapidapi-key': get_rapidapi_key(),
+        'x-rapidapi-host': "tennisapi1.p.rapidapi.com"
+    }
+    
+    endpoint = events_endpoint(date_str)
+    
+    print(f"Streaming: {endpoint} for date {date_str}")
+    
+    metrics = get_metrics()
+    metrics.count('fetch_matches', 'requests')
+    reader = None
+    
+    try:
+        start = time.perf_counter()
+        conn.request("GET", endpoint, headers=headers)
+        res = conn.getresponse()
+        # Time to response headers, the body is read while events are processed
+        metrics.observe_latency('fetch_matches', time.perf_counter() - start)
+        
+        if res.status != 200:
+            metrics.count('fetch_matches', 'errors')
+            print(f"✗ Error: HTTP {res.status}")
+            return
+        
+        reader = CountingReader(res)
+        events = iter_events(reader)
+        
+        if not save_to_file:
+            yield from events
+            return
+        
+        archive = get_raw_archive(subfolder)
+        yield from archive.tee_day(date_str, events)
+        written, skipped = archive.last_append
+        print(f"✓ Archived {date_str}: {written} new/changed event(s), {skipped} unchanged ({archive.folder})")
+        
+    except Exception as e:
+        # A dropped connection or truncated body ends this date only; events
+        # already yielded (and archived) are kept
+        metrics.count('fetch_matches', 'errors')
+        print(f"✗ Error streaming {date_str}: {e}")
+    finally:
+        if reader is not None:
+            metrics.count('fetch_matches', 'bytes_downloaded', reader.bytes_read)
+        conn.close()
 
-def transform_match_data(event):
+def sync_match_records(records, table_name='tennis_matches', batch_size=None, on_written=None):
     """
-    Transform match data from API format to database format
-    Changes 'homeTeam'/'awayTeam' to 'player1'/'player2'
+    Upsert already transformed match rows into Supabase in chunks
+    Missing player columns are filled in from the local players snapshot
+    Rows go through the write spool, so they count as upserted once durably
+    spooled and are written in the background (see write_spool.py)
     
     Args:
-        event: Single event/match from the API response
+        records: List of rows from transform_match_data
+        table_name: Supabase table name
+        batch_size: Rows per upsert request (defaults to UPSERT_BATCH_SIZE)
+        on_written: Optional callback taking the rows once they are stored in Supabase
+                    (runs from wait_for_spool)
     
     Returns:
-        Transformed match dictionary
+        Tuple of (upserted records, failed rows as {'row': record, 'error': message})
     """
-    transformed = {
-        # Match identifiers
-        'match_id': event.get('id'),
-        'slug': event.get('slug'),
-        'custom_id': event.get('customId'),
-        
-        # Player 1 (formerly homeTeam)
-        'player1_id': event.get('homeTeam', {}).get('id'),
-        'player1_name': event.get('homeTeam', {}).get('name'),
-        'player1_slug': event.get('homeTeam', {}).get('slug'),
-        'player1_short_name': event.get('homeTeam', {}).get('shortName'),
-        'player1_name_code': event.get('homeTeam', {}).get('nameCode'),
-        'player1_country': event.get('homeTeam', {}).get('country', {}).get('name'),
-        'player1_country_code': event.get('homeTeam', {}).get('country', {}).get('alpha2'),
-        'player1_gender': event.get('homeTeam', {}).get('gender'),
-        
-        # Player 2 (formerly awayTeam)
-        'player2_id': event.get('awayTeam', {}).get('id'),
-        'player2_name': event.get('awayTeam', {}).get('name'),
-        'player2_slug': event.get('awayTeam', {}).get('slug'),
-        'player2_short_name': event.get('awayTeam', {}).get('shortName'),
-        'player2_name_code': event.get('awayTeam', {}).get('nameCode'),
-        'player2_country': event.get('awayTeam', {}).get('country', {}).get('name'),
-        'player2_country_code': event.get('awayTeam', {}).get('country', {}).get('alpha2'),
-        'player2_gender': event.get('awayTeam', {}).get('gender'),
-        
-        # Scores - Player 1 (formerly homeScore)
-        'player1_score_current': event.get('homeScore', {}).get('current'),
-        'player1_score_display': event.get('homeScore', {}).get('display'),
-        'player1_set1_score': event.get('homeScore', {}).get('period1'),
-        'player1_set2_score': event.get('homeScore', {}).get('period2'),
-        'player1_set3_score': event.get('homeScore', {}).get('period3'),
-        'player1_set4_score': event.get('homeScore', {}).get('period4'),
-        'player1_set5_score': event.get('homeScore', {}).get('period5'),
-        'player1_set1_tiebreak': event.get('homeScore', {}).get('period1TieBreak'),
-        'player1_set2_tiebreak': event.get('homeScore', {}).get('period2TieBreak'),
-        'player1_set3_tiebreak': event.get('homeScore', {}).get('period3TieBreak'),
-        'player1_current_point': event.get('homeScore', {}).get('point'),
-        
-        # Scores - Player 2 (formerly awayScore)
-        'player2_score_current': event.get('awayScore', {}).get('current'),
-        'player2_score_display': event.get('awayScore', {}).get('display'),
-        'player2_set1_score': event.get('awayScore', {}).get('period1'),
-        'player2_set2_score': event.get('awayScore', {}).get('period2'),
-        'player2_set3_score': event.get('awayScore', {}).get('period3'),
-        'player2_set4_score': event.get('awayScore', {}).get('period4'),
-        'player2_set5_score': event.get('awayScore', {}).get('period5'),
-        'player2_set1_tiebreak': event.get('awayScore', {}).get('period1TieBreak'),
-        'player2_set2_tiebreak': event.get('awayScore', {}).get('period2TieBreak'),
-        'player2_set3_tiebreak': event.get('awayScore', {}).get('period3TieBreak'),
-        'player2_current_point': event.get('awayScore', {}).get('point'),
-        
-        # Match status and info
-        'status_code': event.get('status', {}).get('code'),
-        'status_description': event.get('status', {}).get('description'),
-        'status_type': event.get('status', {}).get('type'),
-        'winner_code': event.get('winnerCode'),
-        'first_to_serve': event.get('firstToServe'),
-        
-        # Tournament info
-        'tournament_id': event.get('tournament', {}).get('id'),
-        'tournament_name': event.get('tournament', {}).get('name'),
-        'tournament_slug': event.get('tournament', {}).get('slug'),
-        'unique_tournament_id': event.get('tournament', {}).get('uniqueTournament', {}).get('id'),
-        'unique_tournament_name': event.get('tournament', {}).get('uniqueTournament', {}).get('name'),
-        'unique_tournament_slug': event.get('tournament', {}).get('uniqueTournament', {}).get('slug'),
-        
-        # Category (ATP/WTA)
-        'category_id': event.get('tournament', {}).get('category', {}).get('id'),
-        'category_name': event.get('tournament', {}).get('category', {}).get('name'),
-        'category_slug': event.get('tournament', {}).get('category', {}).get('slug'),
-        
-        # Season and round
-        'season_id': event.get('season', {}).get('id'),
-        'season_name': event.get('season', {}).get('name'),
-        'season_year': event.get('season', {}).get('year'),
-        'round_number': event.get('roundInfo', {}).get('round'),
-        'round_name': event.get('roundInfo', {}).get('name'),
-        'round_type': event.get('roundInfo', {}).get('cupRoundType'),
-        
-        # Match details
-        'ground_type': event.get('groundType'),
-        'tennis_points': event.get('tournament', {}).get('uniqueTournament', {}).get('tennisPoints'),
-        'start_timestamp': event.get('startTimestamp'),
-        'has_highlights': event.get('hasGlobalHighlights', False),
-        
-        # Event filters
-        'gender': event.get('eventFilters', {}).get('gender', [None])[0] if event.get('eventFilters', {}).get('gender') else None,
-        'match_type': event.get('eventFilters', {}).get('category', [None])[0] if event.get('eventFilters', {}).get('category') else None,
-        'level': event.get('eventFilters', {}).get('level', [None])[0] if event.get('eventFilters', {}).get('level') else None,
-        'tournament_type': event.get('eventFilters', {}).get('tournament', [None])[0] if event.get('eventFilters', {}).get('tournament') else None,
-        
-        # Metadata
-        'processed_at': datetime.now().isoformat(),
-        'raw_data': json.dumps(event)  # Store complete original data as JSON
-    }
-    
-    # Convert timestamp to datetime if available
-    if transformed['start_timestamp']:
-        transformed['match_date'] = datetime.fromtimestamp(transformed['start_timestamp']).isoformat()
-    
-    return transformed
+    if batch_size is None:
+        batch_size = UPSERT_BATCH_SIZE
+    
+    # Fill player attributes the event lacks from the local players snapshot
+    snapshot = get_player_snapshot()
+    for record in records:
+        snapshot.enrich_match_row(record)
+    
+    # Upsert into Supabase (insert or update)
+    upserted, failed_rows = spool_upsert(
+        get_supabase(),
+        table_name,
+        records,
+        on_conflict='match_id',
+        batch_size=batch_size,
+        on_written=on_written
+    )
+    
+    for transformed_match in upserted:
+        match_info = f"{transformed_match.get('player1_short_name')} vs {transformed_match.get('player2_short_name')}"
+        tournament_info = f"{transformed_match.get('category_name')} - {transformed_match.get('tournament_name')}"
+        log(f"✓ Upserted: {match_info} | {tournament_info}", EVENTS)
+    
+    for failed in failed_rows:
+        row = failed['row']
+        print(f"✗ Failed to upsert match: {failed['error']}")
+        print(f"   Match: {row.get('player1_short_name')} vs {row.get('player2_short_name')}")
+    
+    return upserted, failed_rows
 
-def process_and_upsert_matches(matches_data, table_name='tennis_matches'):
+def process_and_upsert_matches(matches_data, table_name='tennis_matches', batch_size=None,
+                               match_state=None, skip_unchanged=True, payload_store=None, summary=None):
     """
     Process match data and upsert into Supabase
-    Only includes ATP/WTA singles events
+    Only includes ATP/WTA singles events that are new or changed since the last sync
     
     Args:
         matches_data: Raw JSON data from API (should have 'events' key)
         table_name: Supabase table name
+        batch_size: Rows per upsert request (defaults to UPSERT_BATCH_SIZE, 1 = one request per match)
+        match_state: MatchStateStore shared across dates (the caller saves it after
+                     wait_for_spool, which commits the rows that were stored)
+        skip_unchanged: If True, skip matches whose fingerprint matches the last sync
+        payload_store: raw_store.PayloadStore shared across dates (the caller saves it)
+        summary: MatchSyncSummary to fold upserted rows into instead of returning them
     
     Returns:
-        List of upserted records
+        List of upserted records (empty when a summary is given)
     """
     if not matches_data:
         print("No data to process")
@@ -288,45 +294,168 @@ def process_and_upsert_matches(matches_data, table_name='tennis_matches'):
         print("No events found in data")
         return []
     
-    print(f"Total events received: {len(events)}")
-    
-    # Filter events to only ATP/WTA singles
-    filtered_events = [event for event in events if should_include_event(event)]
-    
-    print(f"Events after filtering (ATP/WTA Singles only): {len(filtered_events)}")
+    return process_and_upsert_events(events, table_name, batch_size, match_state, skip_unchanged,
+                                     payload_store=payload_store, summary=summary)
+
+def process_and_upsert_events(events, table_name='tennis_matches', batch_size=None,
+                              match_state=None, skip_unchanged=True, include_raw=True,
+                              payload_store=None, summary=None):
+    """
+    Filter, transform and upsert events one at a time as they arrive
+    Transformed rows are buffered and sent once a full batch is ready, so the
+    events iterable can be a stream of any length
     
-    if not filtered_events:
-        print("No ATP/WTA singles events to process after filtering")
-        return []
+    Args:
+        events: Iterable of API events (list or stream_tennis_matches/iter_events generator)
+        table_name: Supabase table name
+        batch_size: Rows per upsert request (defaults to UPSERT_BATCH_SIZE, 1 = one request per match)
+        match_state: MatchStateStore shared across dates (the caller saves it)
+        skip_unchanged: If True, skip matches whose fingerprint matches the last sync
+        include_raw: If True, send the full event as raw_data with every row
+        payload_store: raw_store.PayloadStore shared across dates (the caller saves it);
+                       by default one is created for RAW_DATA_MODE 'table'/'local', and
+                       rows then carry raw_data_hash instead of raw_data
+        summary: MatchSyncSummary updated after every upsert batch; the batch's
+                 rows are then released instead of collected
     
+    Returns:
+        List of upserted records (empty when a summary is given)
+    """
+    if batch_size is None:
+        batch_size = UPSERT_BATCH_SIZE
+    
+    # One processed_at stamp for the whole run
+    processed_at = datetime.now().isoformat()
+    
+    # Drop matches that have not changed since they were last upserted
+    owns_state = skip_unchanged and match_state is None
+    if owns_state:
+        match_state = MatchStateStore()
+    
+    # Store each distinct raw payload once and reference it by hash
+    owns_payload_store = payload_store is None
+    if owns_payload_store:
+        payload_store = get_payload_store(get_supabase())
+    
+    total_count = 0
+    included_count = 0
+    skipped_count = 0
+    upserted_count = 0
     upserted_records = []
     failed_records = []
     
-    print(f"\nProcessing {len(filtered_events)} ATP/WTA singles matches...")
+    # Rows waiting for the next upsert, keyed by match_id so a match that appears
+    # twice is only sent once (PostgREST rejects duplicate conflict keys within a
+    # single upsert)
+    pending_rows = {}
+    pending_events = {}
+    event_filter = EventFilter()
+    metrics = get_metrics()
+    run_start = time.perf_counter()
+    filter_seconds = 0.0
+    transform_seconds = 0.0
+    transformed_count = 0
+    
+    def commit_state(rows):
+        match_state.commit(row['match_id'] for row in rows)
+    
+    def flush():
+        nonlocal upserted_count
+        if not pending_rows:
+            return
+        
+        # Payloads first, so every raw_data_hash points at a stored payload; rows whose
+        # payload failed are held back (and left uncommitted) to be retried next run
+        if payload_store is not None:
+            failed_hashes = payload_store.flush()
+            if failed_hashes:
+                print(f"⚠ {len(failed_hashes)} raw payload(s) could not be stored, holding back their matches")
+                for match_id, row in list(pending_rows.items()):
+                    if row.get('raw_data_hash') in failed_hashes:
+                        failed_records.append({'event': pending_events.get(match_id),
+                                               'error': f"raw payload {row['raw_data_hash']} not stored"})
+                        del pending_rows[match_id]
+        
+        # Fingerprints are committed once the writer stored the rows
+        upserted, failed_rows = sync_match_records(list(pending_rows.values()), table_name, batch_size,
+                                                   on_written=commit_state if match_state is not None else None)
+        
+        for failed in failed_rows:
+            row = failed['row']
+            failed_records.append({'event': pending_events.get(row['match_id']), 'error': failed['error']})
+        
+        upserted_count += len(upserted)
+        if summary is not None:
+            summary.add(upserted)
+        else:
+            upserted_records.extend(upserted)
+        pending_rows.clear()
+        pending_events.clear()
     
-    for event in filtered_events:
+    for event in events:
+        total_count += 1
+        
+        # Filter events to only ATP/WTA singles
+        start = time.perf_counter()
+        included = event_filter(event)
+        filter_seconds += time.perf_counter() - start
+        if not included:
+            continue
+        included_count += 1
+        
+        start = time.perf_counter()
+        encoded = encode_event(event) if payload_store is not None else None
+        
+        if match_state is not None and not match_state.accept(event, encoded[1] if encoded else None):
+            skipped_count += 1
+            transform_seconds += time.perf_counter() - start
+            continue
+        
         try:
             # Transform the match data
-            transformed_match = transform_match_data(event)
-            
-            # Upsert into Supabase (insert or update)
-            response = supabase.table(table_name).upsert(
-                transformed_match,
-                on_conflict='match_id'
-            ).execute()
-            
-            upserted_records.append(transformed_match)
-            match_info = f"{transformed_match.get('player1_short_name')} vs {transformed_match.get('player2_short_name')}"
-            tournament_info = f"{transformed_match.get('category_name')} - {transformed_match.get('tournament_name')}"
-            print(f"✓ Upserted: {match_info} | {tournament_info}")
-            
+            transformed_match = transform_match_data(event, processed_at, include_raw and payload_store is None)
         except Exception as e:
-            print(f"✗ Failed to upsert match: {e}")
-            match_info = f"{event.get('homeTeam', {}).get('shortName')} vs {event.get('awayTeam', {}).get('shortName')}"
-            print(f"   Match: {match_info}")
+            print(f"✗ Failed to transform match {event.get('id')}: {e}")
             failed_records.append({'event': event, 'error': str(e)})
-    
-    print(f"\n✓ Successfully upserted: {len(upserted_records)}")
+            metrics.count('transform', 'errors')
+            continue
+        
+        if payload_store is not None:
+            transformed_match['raw_data_hash'] = payload_store.add(event, encoded)
+        transform_seconds += time.perf_counter() - start
+        transformed_count += 1
+        
+        pending_rows[transformed_match['match_id']] = transformed_match
+        pending_events[transformed_match['match_id']] = event
+        
+        if len(pending_rows) >= batch_size:
+            flush()
+    
+    flush()
+    
+    if owns_state:
+        wait_and_warn()
+        match_state.save()
+    if owns_payload_store and payload_store is not None:
+        payload_store.save()
+    
+    metrics.add_time('process_matches', time.perf_counter() - run_start)
+    metrics.add_time('filter', filter_seconds)
+    metrics.count('filter', 'events_in', total_count)
+    metrics.count('filter', 'events_out', included_count)
+    metrics.add_time('transform', transform_seconds)
+    metrics.count('transform', 'events_in', included_count)
+    metrics.count('transform', 'unchanged', skipped_count)
+    metrics.count('transform', 'events_out', transformed_count)
+    
+    print(f"\nTotal events received: {total_count}")
+    print(f"Events after filtering (ATP/WTA Singles only): {included_count}")
+    event_filter.print_summary()
+    if match_state is not None:
+        print(f"Unchanged since last sync (skipped): {skipped_count}")
+    if owns_payload_store and payload_store is not None:
+        print(f"Raw payloads stored: {payload_store.written_count} new, {payload_store.reused_count} already stored")
+    print(f"✓ Successfully upserted: {upserted_count}")
     print(f"✗ Failed to upsert: {len(failed_records)}")
     
     if failed_records:
@@ -338,7 +467,8 @@ def process_and_upsert_matches(matches_data, table_name='tennis_matches'):
     
     return upserted_records
 
-def fetch_and_store_matches(date_str, table_name='tennis_matches'):
+def fetch_and_store_matches(date_str, table_name='tennis_matches', matches=None, match_state=None, stream=False,
+                            payload_store=None, summary=None):
     """
     Fetch matches for a date and store in Supabase
     Only ATP/WTA singles events are included
@@ -346,35 +476,89 @@ def fetch_and_store_matches(date_str, table_name='tennis_matches'):
     Args:
         date_str: Date in 'YYYY-MM-DD' format
         table_name: Supabase table name
+        matches: Already fetched API response for the date (skips the request)
+        match_state: MatchStateStore used to skip unchanged matches
+        stream: If True, process events while the response is still downloading
+        payload_store: raw_store.PayloadStore shared across dates
+        summary: MatchSyncSummary to fold upserted rows into instead of returning them
+    
+    Returns:
+        List of upserted records (empty when a summary is given), None if nothing was fetched
     """
     print(f"\n{'='*60}")
     print(f"Fetching and storing ATP/WTA Singles matches for {date_str}")
     print(f"{'='*60}\n")
     
-    # Fetch matches from API
-    matches = get_tennis_matches(date_str, save_to_file=True)
+    if stream and matches is None:
+        events = stream_tennis_matches(date_str, save_to_file=True)
+        return process_and_upsert_events(events, table_name, match_state=match_state,
+                                         payload_store=payload_store, summary=summary)
+    
+    # Fetch matches from API unless they were prefetched
+    if matches is None:
+        matches = get_tennis_matches(date_str, save_to_file=True)
+    else:
+        save_matches_file(matches, date_str)
     
     if not matches:
         print("No matches fetched from API")
         return None
     
     # Process and store in Supabase (with filtering)
-    results = process_and_upsert_matches(matches, table_name)
+    results = process_and_upsert_matches(matches, table_name, match_state=match_state,
+                                         payload_store=payload_store, summary=summary)
     
     return results
 
-def bulk_fetch_and_store(days_back=1, days_forward=2, table_name='tennis_matches'):
+def iter_date_payloads(date_strs, concurrent=True, concurrency=None, chunk_days=None):
+    """
+    Yield the API response of each date in order
+    Concurrent fetches go FETCH_CHUNK_DAYS dates at a time, so only one chunk
+    of payloads is in memory however wide the window is
+    
+    Args:
+        date_strs: Dates in 'YYYY-MM-DD' format
+        concurrent: If False, yield None for every date (fetched while processing)
+        concurrency: Maximum requests in flight
+        chunk_days: Dates per concurrent fetch (defaults to FETCH_CHUNK_DAYS)
+    
+    Yields:
+        Tuples of (date_str, matches_data or None)
+    """
+    if not concurrent:
+        for date_str in date_strs:
+            yield date_str, None
+        return
+    
+    chunk_days = chunk_days or FETCH_CHUNK_DAYS
+    for start in range(0, len(date_strs), chunk_days):
+        chunk = date_strs[start:start + chunk_days]
+        prefetched, _ = fetch_window(chunk, concurrency=concurrency)
+        for date_str in chunk:
+            yield date_str, prefetched.pop(date_str, None)
+
+def bulk_fetch_and_store(days_back=1, days_forward=2, table_name='tennis_matches', concurrent=True, concurrency=None,
+                         stream=False):
     """
     Fetch and store matches for multiple days
     Only ATP/WTA singles events are included
+    Each date is fetched, synced and folded into the summary before the next
+    one, so memory does not grow with the width of the window
     
     Args:
         days_back: Number of days in the past to fetch (default: 1 = yesterday)
         days_forward: Number of days in the future to fetch (default: 2 = tomorrow and day after)
         table_name: Supabase table name
+        concurrent: If True, fetch the window in chunks of dates over a pooled async client
+        concurrency: Maximum requests in flight when fetching concurrently
+        stream: If True, stream each date one at a time with flat memory (for wide
+                windows and backfills, takes precedence over concurrent)
+    
+    Returns:
+        MatchSyncSummary of the run
     """
     today = datetime.now()
-    all_results = {}
+    summary = MatchSyncSummary()
     
     print(f"\nFetching ATP/WTA Singles matches for:")
     print(f"  - {days_back} day(s) back")
@@ -384,58 +568,71 @@ def bulk_fetch_and_store(days_back=1, days_forward=2, table_name='tennis_matches
     print(f"\nFiltering: ATP/WTA Singles only")
     print(f"Excluding: Doubles, ITF, Challenger, Junior, Youth, Qualifying, etc.\n")
     
-    # Fetch past matches
-    for i in range(days_back, 0, -1):
-        date = today - timedelta(days=i)
-        date_str = date.strftime('%Y-%m-%d')
-        results = fetch_and_store_matches(date_str, table_name)
-        if results:
-            all_results[date_str] = results
-    
-    # Fetch today
-    today_str = today.strftime('%Y-%m-%d')
-    results = fetch_and_store_matches(today_str, table_name)
-    if results:
-        all_results[today_str] = results
-    
-    # Fetch future matches
-    for i in range(1, days_forward + 1):
-        date = today + timedelta(days=i)
-        date_str = date.strftime('%Y-%m-%d')
-        results = fetch_and_store_matches(date_str, table_name)
-        if results:
-            all_results[date_str] = results
+    # Past days, today, then future days
+    date_strs = [
+        (today + timedelta(days=offset)).strftime('%Y-%m-%d')
+        for offset in range(-days_back, days_forward + 1)
+    ]
+    
+    if stream:
+        concurrent = False
+    
+    match_state = MatchStateStore()
+    payload_store = get_payload_store(get_supabase())
+    
+    for date_str, matches in iter_date_payloads(date_strs, concurrent, concurrency):
+        if concurrent and not matches:
+            print(f"No matches fetched from API for {date_str}")
+            continue
+        results = fetch_and_store_matches(date_str, table_name, matches=matches,
+                                          match_state=match_state, stream=stream,
+                                          payload_store=payload_store, summary=summary)
+        if results is not None:
+            summary.dates += 1
+    
+    wait_and_warn()
+    match_state.save()
+    if payload_store is not None:
+        payload_store.save()
     
     print(f"\n{'='*60}")
     print(f"SUMMARY")
     print(f"{'='*60}")
-    print(f"Total dates processed: {len(all_results)}")
-    total_matches = sum(len(matches) for matches in all_results.values())
-    print(f"Total ATP/WTA Singles matches stored: {total_matches}")
-    
-    # Category breakdown
-    category_counts = {}
-    gender_counts = {}
-    for matches in all_results.values():
-        for match in matches:
-            category = match.get('category_name', 'Unknown')
-            gender = match.get('gender', 'Unknown')
-            category_counts[category] = category_counts.get(category, 0) + 1
-            gender_counts[gender] = gender_counts.get(gender, 0) + 1
+    print(f"Total dates processed: {summary.dates}")
+    print(f"Total ATP/WTA Singles matches stored: {summary.matches}")
+    print(f"Unchanged matches skipped: {match_state.skipped_count}")
+    if payload_store is not None:
+        print(f"Raw payloads stored: {payload_store.written_count} new, {payload_store.reused_count} already stored")
+    get_response_cache().print_summary()
+    print_spool_summary()
     
     print(f"\nBreakdown by category:")
-    for category, count in sorted(category_counts.items()):
+    for category, count in sorted(summary.category_counts.items(), key=lambda item: str(item[0])):
         print(f"  {category}: {count} matches")
     
-    return all_results
+    print(f"\nBreakdown by gender:")
+    for gender, count in sorted(summary.gender_counts.items(), key=lambda item: str(item[0])):
+        print(f"  {gender}: {count} matches")
+    
+    return summary
 
-# Example usage:
-if __name__ == "__main__":
+def main(argv=None):
+    """
+    Command line entry point: a single date (YYYY-MM-DD) or the default window
+
+    Args:
+        argv: Arguments after the script name (defaults to sys.argv[1:])
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    metrics = start_run('matches')
+    
+    # Writes a previous run could not deliver go first
+    replay_spool(get_supabase())
 
-        # Check if a date argument was provided
-    if len(sys.argv) > 1:
+    # Check if a date argument was provided
+    if argv:
         # Manual mode: Run for specific date
-        target_date = sys.argv[1]
+        target_date = argv[0]
         
         # Validate date format
         try:
@@ -458,13 +655,13 @@ if __name__ == "__main__":
         # Fetch and store for the specific date
         results = fetch_and_store_matches(target_date)
 
-        response = supabase.functions.invoke(
-            'process_unlogged_matches'
-        )
-
-        response = supabase.functions.invoke(
-            'update_all_team_points'
-        )
+        # Score only the matches that changed in this run (fetch_and_store_matches waited for the spool)
+        with metrics.timer('scoring'):
+            score_changed_matches(get_supabase(), results or [])
+        
+        # Statistics of the matches that finished in this run
+        with metrics.timer('enrich'):
+            enrich_matches(get_supabase(), results or [])
         
         if results:
             print(f"\n✓ Successfully processed {len(results)} matches")
@@ -490,20 +687,26 @@ if __name__ == "__main__":
         print()
         
         # Run the bulk fetch and store
-        results = bulk_fetch_and_store(
+        summary = bulk_fetch_and_store(
             days_back=1,      # Yesterday
             days_forward=2,   # Tomorrow and day after tomorrow
             table_name='tennis_matches'
         )
 
-        response = supabase.functions.invoke(
-            'process_unlogged_matches'
-        )
-
-        response = supabase.functions.invoke(
-            'update_all_team_points'
-        )
+        # Score only the matches that changed in this run (bulk_fetch_and_store waited for the spool)
+        with metrics.timer('scoring'):
+            score_changed_matches(get_supabase(), list(summary.scoring_records.values()))
+        
+        with metrics.timer('enrich'):
+            enrich_matches(get_supabase(), list(summary.scoring_records.values()))
         
         print("\n" + "="*60)
         print("COMPLETE!")
-        print("="*60)
\ No newline at end of file
+        print("="*60)
+
+    metrics.print_summary()
+    metrics.save()
+
+# Example usage:
+if __name__ == "__main__":
+    main()
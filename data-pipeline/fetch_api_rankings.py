@@ -3,103 +3,166 @@ import json
 from datetime import datetime, date
 import os
 import sys
-from supabase import create_client, Client
-from dotenv import load_dotenv
+import time
+from supabase_batch import DEFAULT_BATCH_SIZE
+from async_fetch import fetch_window, rankings_endpoint
+from metrics import get_metrics, start_run, log, EVENTS
+from clients import get_supabase, get_rapidapi_key
+from player_snapshot import get_player_snapshot
+from response_cache import get_response_cache
+from write_spool import spool_upsert, replay_spool, wait_and_warn, print_spool_summary
 
-# Load environment variables from .env file
-load_dotenv()
+# Configuration (credentials are read from the environment/.env on first use, see clients.py)
+UPSERT_BATCH_SIZE = int(os.getenv('UPSERT_BATCH_SIZE', DEFAULT_BATCH_SIZE))
 
-# Configuration
-RAPIDAPI_KEY = os.getenv('RAPIDAPI_KEY')
-SUPABASE_URL = os.getenv('SUPABASE_URL')
-SUPABASE_KEY = os.getenv('SUPABASE_KEY')
-
-# Initialize Supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-def get_rankings(ranking_type='atp'):
+def get_rankings(ranking_type='atp', ranking_date=None, use_cache=True):
     """
     Fetch player rankings from API
     
     Args:
         ranking_type: 'atp' or 'wta'
+        ranking_date: Ranking date the response is cached for (defaults to today)
+        use_cache: If False, always request (the fresh response is still cached)
     
     Returns:
         Raw JSON data from API
     """
+    cache = get_response_cache()
+    rankings_data = cache.get_rankings(ranking_type, ranking_date) if use_cache else None
+    if rankings_data is not None:
+        return rankings_data
+    
     conn = http.client.HTTPSConnection("tennisapi1.p.rapidapi.com")
     
     headers = {
-        'x-rapidapi-key': RAPIDAPI_KEY,
+        'x-rapidapi-key': get_rapidapi_key(),
         'x-rapidapi-host': "tennisapi1.p.rapidapi.com"
     }
     
-    endpoint = f"/api/tennis/rankings/{ranking_type}"
+    endpoint = rankings_endpoint(ranking_type)
     
     print(f"Requesting: {endpoint}")
     
+    metrics = get_metrics()
+    metrics.count('fetch_rankings', 'requests')
+    
     try:
+        start = time.perf_counter()
         conn.request("GET", endpoint, headers=headers)
         res = conn.getresponse()
         data = res.read()
+        metrics.observe_latency('fetch_rankings', time.perf_counter() - start)
+        metrics.count('fetch_rankings', 'bytes_downloaded', len(data))
         
         if res.status != 200:
+            metrics.count('fetch_rankings', 'errors')
             print(f"✗ Error: HTTP {res.status}")
             print(f"Response: {data.decode('utf-8')[:500]}")
             return None
         
         if not data:
+            metrics.count('fetch_rankings', 'errors')
             print("✗ Empty response")
             return None
         
-        rankings_data = json.loads(data.decode("utf-8"))
+        with metrics.timer('parse'):
+            rankings_data = json.loads(data.decode("utf-8"))
+        cache.put_rankings(ranking_type, rankings_data, ranking_date)
         return rankings_data
         
     except Exception as e:
+        metrics.count('fetch_rankings', 'errors')
         print(f"✗ Error fetching {ranking_type.upper()} rankings: {e}")
         return None
     finally:
         conn.close()
 
-def upsert_player(player_data):
+def build_player_record(player_data):
+    """
+    Build a players table row from rankings API player data
+    
+    Args:
+        player_data: Player data from rankings API
+    
+    Returns:
+        Player record dictionary
+    """
+    return {
+        'player_id': player_data.get('id'),
+        'name': player_data.get('name'),
+        'slug': player_data.get('slug'),
+        'short_name': player_data.get('shortName'),
+        'name_code': player_data.get('nameCode'),
+        'country': player_data.get('country', {}).get('name'),
+        'country_code': player_data.get('country', {}).get('alpha2'),
+        'gender': player_data.get('gender'),
+        'disabled': player_data.get('disabled', False),
+        'national': player_data.get('national', False),
+        'type': player_data.get('type'),
+        'team_colors': json.dumps(player_data.get('teamColors', {}))
+    }
+
+def build_ranking_record(ranking_entry, player_id, ranking_type, ranking_date):
+    """
+    Build a player_rankings table row from a ranking entry
+    
+    Args:
+        ranking_entry: Single ranking entry from API
+        player_id: ID of the ranked player
+        ranking_type: 'atp' or 'wta'
+        ranking_date: Date of the ranking (YYYY-MM-DD)
+    
+    Returns:
+        Ranking record dictionary
+    """
+    return {
+        'player_id': player_id,
+        'ranking_date': ranking_date,
+        'ranking_type': ranking_type,
+        'rank': ranking_entry.get('ranking'),
+        'points': ranking_entry.get('points'),
+        'ranking_movement': ranking_entry.get('rankingMovement'),
+        'tournaments_played': ranking_entry.get('tournamentsPlayed')
+    }
+
+def upsert_player(player_data, snapshot=None):
     """
     Insert or update player in players table
+    Waits for the write spool, so the player exists before a ranking references it
     
     Args:
         player_data: Player data from rankings API
+        snapshot: PlayerSnapshot; players identical to their snapshot row are not written,
+                  written ones are committed once the writer stored them
     
     Returns:
-        Player ID
+        Player ID, None if the player could not be written
     """
     try:
-        player_record = {
-            'player_id': player_data.get('id'),
-            'name': player_data.get('name'),
-            'slug': player_data.get('slug'),
-            'short_name': player_data.get('shortName'),
-            'name_code': player_data.get('nameCode'),
-            'country': player_data.get('country', {}).get('name'),
-            'country_code': player_data.get('country', {}).get('alpha2'),
-            'gender': player_data.get('gender'),
-            'disabled': player_data.get('disabled', False),
-            'national': player_data.get('national', False),
-            'type': player_data.get('type'),
-            'team_colors': json.dumps(player_data.get('teamColors', {}))
-        }
+        player_record = build_player_record(player_data)
+        if snapshot is not None and not snapshot.changed_records([player_record]):
+            return player_data.get('id')
         
-        # Upsert player
-        response = supabase.table('players').upsert(
-            player_record,
-            on_conflict='player_id'
-        ).execute()
+        stored = []
+        def player_written(rows):
+            stored.extend(rows)
+            if snapshot is not None:
+                snapshot.commit(rows)
         
+        # Upsert player
+        spool_upsert(get_supabase(), 'players', [player_record], on_conflict='player_id',
+                     on_written=player_written)
+        wait_and_warn()
+        if not stored:
+            print(f"✗ Player {player_data.get('name')} was not written")
+            return None
         return player_data.get('id')
         
     except Exception as e:
         print(f"✗ Failed to upsert player {player_data.get('name')}: {e}")
         return None
 
-def insert_ranking(ranking_entry, ranking_type, ranking_date):
+def insert_ranking(ranking_entry, ranking_type, ranking_date, snapshot=None, on_written=None):
     """
     Insert ranking record for a player
     
@@ -107,6 +170,8 @@ def insert_ranking(ranking_entry, ranking_type, ranking_date):
         ranking_entry: Single ranking entry from API
         ranking_type: 'atp' or 'wta'
         ranking_date: Date of the ranking (YYYY-MM-DD)
+        snapshot: PlayerSnapshot used to skip unchanged players
+        on_written: Optional callback taking the ranking rows once they are stored
     
     Returns:
         True if successful, False otherwise
@@ -118,26 +183,16 @@ def insert_ranking(ranking_entry, ranking_type, ranking_date):
             print(f"✗ No player data found in ranking entry")
             return False
         
-        player_id = upsert_player(player_data)
+        player_id = upsert_player(player_data, snapshot)
         if not player_id:
             return False
         
         # Then insert the ranking
-        ranking_record = {
-            'player_id': player_id,
-            'ranking_date': ranking_date,
-            'ranking_type': ranking_type,
-            'rank': ranking_entry.get('ranking'),
-            'points': ranking_entry.get('points'),
-            'ranking_movement': ranking_entry.get('rankingMovement'),
-            'tournaments_played': ranking_entry.get('tournamentsPlayed')
-        }
+        ranking_record = build_ranking_record(ranking_entry, player_id, ranking_type, ranking_date)
         
         # Upsert ranking (update if exists for same player/date/type)
-        response = supabase.table('player_rankings').upsert(
-            ranking_record,
-            on_conflict='player_id,ranking_date,ranking_type'
-        ).execute()
+        spool_upsert(get_supabase(), 'player_rankings', [ranking_record],
+                     on_conflict='player_id,ranking_date,ranking_type', on_written=on_written)
         
         return True
         
@@ -145,7 +200,125 @@ def insert_ranking(ranking_entry, ranking_type, ranking_date):
         print(f"✗ Failed to insert ranking: {e}")
         return False
 
-def process_rankings(rankings_data, ranking_type, ranking_date=None):
+def bulk_insert_rankings(rankings, ranking_type, ranking_date, batch_size=None, snapshot=None, on_written=None):
+    """
+    Store a full rankings list with chunked bulk upserts
+    Builds the deduplicated player set and the ranking rows in memory,
+    writes new or changed players first, then the rankings of the players that made it in
+    
+    Args:
+        rankings: List of ranking entries from API
+        ranking_type: 'atp' or 'wta'
+        ranking_date: Date of the ranking (YYYY-MM-DD)
+        batch_size: Rows per upsert request (defaults to UPSERT_BATCH_SIZE)
+        snapshot: PlayerSnapshot; players identical to their snapshot row are not written,
+                  written ones are committed once the writer stored them
+        on_written: Optional callback taking the ranking rows once they are stored
+    
+    Returns:
+        Tuple of (successful ranking entries, failed count)
+    """
+    if batch_size is None:
+        batch_size = UPSERT_BATCH_SIZE
+    
+    players_by_id = {}
+    ranked_entries = {}
+    failed_count = 0
+    
+    for ranking_entry in rankings:
+        player_data = ranking_entry.get('team') or ranking_entry.get('player')
+        if not player_data or not player_data.get('id'):
+            print(f"✗ No player data found in ranking entry (rank {ranking_entry.get('ranking')})")
+            failed_count += 1
+            continue
+        
+        player_id = player_data.get('id')
+        players_by_id[player_id] = build_player_record(player_data)
+        ranked_entries[player_id] = ranking_entry
+    
+    player_records = list(players_by_id.values())
+    if snapshot is not None:
+        player_records = snapshot.changed_records(player_records)
+        print(f"Players: {len(player_records)} new or changed, {len(players_by_id) - len(player_records)} unchanged")
+    
+    stored_players = set()
+    def players_written(rows):
+        stored_players.update(row['player_id'] for row in rows)
+        if snapshot is not None:
+            snapshot.commit(rows)
+    
+    upserted_players, failed_players = spool_upsert(
+        get_supabase(),
+        'players',
+        player_records,
+        on_conflict='player_id',
+        batch_size=batch_size,
+        on_written=players_written
+    )
+    
+    for failed in failed_players:
+        player_record = failed['row']
+        print(f"✗ Failed to upsert player {player_record.get('name')}: {failed['error']}")
+        ranked_entries.pop(player_record['player_id'], None)
+        failed_count += 1
+    
+    # Players must exist before their rankings reference them: only rank the ones the writer stored
+    wait_and_warn()
+    for player_record in player_records:
+        if player_record['player_id'] not in stored_players and player_record['player_id'] in ranked_entries:
+            print(f"✗ Player {player_record.get('name')} was not written, skipping the ranking")
+            ranked_entries.pop(player_record['player_id'])
+            failed_count += 1
+    
+    ranking_records = [
+        build_ranking_record(ranking_entry, player_id, ranking_type, ranking_date)
+        for player_id, ranking_entry in ranked_entries.items()
+    ]
+    
+    # Upsert rankings (update if exists for same player/date/type)
+    upserted_rankings, failed_rankings = spool_upsert(
+        get_supabase(),
+        'player_rankings',
+        ranking_records,
+        on_conflict='player_id,ranking_date,ranking_type',
+        batch_size=batch_size,
+        on_written=on_written
+    )
+    
+    for failed in failed_rankings:
+        ranking_record = failed['row']
+        print(f"✗ Failed to insert ranking for player {ranking_record.get('player_id')}: {failed['error']}")
+        failed_count += 1
+    
+    successful = [ranked_entries[record['player_id']] for record in upserted_rankings]
+    return successful, failed_count
+
+def record_ranking_history(ranking_entries, ranking_type, ranking_date):
+    """
+    Append stored rankings to the local ranking history (ranking_history.py)
+    
+    Args:
+        ranking_entries: Ranking entries that were written to player_rankings
+        ranking_type: 'atp' or 'wta'
+        ranking_date: Date of the ranking (YYYY-MM-DD)
+    """
+    if not ranking_entries:
+        return
+    try:
+        from ranking_history import get_ranking_history
+        
+        records = []
+        for ranking_entry in ranking_entries:
+            player_data = ranking_entry.get('team') or ranking_entry.get('player') or {}
+            records.append(build_ranking_record(ranking_entry, player_data.get('id'), ranking_type, ranking_date))
+        
+        history = get_ranking_history(ranking_type)
+        history.append(ranking_date, records)
+        history.save()
+    except Exception as e:
+        print(f"⚠ Could not update the local {ranking_type.upper()} ranking history: {e}")
+
+def process_rankings(rankings_data, ranking_type, ranking_date=None, bulk=True):
     """
     Process and store rankings data
     
@@ -153,6 +326,8 @@ def process_rankings(rankings_data, ranking_type, ranking_date=None):
         rankings_data: Raw JSON from API
         ranking_type: 'atp' or 'wta'
         ranking_date: Date string (YYYY-MM-DD), defaults to today
+        bulk: If True, write players and rankings with chunked bulk upserts,
+              otherwise make two requests per ranking entry
     
     Returns:
         Number of rankings processed
@@ -174,31 +349,67 @@ def process_rankings(rankings_data, ranking_type, ranking_date=None):
     
     print(f"\nProcessing {len(rankings)} {ranking_type.upper()} rankings for {ranking_date}...")
     
-    success_count = 0
-    failed_count = 0
+    metrics = get_metrics()
+    start = time.perf_counter()
+    snapshot = get_player_snapshot()
+    unchanged_before = snapshot.unchanged_count
     
-    for ranking_entry in rankings:
-        if insert_ranking(ranking_entry, ranking_type, ranking_date):
-            player_name = ranking_entry.get('team', {}).get('name') or ranking_entry.get('player', {}).get('name', 'Unknown')
-            rank = ranking_entry.get('ranking')
-            points = ranking_entry.get('points')
-            print(f"✓ Rank {rank}: {player_name} ({points} pts)")
-            success_count += 1
-        else:
-            failed_count += 1
+    # Players whose ranking row the writer stored
+    written_ids = set()
+    def ranking_written(rows):
+        written_ids.update(row['player_id'] for row in rows)
+    
+    if bulk:
+        successful, failed_count = bulk_insert_rankings(rankings, ranking_type, ranking_date, snapshot=snapshot,
+                                                        on_written=ranking_written)
+    else:
+        successful = []
+        failed_count = 0
+        for ranking_entry in rankings:
+            if insert_ranking(ranking_entry, ranking_type, ranking_date, snapshot, on_written=ranking_written):
+                successful.append(ranking_entry)
+            else:
+                failed_count += 1
+    
+    # The snapshot, the history and the counts only include what reached Supabase
+    wait_and_warn()
+    snapshot.save()
+    
+    stored = [ranking_entry for ranking_entry in successful
+              if (ranking_entry.get('team') or ranking_entry.get('player') or {}).get('id') in written_ids]
+    if len(stored) < len(successful):
+        print(f"✗ {len(successful) - len(stored)} ranking(s) were not written")
+        failed_count += len(successful) - len(stored)
+        successful = stored
+    record_ranking_history(successful, ranking_type, ranking_date)
+    
+    for ranking_entry in successful:
+        player_name = ranking_entry.get('team', {}).get('name') or ranking_entry.get('player', {}).get('name', 'Unknown')
+        rank = ranking_entry.get('ranking')
+        points = ranking_entry.get('points')
+        log(f"✓ Rank {rank}: {player_name} ({points} pts)", EVENTS)
+    
+    success_count = len(successful)
+    
+    metrics.add_time('process_rankings', time.perf_counter() - start)
+    metrics.count('process_rankings', 'events_in', len(rankings))
+    metrics.count('process_rankings', 'events_out', success_count)
+    metrics.count('process_rankings', 'errors', failed_count)
+    metrics.count('process_rankings', 'players_unchanged', snapshot.unchanged_count - unchanged_before)
     
     print(f"\n✓ Successfully processed: {success_count}")
     print(f"✗ Failed to process: {failed_count}")
     
     return success_count
 
-def fetch_and_store_rankings(ranking_types=['atp', 'wta'], ranking_date=None):
+def fetch_and_store_rankings(ranking_types=['atp', 'wta'], ranking_date=None, concurrent=True):
     """
     Fetch and store rankings for ATP and/or WTA
     
     Args:
         ranking_types: List of ranking types to fetch ['atp', 'wta']
         ranking_date: Date string (YYYY-MM-DD), defaults to today
+        concurrent: If True, fetch all ranking types at once over a pooled async client
     """
     if ranking_date is None:
         ranking_date = date.today().isoformat()
@@ -209,13 +420,20 @@ def fetch_and_store_rankings(ranking_types=['atp', 'wta'], ranking_date=None):
     
     total_processed = 0
     
+    prefetched = {}
+    if concurrent:
+        _, prefetched = fetch_window(ranking_types=ranking_types, ranking_date=ranking_date)
+    
     for ranking_type in ranking_types:
         print(f"\n{'='*60}")
         print(f"Fetching {ranking_type.upper()} Rankings")
         print(f"{'='*60}\n")
         
-        # Fetch rankings from API
-        rankings_data = get_rankings(ranking_type)
+        # Fetch rankings from API unless they were prefetched
+        if concurrent:
+            rankings_data = prefetched.get(ranking_type)
+        else:
+            rankings_data = get_rankings(ranking_type, ranking_date)
         
         if not rankings_data:
             print(f"Failed to fetch {ranking_type.upper()} rankings")
@@ -230,16 +448,29 @@ def fetch_and_store_rankings(ranking_types=['atp', 'wta'], ranking_date=None):
     print(f"{'='*60}")
     print(f"Total rankings processed: {total_processed}")
     print(f"Date: {ranking_date}")
+    get_response_cache().print_summary()
+    print_spool_summary()
     print("="*60)
     
     return total_processed
 
-# Main execution
-if __name__ == "__main__":
+def main(argv=None):
+    """
+    Command line entry point: rankings for a date (YYYY-MM-DD) or for today
+
+    Args:
+        argv: Arguments after the script name (defaults to sys.argv[1:])
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    metrics = start_run('rankings')
+    
+    # Writes a previous run could not deliver go first
+    replay_spool(get_supabase())
+    
     # Check if a date argument was provided
-    if len(sys.argv) > 1:
+    if argv:
         # Manual mode with specific date
-        target_date = sys.argv[1]
+        target_date = argv[0]
         
         # Validate date format
         try:
@@ -256,4 +487,11 @@ if __name__ == "__main__":
         print(f"\n📅 Scheduled mode: Fetching today's rankings\n")
         fetch_and_store_rankings(ranking_types=['atp', 'wta'])
     
-    print("\n✅ COMPLETE!\n")
\ No newline at end of file
+    print("\n✅ COMPLETE!\n")
+    
+    metrics.print_summary()
+    metrics.save()
+
+# Main execution
+if __name__ == "__main__":
+    main()
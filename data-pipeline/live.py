@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Live-score daemon with adaptive polling
+
+Keeps the last payload per date and only polls a date again when it is due.
+The interval for a date follows its ATP/WTA singles matches:
+    in progress               LIVE_POLL_INTERVAL (points are being played)
+    interrupted / starting    LIVE_SOON_INTERVAL (start within LIVE_SOON_WINDOW or late)
+    later today               wakes up LIVE_SOON_WINDOW before the next start
+    finished / empty          LIVE_IDLE_INTERVAL, doubling while nothing changes up to LIVE_MAX_INTERVAL
+Only events that differ from the previous payload are pushed to the sync
+stage, and finished matches among them are scored and enriched right away.
+The stored payload only takes in events once they are synced, so an event
+whose sync failed is still seen as changed by the next poll.
+
+Usage:
+    python live.py
+    python live.py --days-back 1 --days-forward 0 --max-cycles 10
+"""
+
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+from functools import partial
+
+from async_fetch import fetch_window
+from change_detection import MatchStateStore
+from event_filter import EventFilter
+
+LIVE_POLL_INTERVAL = int(os.getenv('LIVE_POLL_INTERVAL', 30))
+LIVE_SOON_INTERVAL = int(os.getenv('LIVE_SOON_INTERVAL', 120))
+LIVE_SOON_WINDOW = int(os.getenv('LIVE_SOON_WINDOW', 900))
+LIVE_IDLE_INTERVAL = int(os.getenv('LIVE_IDLE_INTERVAL', 1800))
+LIVE_MAX_INTERVAL = int(os.getenv('LIVE_MAX_INTERVAL', 6 * 3600))
+
+STATUS_LIVE = 'inprogress'
+STATUS_NOT_STARTED = 'notstarted'
+STATUS_INTERRUPTED = ('interrupted', 'suspended', 'delayed')
+
+def next_interval(events, now, previous_interval=None, changed=True):
+    """
+    Seconds until a date should be polled again
+
+    Args:
+        events: Included (ATP/WTA singles) events from the date's last payload
+        now: Current unix timestamp
+        previous_interval: Interval used for the previous poll of this date
+        changed: Whether the last poll changed any event
+
+    Returns:
+        Interval in seconds
+    """
+    upcoming = []
+    for event in events:
+        status_type = (event.get('status') or {}).get('type')
+        if status_type == STATUS_LIVE:
+            return LIVE_POLL_INTERVAL
+        if status_type in STATUS_INTERRUPTED:
+            upcoming.append(now)
+        elif status_type == STATUS_NOT_STARTED:
+            upcoming.append(event.get('startTimestamp') or now)
+
+    if upcoming:
+        wait = min(upcoming) - LIVE_SOON_WINDOW - now
+        return int(min(max(wait, LIVE_SOON_INTERVAL), LIVE_IDLE_INTERVAL))
+
+    # Day is over: back off while nothing changes
+    if changed or previous_interval is None:
+        return LIVE_IDLE_INTERVAL
+    return min(max(previous_interval, LIVE_IDLE_INTERVAL) * 2, LIVE_MAX_INTERVAL)
+
+class LiveDay:
+    """Last payload and polling schedule for one date"""
+
+    def __init__(self, date_str):
+        self.date_str = date_str
+        self.events = {}        # match_id -> last seen ATP/WTA singles event
+        self.interval = None
+        self.next_poll = 0
+        self.polls = 0
+
+    def diff(self, events):
+        """
+        Events of a new payload that differ from the stored one (the payload is not replaced)
+
+        Args:
+            events: Included events of the new payload
+
+        Returns:
+            List of new or modified events
+        """
+        return [event for event in events if self.events.get(event.get('id')) != event]
+
+    def commit(self, events, failed_ids=()):
+        """
+        Replace the stored payload once its changes are synced
+
+        Args:
+            events: Included events of the new payload
+            failed_ids: Match ids whose sync failed; their previous version is kept
+        """
+        previous = self.events
+        self.events = {}
+        for event in events:
+            match_id = event.get('id')
+            if match_id not in failed_ids:
+                self.events[match_id] = event
+            elif match_id in previous:
+                self.events[match_id] = previous[match_id]
+
+class LiveScoreDaemon:
+    """
+    Polls a rolling window of dates and syncs only changed matches
+
+    Args:
+        days_back: Days before today to keep in the window
+        days_forward: Days after today to keep in the window
+        table_name: Supabase table name
+        fetch: Function mapping a list of dates to ({date_str: matches_data}, ...);
+               the default always requests, the polling schedule decides freshness
+        sync: Function taking (events, match_state) and returning upserted records
+        clock: Function returning the current unix timestamp
+        sleep: Function sleeping for a number of seconds
+    """
+
+    def __init__(self, days_back=1, days_forward=1, table_name='tennis_matches', fetch=None, sync=None,
+                 clock=time.time, sleep=time.sleep):
+        self.days_back = days_back
+        self.days_forward = days_forward
+        self.table_name = table_name
+        self.fetch = fetch or partial(fetch_window, use_cache=False)
+        self.sync = sync or self._sync
+        self.clock = clock
+        self.sleep = sleep
+        self.days = {}
+        self.match_state = MatchStateStore()
+        self.api_calls = 0
+        self.synced_count = 0
+
+    def _sync(self, events, match_state):
+        from clients import get_supabase
+        from fetch_api_matches import process_and_upsert_events
+        from match_enrichment import enrich_matches
+        from scoring import score_changed_matches
+        from write_spool import wait_for_spool
+
+        upserted = process_and_upsert_events(events, self.table_name, match_state=match_state)
+        try:
+            wait_for_spool()
+        except RuntimeError as e:
+            # Rows still spooled stay pending in match_state, so poll_once retries them
+            print(f"⚠ {e}, scoring deferred")
+            return upserted
+        # Score and enrich only the rows the writer stored
+        stored = [record for record in upserted if str(record['match_id']) not in match_state.pending]
+        score_changed_matches(get_supabase(), stored)
+        enrich_matches(get_supabase(), stored)
+        return upserted
+
+    def window(self):
+        """Dates currently tracked, as 'YYYY-MM-DD' strings"""
+        today = datetime.fromtimestamp(self.clock())
+        return [(today + timedelta(days=offset)).strftime('%Y-%m-%d')
+                for offset in range(-self.days_back, self.days_forward + 1)]
+
+    def _roll_window(self):
+        dates = self.window()
+        for date_str in list(self.days):
+            if date_str not in dates:
+                print(f"⊘ {date_str} left the live window")
+                del self.days[date_str]
+        for date_str in dates:
+            if date_str not in self.days:
+                self.days[date_str] = LiveDay(date_str)
+
+    def poll_once(self):
+        """
+        Fetch every due date, sync its changed events and reschedule it
+
+        Returns:
+            Number of records upserted in this cycle
+        """
+        self._roll_window()
+        now = self.clock()
+        due = [day for day in self.days.values() if day.next_poll <= now]
+        if not due:
+            return 0
+
+        matches_by_date, _ = self.fetch([day.date_str for day in due])
+        self.api_calls += len(due)
+
+        upserted_count = 0
+        for day in due:
+            day.polls += 1
+            matches = matches_by_date.get(day.date_str)
+            if matches is None:
+                # Failed request: keep the old payload and retry soon
+                day.interval = min(max((day.interval or 0) * 2, LIVE_SOON_INTERVAL), LIVE_IDLE_INTERVAL)
+                day.next_poll = now + day.interval
+                continue
+
+            event_filter = EventFilter()
+            events = [event for event in matches.get('events', []) if event_filter(event)]
+            changed = day.diff(events)
+
+            failed_ids = set()
+            if changed:
+                changed_ids = {event.get('id') for event in changed}
+                for match_id in changed_ids:
+                    self.match_state.pending.pop(str(match_id), None)
+                try:
+                    upserted = self.sync(changed, self.match_state)
+                    upserted_count += len(upserted or [])
+                    # Changed events the sync accepted but did not commit failed to be written
+                    failed_ids = {match_id for match_id in changed_ids if str(match_id) in self.match_state.pending}
+                except Exception as e:
+                    print(f"✗ {day.date_str}: sync failed, retrying on the next poll: {e}")
+                    failed_ids = changed_ids
+            day.commit(events, failed_ids)
+
+            if failed_ids:
+                day.interval = min(day.interval or LIVE_POLL_INTERVAL, LIVE_SOON_INTERVAL)
+                day.next_poll = now + day.interval
+                print(f"⚠ {day.date_str}: {len(failed_ids)} event(s) not synced, next poll in {day.interval}s")
+                continue
+
+            day.interval = next_interval(events, now, day.interval, bool(changed))
+            day.next_poll = now + day.interval
+            print(f"✓ {day.date_str}: {len(changed)} changed event(s), next poll in {day.interval}s")
+
+        self.synced_count += upserted_count
+        self.match_state.save()
+        return upserted_count
+
+    def seconds_until_due(self):
+        """Seconds until the next date is due"""
+        if not self.days:
+            return 0
+        return max(0, min(day.next_poll for day in self.days.values()) - self.clock())
+
+    def run(self, max_cycles=None):
+        """
+        Poll until interrupted (or for max_cycles polling cycles)
+
+        Returns:
+            Number of polling cycles run
+        """
+        cycles = 0
+        print(f"Live mode: {self.days_back} day(s) back, {self.days_forward} day(s) forward")
+        try:
+            while max_cycles is None or cycles < max_cycles:
+                self.poll_once()
+                cycles += 1
+                if max_cycles is not None and cycles >= max_cycles:
+                    break
+                # Wake at least every LIVE_IDLE_INTERVAL so the window rolls over at midnight
+                self.sleep(min(self.seconds_until_due(), LIVE_IDLE_INTERVAL))
+        except KeyboardInterrupt:
+            print("\nStopping live mode")
+        finally:
+            self.match_state.save()
+            print(f"API calls: {self.api_calls}, records synced: {self.synced_count}")
+        return cycles
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Poll live tennis scores with adaptive intervals")
+    parser.add_argument('--days-back', type=int, default=1, help="Days before today to track")
+    parser.add_argument('--days-forward', type=int, default=1, help="Days after today to track")
+    parser.add_argument('--table', default='tennis_matches', help="Supabase table name")
+    parser.add_argument('--max-cycles', type=int, default=None, help="Stop after this many polling cycles")
+    args = parser.parse_args(argv)
+
+    from clients import get_supabase
+    from write_spool import replay_spool
+    replay_spool(get_supabase())
+
+    daemon = LiveScoreDaemon(days_back=args.days_back, days_forward=args.days_forward, table_name=args.table)
+    daemon.run(max_cycles=args.max_cycles)
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,497 @@
 #!/usr/bin/env python3
 """
-Main script to fetch and sync tennis data
+Nightly pipeline: rankings and matches as a resumable stage graph
+
+Stages and their dependencies:
+    fetch_rankings                      RapidAPI rankings -> run folder
+    fetch_matches                       RapidAPI events -> raw archive
+    sync_rankings   <- fetch_rankings   players / player_rankings
+    transform       <- fetch_matches    changed ATP/WTA singles rows -> run folder
+    sync_matches    <- transform        tennis_matches
+    score           <- sync_matches     match_points / teams
+    enrich          <- sync_matches     statistics of newly finished matches -> match_statistics
+    publish         <- score,           frontend read models (data/*.json)
+                       sync_rankings
+
+Supabase writes of the sync stages go through the write-behind spool
+(write_spool.py); writes left over by an earlier run are replayed first.
+
+A stage starts as soon as its dependencies are done, so the rankings branch
+runs alongside the matches branch; their requests share one RapidAPI rate
+limit (async_fetch.shared_limits). Each run keeps a checkpoint under
+.pipeline_state/runs/<run_id>/; rerunning with the same dates resumes the
+last unfinished run from the first stage that did not complete, and
+fetch_matches only refetches the dates that are still missing.
+
+Also the single entry point for the other pipeline commands:
+    python main.py                      nightly run (same as `main.py nightly`)
+    python main.py --days-back 2 --days-forward 1
+    python main.py --fresh
+    python main.py --no-cache           request everything, ignoring the response cache
+    python main.py matches [YYYY-MM-DD]
+    python main.py rankings [YYYY-MM-DD]
+    python main.py replay --from 2026-01-01 --to 2026-01-28 --dry-run
+    python main.py live --max-cycles 10
+    python main.py publish --force
+    python main.py history top --type atp -n 20
+    python main.py spool status
 """
 
+import argparse
+import glob
+import json
 import os
+import shutil
 import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import date, datetime, timedelta
+from threading import Lock
 
 # Make sure we can import from current directory
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-# Now import
-from fetch_matches import fetch_yesterday_and_today, save_to_file
-from sync_to_supabase import sync_all
+from change_detection import STATE_FOLDER, MatchStateStore
+from metrics import start_run
+from response_cache import get_response_cache
+from write_spool import replay_spool, wait_and_warn, print_spool_summary
+
+RUNS_FOLDER = os.path.join(STATE_FOLDER, 'runs')
+RUNS_TO_KEEP = 10
+RANKING_TYPES = ['atp', 'wta']
+
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+STATUS_SKIPPED = 'skipped'
+
+class PipelineRun:
+    """
+    Checkpoint of one pipeline run
+
+    checkpoint.json holds the run parameters and the status, output and
+    timing of every stage; larger stage outputs are separate files in the
+    same folder.
+    """
+
+    def __init__(self, folder, run_id, params, stages=None):
+        self.folder = folder
+        self.run_id = run_id
+        self.params = params
+        self.stages = stages or {}
+        self._lock = Lock()
+
+    @classmethod
+    def create(cls, params, runs_folder=RUNS_FOLDER):
+        run_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+        run = cls(os.path.join(runs_folder, run_id), run_id, params)
+        os.makedirs(run.folder, exist_ok=True)
+        run.save()
+        return run
+
+    @classmethod
+    def load(cls, folder):
+        with open(os.path.join(folder, 'checkpoint.json'), 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        return cls(folder, checkpoint['run_id'], checkpoint['params'], checkpoint['stages'])
+
+    def path(self, name):
+        return os.path.join(self.folder, name)
+
+    def write_json(self, name, data):
+        tmp_path = f"{self.path(name)}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path(name))
+
+    def read_json(self, name, default=None):
+        if not os.path.exists(self.path(name)):
+            return default
+        with open(self.path(name), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def status(self, stage_name):
+        return self.stages.get(stage_name, {}).get('status')
+
+    def output(self, stage_name):
+        return self.stages.get(stage_name, {}).get('output')
+
+    def progress(self, stage_name):
+        """Partial progress saved by an unfinished stage"""
+        return self.stages.get(stage_name, {}).get('progress', {})
+
+    def mark(self, stage_name, status=None, **fields):
+        """Update a stage entry and write the checkpoint"""
+        with self._lock:
+            entry = self.stages.setdefault(stage_name, {})
+            if status is not None:
+                entry['status'] = status
+            entry.update(fields)
+            self.save()
+
+    def save(self):
+        tmp_path = f"{self.path('checkpoint.json')}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'run_id': self.run_id, 'params': self.params, 'stages': self.stages}, f, indent=2)
+        os.replace(tmp_path, self.path('checkpoint.json'))
+
+    def is_complete(self, stage_names):
+        return all(self.status(name) == STATUS_DONE for name in stage_names)
+
+def find_resumable_run(params, stage_names, runs_folder=RUNS_FOLDER):
+    """
+    Latest run with the same parameters that did not complete
+
+    Returns:
+        PipelineRun or None
+    """
+    folders = sorted(glob.glob(os.path.join(runs_folder, '*')), reverse=True)
+    for folder in folders:
+        try:
+            run = PipelineRun.load(folder)
+        except (OSError, ValueError, KeyError):
+            continue
+        if run.params == params and not run.is_complete(stage_names):
+            return run
+        # Only the most recent run with these parameters is resumable
+        if run.params == params:
+            return None
+    return None
+
+def prune_runs(runs_folder=RUNS_FOLDER, keep=RUNS_TO_KEEP):
+    """Delete all but the newest `keep` run folders"""
+    folders = sorted(glob.glob(os.path.join(runs_folder, '*')), reverse=True)
+    for folder in folders[keep:]:
+        shutil.rmtree(folder, ignore_errors=True)
+
+# Stages
+
+def fetch_rankings_stage(run):
+    from async_fetch import fetch_window
+
+    _, rankings_by_type = fetch_window(ranking_types=RANKING_TYPES, ranking_date=run.params['ranking_date'])
+    missing = [ranking_type for ranking_type in RANKING_TYPES if not rankings_by_type.get(ranking_type)]
+    if missing:
+        raise RuntimeError(f"Failed to fetch rankings: {', '.join(missing)}")
+    for ranking_type, rankings_data in rankings_by_type.items():
+        run.write_json(f"rankings_{ranking_type}.json", rankings_data)
+    return {ranking_type: len(data.get('rankings', [])) for ranking_type, data in rankings_by_type.items()}
+
+def sync_rankings_stage(run):
+    from fetch_api_rankings import process_rankings
+
+    processed = {}
+    for ranking_type in RANKING_TYPES:
+        rankings_data = run.read_json(f"rankings_{ranking_type}.json")
+        # Waits for its players and rankings to be written
+        processed[ranking_type] = process_rankings(rankings_data, ranking_type, run.params['ranking_date'])
+    return processed
+
+def fetch_matches_stage(run):
+    from async_fetch import fetch_window
+    from fetch_api_matches import save_matches_file
+
+    fetched = dict(run.progress('fetch_matches').get('fetched', {}))
+    missing = [date_str for date_str in run.params['dates'] if date_str not in fetched]
+    if len(missing) < len(run.params['dates']):
+        print(f"↻ Resuming fetch_matches: {len(fetched)} date(s) already fetched")
+
+    matches_by_date, _ = fetch_window(missing)
+    for date_str in missing:
+        matches = matches_by_date.get(date_str)
+        if matches is None:
+            continue
+        save_matches_file(matches, date_str)
+        fetched[date_str] = len(matches.get('events', []))
+        run.mark('fetch_matches', progress={'fetched': fetched})
+
+    still_missing = [date_str for date_str in run.params['dates'] if date_str not in fetched]
+    if still_missing:
+        raise RuntimeError(f"Failed to fetch matches for {', '.join(still_missing)}")
+    return fetched
+
+def transform_stage(run):
+    from clients import get_supabase
+    from event_filter import EventFilter
+    from match_transform import transform_match_data
+    from raw_archive import RawArchive
+    from raw_store import encode_event, get_payload_store
+
+    archive = RawArchive()
+    match_state = MatchStateStore()
+    payload_store = get_payload_store(get_supabase())
+    event_filter = EventFilter()
+    processed_at = datetime.now().isoformat()
+    rows = {}
+
+    for date_str in run.params['dates']:
+        for event in archive.read_day(date_str):
+            if not event_filter(event):
+                continue
+            encoded = encode_event(event) if payload_store is not None else None
+            if not match_state.accept(event, encoded[1] if encoded else None):
+                continue
+            row = transform_match_data(event, processed_at, include_raw=payload_store is None)
+            if payload_store is not None:
+                row['raw_data_hash'] = payload_store.add(event, encoded)
+            rows[row['match_id']] = row
+
+    # Payloads are content-addressed, so storing them before the rows is safe to repeat
+    if payload_store is not None:
+        failed_hashes = payload_store.flush()
+        payload_store.save()
+        if failed_hashes:
+            raise RuntimeError(f"{len(failed_hashes)} raw payload(s) could not be stored")
+
+    run.write_json('match_rows.json', list(rows.values()))
+    run.write_json('match_fingerprints.json', match_state.pending)
+    event_filter.print_summary()
+    print(f"✓ {len(rows)} changed match(es), {match_state.skipped_count} unchanged")
+    return {'rows': len(rows), 'unchanged': match_state.skipped_count}
+
+def sync_matches_stage(run):
+    from fetch_api_matches import sync_match_records
+
+    rows = run.read_json('match_rows.json', [])
+    written = []
+    upserted, failed_rows = sync_match_records(rows, on_written=written.extend)
+    # Scoring and publishing read the rows back
+    wait_and_warn()
+
+    # Only rows the writer stored are recorded as synced; the rest are retried next run
+    match_state = MatchStateStore()
+    match_state.pending.update(run.read_json('match_fingerprints.json', {}))
+    match_state.commit(row['match_id'] for row in written)
+    match_state.save()
+
+    run.write_json('synced_match_ids.json', [row['match_id'] for row in written])
+    return {'upserted': len(written), 'unconfirmed': len(upserted) - len(written), 'failed': len(failed_rows)}
+
+def score_stage(run):
+    from clients import get_supabase
+    from scoring import score_changed_matches
+
+    synced = set(run.read_json('synced_match_ids.json', []))
+    records = [row for row in run.read_json('match_rows.json', []) if row['match_id'] in synced]
+    return score_changed_matches(get_supabase(), records, force_history=True)
+
+def enrich_stage(run):
+    from clients import get_supabase
+    from match_enrichment import enrich_matches
+
+    synced = set(run.read_json('synced_match_ids.json', []))
+    records = [row for row in run.read_json('match_rows.json', []) if row['match_id'] in synced]
+    return enrich_matches(get_supabase(), records)
+
+def publish_stage(run):
+    from clients import get_supabase
+    from read_models import publish_read_models
+
+    return publish_read_models(get_supabase())
+
+class Stage:
+    def __init__(self, name, func, deps=()):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+
+STAGES = [
+    Stage('fetch_rankings', fetch_rankings_stage),
+    Stage('fetch_matches', fetch_matches_stage),
+    Stage('sync_rankings', sync_rankings_stage, ['fetch_rankings']),
+    Stage('transform', transform_stage, ['fetch_matches']),
+    Stage('sync_matches', sync_matches_stage, ['transform']),
+    Stage('score', score_stage, ['sync_matches']),
+    Stage('enrich', enrich_stage, ['sync_matches']),
+    Stage('publish', publish_stage, ['score', 'sync_rankings']),
+]
+
+def run_stage(run, stage, metrics):
+    """Run one stage and record its result in the checkpoint"""
+    print(f"\n▶ {stage.name}")
+    start = time.perf_counter()
+    try:
+        output = stage.func(run)
+    except Exception as e:
+        seconds = time.perf_counter() - start
+        metrics.add_time(f"stage_{stage.name}", seconds)
+        print(f"✗ Stage {stage.name} failed after {seconds:.2f}s: {e}")
+        traceback.print_exc()
+        run.mark(stage.name, STATUS_FAILED, error=str(e), seconds=round(seconds, 2))
+        return False
+
+    seconds = time.perf_counter() - start
+    metrics.add_time(f"stage_{stage.name}", seconds)
+    run.mark(stage.name, STATUS_DONE, output=output, error=None, seconds=round(seconds, 2),
+             completed_at=datetime.now().isoformat())
+    print(f"✓ Stage {stage.name} done in {seconds:.2f}s")
+    return True
+
+def run_graph(run, stages=STAGES, workers=None, metrics=None):
+    """
+    Run every stage that is not done yet, each as soon as its dependencies are
+
+    Args:
+        run: PipelineRun to execute or resume
+        stages: List of Stage
+        workers: Stages running at the same time (defaults to the number of stages)
+        metrics: RunMetrics for stage timings
+
+    Returns:
+        True if every stage is done
+    """
+    metrics = metrics or start_run('nightly')
+    done = {stage.name for stage in stages if run.status(stage.name) == STATUS_DONE}
+    if done:
+        print(f"↻ Resuming run {run.run_id}, already done: {', '.join(sorted(done))}")
+    failed = set()
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=workers or len(stages)) as pool:
+        while True:
+            for stage in stages:
+                if stage.name in done or stage.name in failed or stage.name in running.values():
+                    continue
+                if any(dep in failed for dep in stage.deps):
+                    failed.add(stage.name)
+                    run.mark(stage.name, STATUS_SKIPPED, error="dependency failed")
+                    print(f"⊘ Skipping {stage.name}: dependency failed")
+                elif all(dep in done for dep in stage.deps):
+                    running[pool.submit(run_stage, run, stage, metrics)] = stage.name
+
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                (done if future.result() else failed).add(name)
+
+    return not failed
+
+def pipeline_params(days_back, days_forward):
+    """Run parameters; a run is resumed only when they match"""
+    today = datetime.now()
+    return {
+        'dates': [(today + timedelta(days=offset)).strftime('%Y-%m-%d')
+                  for offset in range(-days_back, days_forward + 1)],
+        'ranking_date': date.today().isoformat(),
+    }
+
+def nightly_command(argv):
+    parser = argparse.ArgumentParser(prog='main.py nightly',
+                                     description="Fetch and sync rankings and matches as one resumable run")
+    parser.add_argument('--days-back', type=int, default=1, help="Days before today to fetch")
+    parser.add_argument('--days-forward', type=int, default=2, help="Days after today to fetch")
+    parser.add_argument('--fresh', action='store_true', help="Start a new run instead of resuming")
+    parser.add_argument('--workers', type=int, default=None, help="Stages running at the same time")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Request every date and ranking instead of serving fresh cached responses")
+    args = parser.parse_args(argv)
+
+    if args.no_cache:
+        get_response_cache().bypass = True
 
-def main():
     print("🎾 TENNIS DATA PIPELINE 🎾\n")
-    
-    # Step 1: Fetch data from RapidAPI
-    print("STEP 1: Fetching data from RapidAPI...")
-    data = fetch_yesterday_and_today()
-    
-    if not data or data['total_tournaments'] == 0:
-        print("✗ No data fetched. Exiting.")
-        return
-    
-    # Step 2: Save to file
-    save_to_file(data)
-    
-    # Step 3: Sync to Supabase
-    print("\nSTEP 2: Syncing to Supabase...")
-    sync_all()
-    
+
+    params = pipeline_params(args.days_back, args.days_forward)
+    stage_names = [stage.name for stage in STAGES]
+    run = None if args.fresh else find_resumable_run(params, stage_names)
+    if run is None:
+        run = PipelineRun.create(params)
+        prune_runs()
+    print(f"Run {run.run_id}: {params['dates'][0]} to {params['dates'][-1]}, rankings for {params['ranking_date']}")
+
+    metrics = start_run('nightly')
+    from clients import get_supabase
+    replay_spool(get_supabase())
+    succeeded = run_graph(run, workers=args.workers, metrics=metrics)
+
+    print(f"\n{'='*60}")
+    print("PIPELINE SUMMARY")
+    print(f"{'='*60}")
+    for name in stage_names:
+        entry = run.stages.get(name, {})
+        print(f"  {name}: {entry.get('status', 'not run')} {entry.get('output') or entry.get('error') or ''}")
+    get_response_cache().print_summary()
+    print_spool_summary()
+    metrics.print_summary()
+    metrics.save()
+
+    if not succeeded:
+        print(f"\n✗ Run {run.run_id} incomplete, rerun to resume from the failed stage")
+        sys.exit(1)
     print("\n✅ PIPELINE COMPLETE!")
 
+def matches_command(argv):
+    from fetch_api_matches import main as matches_main
+    matches_main(argv)
+
+def rankings_command(argv):
+    from fetch_api_rankings import main as rankings_main
+    rankings_main(argv)
+
+def replay_command(argv):
+    from replay import main as replay_main
+    replay_main(argv)
+
+def publish_command(argv):
+    from read_models import main as publish_main
+    publish_main(argv)
+
+def spool_command(argv):
+    from write_spool import main as spool_main
+    spool_main(argv)
+
+def payloads_command(argv):
+    from raw_store import main as payloads_main
+    payloads_main(argv)
+
+def history_command(argv):
+    from ranking_history import main as history_main
+    history_main(argv)
+
+def live_command(argv):
+    from live import main as live_main
+    live_main(argv)
+
+# Heavy modules are imported inside each command, so offline commands start fast
+COMMANDS = {
+    'nightly': (nightly_command, "full resumable run: rankings and matches (default)"),
+    'matches': (matches_command, "matches for a date (YYYY-MM-DD) or the default window"),
+    'rankings': (rankings_command, "ATP/WTA rankings for a date or today"),
+    'replay': (replay_command, "replay archived payloads without calling RapidAPI"),
+    'live': (live_command, "poll live scores with adaptive intervals"),
+    'publish': (publish_command, "rebuild the frontend read models whose inputs changed"),
+    'history': (history_command, "query the local ranking history (top, trajectory, movers)"),
+    'spool': (spool_command, "status, flush or requeue-dead of the write-behind spool"),
+    'payloads': (payloads_command, "delete raw payloads no match references (gc)"),
+}
+
+def print_usage():
+    print("Usage: python main.py [command] [options]\n")
+    print("Commands:")
+    for name, (_, description) in COMMANDS.items():
+        print(f"  {name:<10}{description}")
+    print("\nRun 'python main.py <command> --help' for the options of a command.")
+
+def main(argv=None):
+    """
+    Pipeline CLI
+
+    Args:
+        argv: Arguments after the script name (defaults to sys.argv[1:]);
+              without a known command the nightly run is started
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in ('-h', '--help'):
+        print_usage()
+        return
+    if argv and argv[0] in COMMANDS:
+        command, argv = argv[0], argv[1:]
+    else:
+        command = 'nightly'
+    COMMANDS[command][0](argv)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,206 @@
+"""
+Exactly-once enrichment of finished matches with per-match statistics
+
+Matches that finish in a run are queued for enrichment; their statistics
+(/api/tennis/event/{id}/statistics) are fetched by a fixed pool of workers
+and written to their own table:
+    create table match_statistics (
+        match_id bigint primary key,
+        statistics jsonb not null,
+        totals jsonb,
+        enriched_at timestamptz default now()
+    );
+totals flattens the whole-match period to {key: {"home": value, "away": value}}
+(aces, doubleFaults, firstServePointsAccuracy, ...).
+
+The completion index (ENRICHMENT_INDEX_FILE) records every match whose row
+was written, so a match is never fetched again however often it is synced.
+Every failed attempt (request error, no statistics yet, failed write) counts
+against ENRICH_MAX_ATTEMPTS, after which the match is given up, and delays
+its next attempt by ENRICH_RETRY_DELAY doubling per attempt. Matches that are
+not due yet are passed over, so a few failing matches cannot hold up the
+queue behind them. Requests share the process-wide RapidAPI rate limit.
+
+MATCH_ENRICHMENT=off disables the stage.
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+
+from async_fetch import fetch_statistics_window, NOT_FOUND
+from change_detection import STATE_FOLDER
+from scoring import is_scorable
+from supabase_batch import upsert_in_chunks
+
+MATCH_ENRICHMENT = os.getenv('MATCH_ENRICHMENT', 'on')
+MATCH_STATISTICS_TABLE = 'match_statistics'
+ENRICHMENT_INDEX_FILE = os.path.join(STATE_FOLDER, 'enriched_matches.json')
+ENRICH_WORKERS = int(os.getenv('ENRICH_WORKERS', 4))
+# Matches enriched per run, the rest stay queued (bounds the API calls of a backfill)
+ENRICH_MAX_PER_RUN = int(os.getenv('ENRICH_MAX_PER_RUN', 500))
+ENRICH_MAX_ATTEMPTS = int(os.getenv('ENRICH_MAX_ATTEMPTS', 3))
+ENRICH_RETRY_DELAY = int(os.getenv('ENRICH_RETRY_DELAY', 3600))
+
+def statistics_totals(statistics_data):
+    """
+    Whole-match statistics as {key: {'home': value, 'away': value}}
+
+    Args:
+        statistics_data: Response of the statistics endpoint
+
+    Returns:
+        Dictionary of statistics of the 'ALL' period (empty if there is none)
+    """
+    totals = {}
+    for period in statistics_data.get('statistics', []):
+        if period.get('period') != 'ALL':
+            continue
+        for group in period.get('groups', []):
+            for item in group.get('statisticsItems', []):
+                key = item.get('key') or item.get('name')
+                if key:
+                    totals[key] = {'home': item.get('homeValue', item.get('home')),
+                                   'away': item.get('awayValue', item.get('away'))}
+    return totals
+
+class EnrichmentIndex:
+    """
+    Persistent completion index and queue of matches to enrich
+
+    Usage:
+        index = EnrichmentIndex()
+        index.enqueue(match_ids)
+        batch = index.next_batch(100)
+        ... fetch and store ...
+        index.complete(stored_ids)
+        index.save()
+    """
+
+    def __init__(self, path=ENRICHMENT_INDEX_FILE):
+        self.path = path
+        self.done = {}       # match_id -> enriched_at ('' if it was given up)
+        self.pending = {}    # match_id -> [failed attempts, unix time of the next attempt]
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                self.done = state.get('done', {})
+                self.pending = state.get('pending', {})
+            except (OSError, ValueError) as e:
+                print(f"⚠ Could not read enrichment index {path}, starting fresh: {e}")
+
+    def enqueue(self, match_ids):
+        """
+        Queue matches that were never enriched
+
+        Returns:
+            Number of newly queued matches
+        """
+        queued = 0
+        for match_id in match_ids:
+            key = str(match_id)
+            if key not in self.done and key not in self.pending:
+                self.pending[key] = [0, 0]
+                queued += 1
+        return queued
+
+    def next_batch(self, limit, now=None):
+        """Queued match ids that are due, oldest first, at most `limit`"""
+        now = now if now is not None else time.time()
+        due = [int(key) for key, (_, next_attempt_at) in self.pending.items() if next_attempt_at <= now]
+        return due[:limit]
+
+    def complete(self, match_ids, enriched_at=None):
+        """Record matches whose statistics were stored"""
+        enriched_at = enriched_at or datetime.now().isoformat()
+        for match_id in match_ids:
+            self.pending.pop(str(match_id), None)
+            self.done[str(match_id)] = enriched_at
+
+    def failed(self, match_id, now=None):
+        """
+        Count a failed attempt and schedule the next one
+
+        Returns:
+            True if the match was given up
+        """
+        key = str(match_id)
+        now = now if now is not None else time.time()
+        attempts = self.pending.get(key, [0, 0])[0] + 1
+        if attempts >= ENRICH_MAX_ATTEMPTS:
+            self.pending.pop(key, None)
+            self.done[key] = ''
+            return True
+        self.pending[key] = [attempts, now + ENRICH_RETRY_DELAY * 2 ** (attempts - 1)]
+        return False
+
+    def save(self):
+        """Atomically write the index"""
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'done': self.done, 'pending': self.pending}, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+def enrich_matches(client, records, index=None, fetch=None, max_per_run=None):
+    """
+    Queue the finished matches among records and enrich the queue
+
+    Args:
+        client: Supabase client
+        records: tennis_matches rows synced in this run
+        index: EnrichmentIndex (defaults to the one in ENRICHMENT_INDEX_FILE)
+        fetch: Function mapping match ids to {match_id: statistics_data, NOT_FOUND or None}
+        max_per_run: Matches fetched in this call (defaults to ENRICH_MAX_PER_RUN)
+
+    Returns:
+        Dictionary with queued, enriched, missing, failed and still pending counts,
+        None when enrichment is off
+    """
+    if MATCH_ENRICHMENT == 'off':
+        return None
+    index = index or EnrichmentIndex()
+    fetch = fetch or (lambda match_ids: fetch_statistics_window(match_ids, workers=ENRICH_WORKERS))
+
+    summary = {'queued': index.enqueue(record['match_id'] for record in records if is_scorable(record)),
+               'enriched': 0, 'missing': 0, 'failed': 0, 'given_up': 0}
+    batch = index.next_batch(max_per_run or ENRICH_MAX_PER_RUN)
+    if not batch:
+        index.save()
+        summary['pending'] = len(index.pending)
+        print(f"⊘ No finished matches due for enrichment ({summary['pending']} queued)")
+        return summary
+
+    start = time.perf_counter()
+    results = fetch(batch)
+    enriched_at = datetime.now().isoformat()
+    rows = []
+    for match_id in batch:
+        data = results.get(match_id)
+        if data is None or data == NOT_FOUND:
+            summary['failed' if data is None else 'missing'] += 1
+            summary['given_up'] += index.failed(match_id)
+        else:
+            rows.append({'match_id': match_id, 'statistics': data, 'totals': statistics_totals(data),
+                         'enriched_at': enriched_at})
+
+    # Completion is recorded only for rows that were written
+    written, failed_rows = upsert_in_chunks(client, MATCH_STATISTICS_TABLE, rows, on_conflict='match_id')
+    for failed in failed_rows:
+        print(f"✗ Failed to store statistics for match {failed['row']['match_id']}: {failed['error']}")
+        summary['given_up'] += index.failed(failed['row']['match_id'])
+    index.complete([row['match_id'] for row in written], enriched_at)
+    index.save()
+
+    summary['enriched'] = len(written)
+    summary['failed'] += len(failed_rows)
+    summary['pending'] = len(index.pending)
+    print(f"✓ Enriched {summary['enriched']} match(es) in {time.perf_counter() - start:.2f}s, "
+          f"{summary['missing']} without statistics, {summary['failed']} failed, {summary['given_up']} given up, "
+          f"{summary['pending']} queued")
+    return summary
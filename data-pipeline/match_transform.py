@@ -0,0 +1,199 @@
+"""
+Table-driven transform of API events into tennis_matches rows
+
+MATCH_COLUMNS maps each column to a JSON path in the event. The spec is
+compiled once into plain Python functions: every shared path prefix (for
+example event['homeTeam']) is looked up a single time per event instead of
+once per column.
+"""
+
+import json
+from datetime import datetime
+
+# Value transforms applied at the end of a path
+FIRST = 'first'  # first element of a list, None if empty/missing
+
+# (column, path, default, value transform)
+MATCH_COLUMNS = [
+    # Match identifiers
+    ('match_id', ('id',), None, None),
+    ('slug', ('slug',), None, None),
+    ('custom_id', ('customId',), None, None),
+
+    # Player 1 (formerly homeTeam)
+    ('player1_id', ('homeTeam', 'id'), None, None),
+    ('player1_name', ('homeTeam', 'name'), None, None),
+    ('player1_slug', ('homeTeam', 'slug'), None, None),
+    ('player1_short_name', ('homeTeam', 'shortName'), None, None),
+    ('player1_name_code', ('homeTeam', 'nameCode'), None, None),
+    ('player1_country', ('homeTeam', 'country', 'name'), None, None),
+    ('player1_country_code', ('homeTeam', 'country', 'alpha2'), None, None),
+    ('player1_gender', ('homeTeam', 'gender'), None, None),
+
+    # Player 2 (formerly awayTeam)
+    ('player2_id', ('awayTeam', 'id'), None, None),
+    ('player2_name', ('awayTeam', 'name'), None, None),
+    ('player2_slug', ('awayTeam', 'slug'), None, None),
+    ('player2_short_name', ('awayTeam', 'shortName'), None, None),
+    ('player2_name_code', ('awayTeam', 'nameCode'), None, None),
+    ('player2_country', ('awayTeam', 'country', 'name'), None, None),
+    ('player2_country_code', ('awayTeam', 'country', 'alpha2'), None, None),
+    ('player2_gender', ('awayTeam', 'gender'), None, None),
+
+    # Scores - Player 1 (formerly homeScore)
+    ('player1_score_current', ('homeScore', 'current'), None, None),
+    ('player1_score_display', ('homeScore', 'display'), None, None),
+    ('player1_set1_score', ('homeScore', 'period1'), None, None),
+    ('player1_set2_score', ('homeScore', 'period2'), None, None),
+    ('player1_set3_score', ('homeScore', 'period3'), None, None),
+    ('player1_set4_score', ('homeScore', 'period4'), None, None),
+    ('player1_set5_score', ('homeScore', 'period5'), None, None),
+    ('player1_set1_tiebreak', ('homeScore', 'period1TieBreak'), None, None),
+    ('player1_set2_tiebreak', ('homeScore', 'period2TieBreak'), None, None),
+    ('player1_set3_tiebreak', ('homeScore', 'period3TieBreak'), None, None),
+    ('player1_current_point', ('homeScore', 'point'), None, None),
+
+    # Scores - Player 2 (formerly awayScore)
+    ('player2_score_current', ('awayScore', 'current'), None, None),
+    ('player2_score_display', ('awayScore', 'display'), None, None),
+    ('player2_set1_score', ('awayScore', 'period1'), None, None),
+    ('player2_set2_score', ('awayScore', 'period2'), None, None),
+    ('player2_set3_score', ('awayScore', 'period3'), None, None),
+    ('player2_set4_score', ('awayScore', 'period4'), None, None),
+    ('player2_set5_score', ('awayScore', 'period5'), None, None),
+    ('player2_set1_tiebreak', ('awayScore', 'period1TieBreak'), None, None),
+    ('player2_set2_tiebreak', ('awayScore', 'period2TieBreak'), None, None),
+    ('player2_set3_tiebreak', ('awayScore', 'period3TieBreak'), None, None),
+    ('player2_current_point', ('awayScore', 'point'), None, None),
+
+    # Match status and info
+    ('status_code', ('status', 'code'), None, None),
+    ('status_description', ('status', 'description'), None, None),
+    ('status_type', ('status', 'type'), None, None),
+    ('winner_code', ('winnerCode',), None, None),
+    ('first_to_serve', ('firstToServe',), None, None),
+
+    # Tournament info
+    ('tournament_id', ('tournament', 'id'), None, None),
+    ('tournament_name', ('tournament', 'name'), None, None),
+    ('tournament_slug', ('tournament', 'slug'), None, None),
+    ('unique_tournament_id', ('tournament', 'uniqueTournament', 'id'), None, None),
+    ('unique_tournament_name', ('tournament', 'uniqueTournament', 'name'), None, None),
+    ('unique_tournament_slug', ('tournament', 'uniqueTournament', 'slug'), None, None),
+
+    # Category (ATP/WTA)
+    ('category_id', ('tournament', 'category', 'id'), None, None),
+    ('category_name', ('tournament', 'category', 'name'), None, None),
+    ('category_slug', ('tournament', 'category', 'slug'), None, None),
+
+    # Season and round
+    ('season_id', ('season', 'id'), None, None),
+    ('season_name', ('season', 'name'), None, None),
+    ('season_year', ('season', 'year'), None, None),
+    ('round_number', ('roundInfo', 'round'), None, None),
+    ('round_name', ('roundInfo', 'name'), None, None),
+    ('round_type', ('roundInfo', 'cupRoundType'), None, None),
+
+    # Match details
+    ('ground_type', ('groundType',), None, None),
+    ('tennis_points', ('tournament', 'uniqueTournament', 'tennisPoints'), None, None),
+    ('start_timestamp', ('startTimestamp',), None, None),
+    ('has_highlights', ('hasGlobalHighlights',), False, None),
+
+    # Event filters
+    ('gender', ('eventFilters', 'gender'), None, FIRST),
+    ('match_type', ('eventFilters', 'category'), None, FIRST),
+    ('level', ('eventFilters', 'level'), None, FIRST),
+    ('tournament_type', ('eventFilters', 'tournament'), None, FIRST),
+]
+
+def _compile_lookups(spec):
+    """
+    Generate the lookup statements of an extractor
+
+    Returns:
+        Tuple of (prefix assignment lines, {column: value expression})
+    """
+    prefixes = {(): 'event'}
+    lines = []
+    expressions = {}
+
+    for column, path, default, value_transform in spec:
+        # Hoist every intermediate object into a local, once per event
+        for depth in range(1, len(path)):
+            prefix = path[:depth]
+            if prefix not in prefixes:
+                name = f"_p{len(prefixes)}"
+                lines.append(f"{name} = {prefixes[prefix[:-1]]}.get({prefix[-1]!r}) or _EMPTY")
+                prefixes[prefix] = name
+
+        getter = f"{prefixes[path[:-1]]}.get({path[-1]!r}, {default!r})"
+        if value_transform == FIRST:
+            expressions[column] = f"(_v[0] if (_v := {getter}) else None)"
+        else:
+            expressions[column] = getter
+
+    return lines, expressions
+
+def compile_extractor(spec=MATCH_COLUMNS):
+    """
+    Compile a column spec into a row extractor
+
+    Returns:
+        Function mapping one event to a dict of the spec's columns
+    """
+    lines, expressions = _compile_lookups(spec)
+    body = [f"    {line}" for line in lines]
+    body.append("    return {")
+    body += [f"        {column!r}: {expression}," for column, expression in expressions.items()]
+    body.append("    }")
+    source = "def extract(event):\n" + "\n".join(body)
+
+    namespace = {'_EMPTY': {}}
+    exec(compile(source, '<match_columns>', 'exec'), namespace)
+    return namespace['extract']
+
+_extract_row = compile_extractor()
+
+def _match_date(start_timestamp):
+    return datetime.fromtimestamp(start_timestamp).isoformat() if start_timestamp else None
+
+def transform_match_data(event, processed_at=None, include_raw=True):
+    """
+    Transform match data from API format to database format
+    Changes 'homeTeam'/'awayTeam' to 'player1'/'player2'
+
+    Args:
+        event: Single event/match from the API response
+        processed_at: ISO timestamp to stamp on the row (defaults to now)
+        include_raw: If True, store the complete original event as raw_data
+
+    Returns:
+        Transformed match dictionary
+    """
+    transformed = _extract_row(event)
+
+    # Metadata
+    transformed['processed_at'] = processed_at or datetime.now().isoformat()
+    if include_raw:
+        transformed['raw_data'] = json.dumps(event)  # Store complete original data as JSON
+
+    # Convert timestamp to datetime if available
+    # (always set the key, bulk upserts need every row to have the same columns)
+    transformed['match_date'] = _match_date(transformed['start_timestamp'])
+
+    return transformed
+
+def transform_match_batch(events, include_raw=True):
+    """
+    Transform a list of events with a single processed_at stamp
+
+    Args:
+        events: List of API events
+        include_raw: If True, store the complete original events as raw_data
+
+    Returns:
+        List of transformed match dictionaries
+    """
+    processed_at = datetime.now().isoformat()
+    return [transform_match_data(event, processed_at, include_raw) for event in events]
@@ -0,0 +1,206 @@
+"""
+Per-stage run metrics and verbosity-aware logging
+
+Stages (fetch_matches, fetch_rankings, parse, filter, transform,
+upsert_<table>, scoring, ...) accumulate wall time and call counts; counters
+are kept per stage (requests, errors, bytes_downloaded, events_in,
+events_out, rows, ...) and API latency per fetch stage.
+
+At the end of a run the metrics are written to METRICS_DIR as
+    <run>_YYYYMMDD_HHMMSS.json   structured run report
+    <run>.prom                   Prometheus textfile (node_exporter textfile collector)
+
+PIPELINE_VERBOSITY controls console output:
+    0  errors and final summaries only
+    1  per-date/per-chunk progress (default)
+    2  one line per event/ranking entry
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+METRICS_DIR = os.getenv('METRICS_DIR', 'run_reports')
+METRICS_PREFIX = 'tennis_pipeline'
+
+QUIET = 0
+PROGRESS = 1
+EVENTS = 2
+VERBOSITY = int(os.getenv('PIPELINE_VERBOSITY', PROGRESS))
+
+def log(message, level=PROGRESS):
+    """Print a message if PIPELINE_VERBOSITY is at least `level`"""
+    if VERBOSITY >= level:
+        print(message)
+
+class CountingReader:
+    """Binary stream wrapper that counts the bytes read through it"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.bytes_read += len(data)
+        return data
+
+class RunMetrics:
+    """
+    Timings and counters for one pipeline run
+
+    Usage:
+        metrics = start_run('matches')
+        with metrics.timer('parse'):
+            ...
+        metrics.count('fetch_matches', 'requests')
+        metrics.save()
+    """
+
+    def __init__(self, run_name='pipeline'):
+        self.run_name = run_name
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self.latencies = {}
+        # Stages may run on several threads (main.py)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def timer(self, stage):
+        """Time a block and add it to the stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def add_time(self, stage, seconds, calls=1):
+        """Add already measured time to a stage"""
+        with self._lock:
+            totals = self.stages.setdefault(stage, {'seconds': 0.0, 'calls': 0})
+            totals['seconds'] += seconds
+            totals['calls'] += calls
+
+    def count(self, stage, name, value=1):
+        """Increment a per-stage counter"""
+        with self._lock:
+            stage_counters = self.counters.setdefault(stage, {})
+            stage_counters[name] = stage_counters.get(name, 0) + value
+
+    def observe_latency(self, stage, seconds):
+        """Record one API request latency for a stage"""
+        with self._lock:
+            latency = self.latencies.setdefault(stage, {'count': 0, 'sum': 0.0, 'max': 0.0})
+            latency['count'] += 1
+            latency['sum'] += seconds
+            latency['max'] = max(latency['max'], seconds)
+
+    def duration(self):
+        """Seconds since the run started"""
+        return time.perf_counter() - self._started
+
+    def report(self):
+        """
+        Structured run report
+
+        Returns:
+            Dictionary with run info, stages, counters and latencies
+        """
+        return {
+            'run': self.run_name,
+            'started_at': datetime.fromtimestamp(self.started_at).isoformat(),
+            'duration_seconds': round(self.duration(), 4),
+            'stages': {stage: {'seconds': round(totals['seconds'], 4), 'calls': totals['calls']}
+                       for stage, totals in self.stages.items()},
+            'counters': self.counters,
+            'latency': {stage: {'count': latency['count'],
+                                'avg_seconds': round(latency['sum'] / latency['count'], 4),
+                                'max_seconds': round(latency['max'], 4)}
+                        for stage, latency in self.latencies.items() if latency['count']},
+        }
+
+    def prometheus_lines(self):
+        """Metrics in the Prometheus text exposition format"""
+        run = f'run="{self.run_name}"'
+        lines = [
+            f"# TYPE {METRICS_PREFIX}_run_duration_seconds gauge",
+            f"{METRICS_PREFIX}_run_duration_seconds{{{run}}} {self.duration():.4f}",
+            f"# TYPE {METRICS_PREFIX}_run_timestamp_seconds gauge",
+            f"{METRICS_PREFIX}_run_timestamp_seconds{{{run}}} {self.started_at:.0f}",
+            f"# TYPE {METRICS_PREFIX}_stage_seconds gauge",
+        ]
+        for stage, totals in sorted(self.stages.items()):
+            lines.append(f'{METRICS_PREFIX}_stage_seconds{{{run},stage="{stage}"}} {totals["seconds"]:.4f}')
+
+        names = sorted({name for stage_counters in self.counters.values() for name in stage_counters})
+        for name in names:
+            lines.append(f"# TYPE {METRICS_PREFIX}_{name} gauge")
+            for stage, stage_counters in sorted(self.counters.items()):
+                if name in stage_counters:
+                    lines.append(f'{METRICS_PREFIX}_{name}{{{run},stage="{stage}"}} {stage_counters[name]}')
+
+        for suffix in ('count', 'sum', 'max'):
+            lines.append(f"# TYPE {METRICS_PREFIX}_api_latency_seconds_{suffix} gauge")
+            for stage, latency in sorted(self.latencies.items()):
+                value = latency[suffix] if suffix == 'count' else f"{latency[suffix]:.4f}"
+                lines.append(f'{METRICS_PREFIX}_api_latency_seconds_{suffix}{{{run},stage="{stage}"}} {value}')
+        return lines
+
+    def print_summary(self):
+        """Print time per stage and the stage counters"""
+        print(f"\nRun time: {self.duration():.2f}s")
+        for stage, totals in sorted(self.stages.items(), key=lambda item: -item[1]['seconds']):
+            counters = ', '.join(f"{name}={value}" for name, value in self.counters.get(stage, {}).items())
+            print(f"  {stage}: {totals['seconds']:.2f}s" + (f" ({counters})" if counters else ""))
+
+    def save(self, folder=None):
+        """
+        Write the JSON run report and the Prometheus textfile
+
+        Args:
+            folder: Output folder (defaults to METRICS_DIR)
+
+        Returns:
+            Tuple of (report path, textfile path)
+        """
+        folder = folder or METRICS_DIR
+        os.makedirs(folder, exist_ok=True)
+
+        report_path = os.path.join(folder, f"{self.run_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+
+        # Written atomically so the collector never reads a partial file
+        textfile_path = os.path.join(folder, f"{self.run_name}.prom")
+        tmp_path = f"{textfile_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(self.prometheus_lines()) + "\n")
+        os.replace(tmp_path, textfile_path)
+
+        print(f"Run report saved to: {report_path}")
+        return report_path, textfile_path
+
+_current = RunMetrics()
+
+def get_metrics():
+    """Metrics of the current run"""
+    return _current
+
+def start_run(run_name):
+    """
+    Start collecting metrics for a new run
+
+    Args:
+        run_name: Name used in the report file name and the Prometheus run label
+
+    Returns:
+        The new RunMetrics
+    """
+    global _current
+    _current = RunMetrics(run_name)
+    return _current
@@ -0,0 +1,134 @@
+"""
+Local snapshot of the players table
+
+Rankings runs diff every player row against the snapshot and upsert only new
+or changed players; match rows get missing player attributes (slug, country,
+gender, ...) filled in from it without reading the database.
+
+Each player entry remembers when it was last written, and entries older than
+PLAYER_SNAPSHOT_MAX_AGE_DAYS are treated as changed, so a players table that
+was edited or restored behind the pipeline's back is re-synced within a week.
+"""
+
+import json
+import os
+import threading
+import time
+
+from change_detection import STATE_FOLDER
+
+PLAYER_SNAPSHOT_FILE = os.path.join(STATE_FOLDER, 'players.json')
+PLAYER_SNAPSHOT_MAX_AGE_DAYS = float(os.getenv('PLAYER_SNAPSHOT_MAX_AGE_DAYS', 7))
+
+# players column -> tennis_matches column suffix (player1_<suffix>/player2_<suffix>)
+MATCH_ROW_COLUMNS = {
+    'name': 'name',
+    'slug': 'slug',
+    'short_name': 'short_name',
+    'name_code': 'name_code',
+    'country': 'country',
+    'country_code': 'country_code',
+    'gender': 'gender',
+}
+
+class PlayerSnapshot:
+    """
+    Last written players row per player_id
+
+    Usage:
+        snapshot = PlayerSnapshot()
+        changed = snapshot.changed_records(player_records)
+        ... upsert changed ...
+        snapshot.commit(upserted_records)
+        snapshot.save()
+    """
+
+    def __init__(self, path=PLAYER_SNAPSHOT_FILE, max_age_days=PLAYER_SNAPSHOT_MAX_AGE_DAYS):
+        self.path = path
+        self.max_age = max_age_days * 86400
+        self.players = {}
+        self.unchanged_count = 0
+        # Rankings and matches may be synced on different threads (main.py)
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.players = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠ Could not read player snapshot {path}, starting fresh: {e}")
+
+    def get(self, player_id):
+        """Last written players row, or None if the player is not in the snapshot"""
+        entry = self.players.get(str(player_id))
+        return entry['record'] if entry else None
+
+    def is_changed(self, record, now=None):
+        """True if the players row is new, differs from the snapshot or is due for a refresh"""
+        entry = self.players.get(str(record.get('player_id')))
+        if entry is None or entry['record'] != record:
+            return True
+        return (now or time.time()) - entry.get('synced_at', 0) >= self.max_age
+
+    def changed_records(self, records):
+        """
+        Keep only players rows that need to be written
+
+        Args:
+            records: List of rows from build_player_record
+
+        Returns:
+            List of new or changed rows
+        """
+        now = time.time()
+        changed = [record for record in records if self.is_changed(record, now)]
+        self.unchanged_count += len(records) - len(changed)
+        return changed
+
+    def commit(self, records):
+        """Record players rows that were written successfully"""
+        now = time.time()
+        with self._lock:
+            for record in records:
+                self.players[str(record['player_id'])] = {'record': dict(record), 'synced_at': now}
+
+    def enrich_match_row(self, row):
+        """
+        Fill missing player1_*/player2_* columns of a match row from the snapshot
+
+        Values already on the row are never replaced.
+
+        Returns:
+            The same row
+        """
+        for side in ('player1', 'player2'):
+            record = self.get(row.get(f'{side}_id'))
+            if record is None:
+                continue
+            for column, suffix in MATCH_ROW_COLUMNS.items():
+                key = f'{side}_{suffix}'
+                if row.get(key) is None and record.get(column) is not None:
+                    row[key] = record[column]
+        return row
+
+    def save(self):
+        """Atomically write the snapshot file"""
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        with self._lock:
+            content = json.dumps(self.players, separators=(',', ':'))
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, self.path)
+
+_snapshot = None
+
+def get_player_snapshot():
+    """Shared PlayerSnapshot, loaded on first use"""
+    global _snapshot
+    if _snapshot is None:
+        _snapshot = PlayerSnapshot()
+    return _snapshot
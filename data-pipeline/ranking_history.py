@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Local ranking history as memory-mapped NumPy arrays
+
+Per ranking type (atp/wta) the store keeps two dense int32 matrices,
+players x ranking dates, of rank and points (0 = not ranked that day):
+    <type>_rank.npy     rank
+    <type>_points.npy   points
+    <type>_index.json   player_id of every row and ranking date of every column
+The matrices are column-major, so each ranking date is one contiguous column
+that is written in place; space is preallocated and doubled when a new
+player or date does not fit.
+
+process_rankings appends every stored ranking list, so trajectories, movers
+and top-N lists are answered from disk without scanning player_rankings.
+
+Usage:
+    python ranking_history.py top --type atp --date 2026-01-20 -n 20
+    python ranking_history.py trajectory --type wta --player 12345
+    python ranking_history.py movers --type atp --from 2026-01-01 --to 2026-01-20
+    python ranking_history.py rebuild --type atp
+"""
+
+import argparse
+import bisect
+import json
+import os
+
+import numpy as np
+
+from change_detection import STATE_FOLDER
+
+RANKING_HISTORY_DIR = os.getenv('RANKING_HISTORY_DIR', os.path.join(STATE_FOLDER, 'ranking_history'))
+INITIAL_PLAYERS = 2048
+INITIAL_DATES = 64
+
+class RankingHistory:
+    """
+    Rank and points per player and ranking date for one ranking type
+
+    Usage:
+        history = RankingHistory('atp')
+        history.append('2026-01-20', ranking_records)
+        history.save()
+        history.top_n('2026-01-20', 100)
+    """
+
+    def __init__(self, ranking_type, folder=RANKING_HISTORY_DIR):
+        self.ranking_type = ranking_type
+        self.folder = folder
+        self.index_path = os.path.join(folder, f"{ranking_type}_index.json")
+        self.rank_path = os.path.join(folder, f"{ranking_type}_rank.npy")
+        self.points_path = os.path.join(folder, f"{ranking_type}_points.npy")
+
+        self.player_ids = []
+        self.dates = []
+        self.ranks = None
+        self.points = None
+
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            self.player_ids = index['player_ids']
+            self.dates = index['dates']
+            self.ranks = np.load(self.rank_path, mmap_mode='r+')
+            self.points = np.load(self.points_path, mmap_mode='r+')
+
+        self.rows = {player_id: row for row, player_id in enumerate(self.player_ids)}
+        self.columns = {ranking_date: column for column, ranking_date in enumerate(self.dates)}
+        self._sorted_dates = sorted(self.dates)
+
+    def _resize(self, player_count, date_count):
+        """Make room for player_count rows and date_count columns, doubling the preallocated space"""
+        shape = self.ranks.shape if self.ranks is not None else (0, 0)
+        if player_count <= shape[0] and date_count <= shape[1]:
+            return
+
+        new_shape = (max(shape[0], INITIAL_PLAYERS), max(shape[1], INITIAL_DATES))
+        while new_shape[0] < player_count:
+            new_shape = (new_shape[0] * 2, new_shape[1])
+        while new_shape[1] < date_count:
+            new_shape = (new_shape[0], new_shape[1] * 2)
+
+        os.makedirs(self.folder, exist_ok=True)
+        resized = []
+        for path, old in ((self.rank_path, self.ranks), (self.points_path, self.points)):
+            tmp_path = f"{path}.tmp"
+            array = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.int32, shape=new_shape,
+                                              fortran_order=True)
+            if old is not None:
+                array[:shape[0], :shape[1]] = old
+            array.flush()
+            del array
+            os.replace(tmp_path, path)
+            resized.append(np.load(path, mmap_mode='r+'))
+        self.ranks, self.points = resized
+
+    def append(self, ranking_date, records):
+        """
+        Store one ranking list as the column of its date (replacing an earlier list for that date)
+
+        Args:
+            ranking_date: Date of the ranking (YYYY-MM-DD)
+            records: Iterable of rows from build_ranking_record (player_id, rank, points)
+
+        Returns:
+            Number of players stored (an empty list leaves the history untouched)
+        """
+        records = [record for record in records if record.get('player_id') is not None]
+        if not records:
+            return 0
+        for record in records:
+            if record['player_id'] not in self.rows:
+                self.rows[record['player_id']] = len(self.player_ids)
+                self.player_ids.append(record['player_id'])
+
+        if ranking_date not in self.columns:
+            self.columns[ranking_date] = len(self.dates)
+            self.dates.append(ranking_date)
+            bisect.insort(self._sorted_dates, ranking_date)
+        self._resize(len(self.player_ids), len(self.dates))
+
+        column = self.columns[ranking_date]
+        rows = np.fromiter((self.rows[record['player_id']] for record in records), dtype=np.int64, count=len(records))
+        self.ranks[:, column] = 0
+        self.points[:, column] = 0
+        self.ranks[rows, column] = [record.get('rank') or 0 for record in records]
+        self.points[rows, column] = [record.get('points') or 0 for record in records]
+        return len(records)
+
+    def save(self):
+        """Flush the arrays, then atomically write the index"""
+        if self.ranks is None:
+            return
+        self.ranks.flush()
+        self.points.flush()
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'player_ids': self.player_ids, 'dates': self.dates}, f, separators=(',', ':'))
+        os.replace(tmp_path, self.index_path)
+
+    def latest_date(self):
+        """Most recent stored ranking date, None if the store is empty"""
+        return self._sorted_dates[-1] if self._sorted_dates else None
+
+    def date_as_of(self, ranking_date):
+        """Latest stored ranking date on or before ranking_date, None if there is none"""
+        position = bisect.bisect_right(self._sorted_dates, ranking_date)
+        return self._sorted_dates[position - 1] if position else None
+
+    def trajectory(self, player_id, start_date=None, end_date=None):
+        """
+        Rank and points of a player over time
+
+        Returns:
+            List of (ranking_date, rank, points) tuples in date order, unranked dates left out
+        """
+        row = self.rows.get(player_id)
+        if row is None:
+            return []
+        trajectory = []
+        for ranking_date in self._sorted_dates:
+            if (start_date and ranking_date < start_date) or (end_date and ranking_date > end_date):
+                continue
+            column = self.columns[ranking_date]
+            rank = int(self.ranks[row, column])
+            if rank:
+                trajectory.append((ranking_date, rank, int(self.points[row, column])))
+        return trajectory
+
+    def ranks_as_of(self, player_ids, ranking_date):
+        """
+        Rank of several players as of a date
+
+        Returns:
+            {player_id: rank or None}
+        """
+        as_of = self.date_as_of(ranking_date)
+        if as_of is None:
+            return {player_id: None for player_id in player_ids}
+        column = self.ranks[:, self.columns[as_of]]
+        result = {}
+        for player_id in player_ids:
+            row = self.rows.get(player_id)
+            rank = int(column[row]) if row is not None else 0
+            result[player_id] = rank or None
+        return result
+
+    def top_n(self, ranking_date, n=100):
+        """
+        Best ranked players as of a date
+
+        Returns:
+            List of (player_id, rank, points) tuples ordered by rank
+        """
+        as_of = self.date_as_of(ranking_date)
+        if as_of is None:
+            return []
+        column = self.columns[as_of]
+        ranks = np.asarray(self.ranks[:len(self.player_ids), column])
+        ranked = np.flatnonzero(ranks)
+        best = ranked[np.argsort(ranks[ranked], kind='stable')[:n]]
+        return [(self.player_ids[row], int(ranks[row]), int(self.points[row, column])) for row in best]
+
+    def movers(self, start_date, end_date, n=10):
+        """
+        Biggest rank changes between two dates (players ranked on both)
+
+        Returns:
+            Dictionary with 'up' and 'down' lists of (player_id, old rank, new rank, places gained)
+        """
+        start_as_of = self.date_as_of(start_date)
+        end_as_of = self.date_as_of(end_date)
+        if start_as_of is None or end_as_of is None:
+            return {'up': [], 'down': []}
+        count = len(self.player_ids)
+        old = np.asarray(self.ranks[:count, self.columns[start_as_of]])
+        new = np.asarray(self.ranks[:count, self.columns[end_as_of]])
+        rows = np.flatnonzero((old > 0) & (new > 0))
+        gained = old[rows] - new[rows]
+
+        def entries(positions):
+            return [(self.player_ids[rows[i]], int(old[rows[i]]), int(new[rows[i]]), int(gained[i]))
+                    for i in positions]
+
+        up = np.flatnonzero(gained > 0)
+        down = np.flatnonzero(gained < 0)
+        return {'up': entries(up[np.argsort(-gained[up], kind='stable')][:n]),
+                'down': entries(down[np.argsort(gained[down], kind='stable')][:n])}
+
+_histories = {}
+
+def get_ranking_history(ranking_type):
+    """Shared RankingHistory for a ranking type, opened on first use"""
+    if ranking_type not in _histories:
+        _histories[ranking_type] = RankingHistory(ranking_type)
+    return _histories[ranking_type]
+
+def rebuild_from_supabase(client, ranking_type, page_size=1000):
+    """
+    Rebuild a ranking type's history from the player_rankings table
+
+    Returns:
+        RankingHistory with every stored ranking date
+    """
+    by_date = {}
+    start = 0
+    while True:
+        response = (client.table('player_rankings')
+                    .select('player_id,ranking_date,rank,points')
+                    .eq('ranking_type', ranking_type)
+                    .order('ranking_date')
+                    .range(start, start + page_size - 1)
+                    .execute())
+        for row in response.data:
+            by_date.setdefault(row['ranking_date'], []).append(row)
+        if len(response.data) < page_size:
+            break
+        start += page_size
+
+    history = RankingHistory(ranking_type)
+    for ranking_date in sorted(by_date):
+        history.append(ranking_date, by_date[ranking_date])
+    history.save()
+    _histories[ranking_type] = history
+    print(f"✓ Rebuilt {ranking_type.upper()} ranking history: {len(history.player_ids)} players, "
+          f"{len(history.dates)} dates")
+    return history
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the local ranking history")
+    parser.add_argument('query', choices=['top', 'trajectory', 'movers', 'rebuild'])
+    parser.add_argument('--type', dest='ranking_type', default='atp', choices=['atp', 'wta'])
+    parser.add_argument('--date', help="Ranking date for top (YYYY-MM-DD, latest by default)")
+    parser.add_argument('--player', type=int, help="Player id for trajectory")
+    parser.add_argument('--from', dest='start_date', help="First date for trajectory/movers")
+    parser.add_argument('--to', dest='end_date', help="Last date for trajectory/movers")
+    parser.add_argument('-n', type=int, default=20, help="Number of players for top/movers")
+    args = parser.parse_args(argv)
+
+    if args.query == 'rebuild':
+        from clients import get_supabase
+        rebuild_from_supabase(get_supabase(), args.ranking_type)
+        return
+
+    history = get_ranking_history(args.ranking_type)
+    latest = history.latest_date()
+    if latest is None:
+        print(f"No {args.ranking_type.upper()} ranking history yet (run rankings or `rebuild`)")
+        return
+
+    if args.query == 'top':
+        for player_id, rank, points in history.top_n(args.date or latest, args.n):
+            print(f"{rank:>5}  {player_id:>8}  {points} pts")
+    elif args.query == 'trajectory':
+        if args.player is None:
+            parser.error("trajectory needs --player")
+        for ranking_date, rank, points in history.trajectory(args.player, args.start_date, args.end_date):
+            print(f"{ranking_date}  #{rank}  {points} pts")
+    else:
+        moves = history.movers(args.start_date or min(history.dates), args.end_date or latest, args.n)
+        for direction in ('up', 'down'):
+            print(f"\n{direction.upper()}")
+            for player_id, old, new, gained in moves[direction]:
+                print(f"  {player_id:>8}  #{old} → #{new} ({gained:+d})")
+
+if __name__ == "__main__":
+    main()
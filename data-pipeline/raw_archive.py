@@ -0,0 +1,290 @@
+"""
+Compressed, append-only archive of raw API events
+
+Layout (one pair of files per date):
+    raw_archive/YYYY-MM-DD.log        zlib-compressed events appended back to back
+    raw_archive/YYYY-MM-DD.idx.json   {match_id: [[offset, length, hash, captured_at, zdict], ...]}
+    raw_archive/zdict.<n>.bin         preset compression dictionaries, versioned
+
+Every record names the dictionary it was compressed with (0 = none), so a
+lost or replaced dictionary only affects its own records. A dictionary built from too little data (an empty
+or tiny first day) is replaced by a new version from the next day that has
+enough events.
+
+Each match keeps one entry per distinct version that was seen, so rerunning
+the same day only appends the events whose content changed. Single matches
+and whole days are read back by seeking to their records, without
+decompressing anything else.
+"""
+
+import glob
+import itertools
+import json
+import os
+import sys
+import time
+import zlib
+
+from raw_store import encode_event
+
+ARCHIVE_FOLDER = os.getenv('RAW_ARCHIVE_DIR', 'raw_archive')
+COMPRESSION_LEVEL = 6
+
+# Events repeat the same keys and tournament blocks, so a dictionary sampled
+# from archived events roughly halves record size
+ZDICT_SAMPLE_EVENTS = 40
+ZDICT_MAX_BYTES = 32 * 1024
+# Smaller dictionaries are degenerate and rebuilt from the next usable sample
+ZDICT_MIN_BYTES = 4 * 1024
+
+class RawArchive:
+    """
+    Reader/writer for the raw event archive
+
+    Usage:
+        archive = RawArchive()
+        archive.append_day('2026-01-20', events)
+        event = archive.read_match('2026-01-20', 15323104)
+        for event in archive.read_day('2026-01-20'):
+            ...
+    """
+
+    def __init__(self, folder=ARCHIVE_FOLDER):
+        self.folder = folder
+        self._indexes = {}
+        self._zdicts = {}
+        self._current_zdict = None
+        self.last_append = (0, 0)
+
+    def _log_path(self, date_str):
+        return os.path.join(self.folder, f"{date_str}.log")
+
+    def _index_path(self, date_str):
+        return os.path.join(self.folder, f"{date_str}.idx.json")
+
+    def _load_index(self, date_str):
+        if date_str not in self._indexes:
+            path = self._index_path(date_str)
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._indexes[date_str] = json.load(f)
+            else:
+                self._indexes[date_str] = {}
+        return self._indexes[date_str]
+
+    def _save_index(self, date_str):
+        path = self._index_path(date_str)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._indexes[date_str], f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def _zdict_path(self, version):
+        return os.path.join(self.folder, f"zdict.{version}.bin")
+
+    def _load_zdict(self, version):
+        """Dictionary bytes of a version (None for version 0)"""
+        if version == 0:
+            return None
+        if version not in self._zdicts:
+            path = self._zdict_path(version)
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Compression dictionary {path} is missing")
+            with open(path, 'rb') as f:
+                self._zdicts[version] = f.read()
+        return self._zdicts[version]
+
+    def _latest_zdict(self):
+        """(version, bytes) of the dictionary new records use, (0, None) if there is none yet"""
+        if self._current_zdict is None:
+            versions = [int(os.path.basename(path).split('.')[1])
+                        for path in glob.glob(os.path.join(self.folder, 'zdict.*.bin'))]
+            version = max(versions, default=0)
+            self._current_zdict = (version, self._load_zdict(version))
+        return self._current_zdict
+
+    def _create_zdict(self, sample_events):
+        """Write a new dictionary version from sample events unless the sample is too small"""
+        samples = b''.join(encode_event(event)[0] for event in sample_events)
+        if len(samples) < ZDICT_MIN_BYTES:
+            return
+        # zlib favours the end of the dictionary, keep the most recent bytes
+        zdict = samples[-ZDICT_MAX_BYTES:]
+        version, _ = self._latest_zdict()
+        version += 1
+        path = self._zdict_path(version)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(zdict)
+        os.replace(tmp_path, path)
+        self._zdicts[version] = zdict
+        self._current_zdict = (version, zdict)
+
+    def _compress(self, content):
+        _, zdict = self._latest_zdict()
+        if zdict is None:
+            compressor = zlib.compressobj(COMPRESSION_LEVEL)
+        else:
+            compressor = zlib.compressobj(COMPRESSION_LEVEL, zdict=zdict)
+        return compressor.compress(content) + compressor.flush()
+
+    def _decompress(self, record, version):
+        zdict = self._load_zdict(version)
+        decompressor = zlib.decompressobj() if zdict is None else zlib.decompressobj(zdict=zdict)
+        return decompressor.decompress(record) + decompressor.flush()
+
+    def dates(self):
+        """Sorted list of archived dates"""
+        paths = glob.glob(os.path.join(self.folder, '*.idx.json'))
+        return sorted(os.path.basename(path)[:-len('.idx.json')] for path in paths)
+
+    def match_ids(self, date_str):
+        """Match ids archived for a date"""
+        return list(self._load_index(date_str).keys())
+
+    def append_day(self, date_str, events):
+        """
+        Append the new or changed events of a day to the archive
+
+        Args:
+            date_str: Date in 'YYYY-MM-DD' format
+            events: Iterable of API events
+
+        Returns:
+            Tuple of (events written, unchanged events skipped)
+        """
+        for _ in self.tee_day(date_str, events):
+            pass
+        return self.last_append
+
+    def tee_day(self, date_str, events):
+        """
+        Archive events while passing them through, for use inside a stream
+        Counts of (written, skipped) are left in self.last_append once exhausted
+
+        Args:
+            date_str: Date in 'YYYY-MM-DD' format
+            events: Iterable of API events
+
+        Yields:
+            The same events, unchanged
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        index = self._load_index(date_str)
+        captured_at = int(time.time())
+        written = 0
+        skipped = 0
+
+        _, zdict = self._latest_zdict()
+        if zdict is None or len(zdict) < ZDICT_MIN_BYTES:
+            events = iter(events)
+            sample = list(itertools.islice(events, ZDICT_SAMPLE_EVENTS))
+            self._create_zdict(sample)
+            events = itertools.chain(sample, events)
+
+        try:
+            with open(self._log_path(date_str), 'ab') as log:
+                for event in events:
+                    match_id = str(event.get('id'))
+                    content, content_hash = encode_event(event)
+
+                    versions = index.get(match_id)
+                    if versions and versions[-1][2] == content_hash:
+                        skipped += 1
+                    else:
+                        record = self._compress(content)
+                        offset = log.tell()
+                        log.write(record)
+                        index.setdefault(match_id, []).append([offset, len(record), content_hash, captured_at,
+                                                               self._latest_zdict()[0]])
+                        written += 1
+
+                    yield event
+        finally:
+            if written:
+                self._save_index(date_str)
+            self.last_append = (written, skipped)
+
+    def _read_record(self, log, entry):
+        offset, length, version = entry[0], entry[1], entry[4]
+        log.seek(offset)
+        return json.loads(self._decompress(log.read(length), version).decode('utf-8'))
+
+    def read_match(self, date_str, match_id, version=-1):
+        """
+        Read one archived match
+
+        Args:
+            date_str: Date in 'YYYY-MM-DD' format
+            match_id: Event id
+            version: Index into the match's versions (-1 = latest)
+
+        Returns:
+            Event dictionary, or None if the match is not archived for that date
+        """
+        versions = self._load_index(date_str).get(str(match_id))
+        if not versions:
+            return None
+        with open(self._log_path(date_str), 'rb') as log:
+            return self._read_record(log, versions[version])
+
+    def match_versions(self, date_str, match_id):
+        """List of (hash, captured_at) for every archived version of a match"""
+        versions = self._load_index(date_str).get(str(match_id), [])
+        return [(entry[2], entry[3]) for entry in versions]
+
+    def read_day(self, date_str):
+        """
+        Yield the latest version of every match archived for a date
+
+        Args:
+            date_str: Date in 'YYYY-MM-DD' format
+
+        Yields:
+            Event dictionaries in log order
+        """
+        index = self._load_index(date_str)
+        if not index:
+            return
+        latest = sorted((versions[-1] for versions in index.values()), key=lambda entry: entry[0])
+        with open(self._log_path(date_str), 'rb') as log:
+            for entry in latest:
+                yield self._read_record(log, entry)
+
+    def find_match(self, match_id):
+        """
+        Find the latest archived version of a match on any date
+
+        Returns:
+            Tuple of (date_str, event), or (None, None) if it was never archived
+        """
+        for date_str in reversed(self.dates()):
+            if str(match_id) in self._load_index(date_str):
+                return date_str, self.read_match(date_str, match_id)
+        return None, None
+
+def import_legacy_files(paths, archive=None):
+    """
+    Import pretty-printed matches_YYYY-MM-DD.json dumps into the archive
+
+    Args:
+        paths: Paths of legacy daily files
+        archive: RawArchive to write to (defaults to ARCHIVE_FOLDER)
+    """
+    archive = archive or RawArchive()
+    for path in paths:
+        name = os.path.basename(path)
+        if not (name.startswith('matches_') and name.endswith('.json')):
+            print(f"⊘ Skipping {path} (not a matches_YYYY-MM-DD.json file)")
+            continue
+        date_str = name[len('matches_'):-len('.json')]
+        with open(path, 'r', encoding='utf-8') as f:
+            events = json.load(f).get('events', [])
+        written, skipped = archive.append_day(date_str, events)
+        print(f"✓ {date_str}: archived {written} event(s), {skipped} unchanged")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python raw_archive.py tennis_data/matches_*.json")
+        sys.exit(1)
+    import_legacy_files(sys.argv[1:])
@@ -0,0 +1,310 @@
+"""
+Content-addressed storage for raw event payloads
+
+Instead of a full copy of the event in tennis_matches.raw_data, each distinct
+payload is stored once keyed by its content hash and the match row only
+carries raw_data_hash. A payload is written only the first time its hash is
+seen.
+
+RAW_DATA_MODE selects where payloads go:
+    inline  full event in tennis_matches.raw_data (previous behaviour)
+    table   Supabase side table, requires:
+                create table raw_payloads (
+                    hash text primary key,
+                    payload jsonb not null,
+                    first_seen_at timestamptz default now()
+                );
+                alter table tennis_matches add column raw_data_hash text;
+    local   gzip blobs under RAW_BLOB_DIR (tennis_matches.raw_data_hash still required)
+
+Payloads superseded by a newer version of their match are no longer
+referenced by any tennis_matches.raw_data_hash; `main.py payloads gc` deletes
+them once they are older than RAW_PAYLOAD_GC_GRACE_HOURS (rows still waiting
+in the write spool keep their payloads through the grace period).
+"""
+
+import abc
+import argparse
+import glob
+import gzip
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from change_detection import STATE_FOLDER
+from supabase_batch import chunked, select_all, upsert_in_chunks
+
+RAW_DATA_MODE = os.getenv('RAW_DATA_MODE', 'inline')
+RAW_PAYLOAD_TABLE = 'raw_payloads'
+BLOB_FOLDER = os.getenv('RAW_BLOB_DIR', 'raw_blobs')
+KNOWN_HASHES_FILE = os.path.join(STATE_FOLDER, 'raw_payload_hashes.json')
+RAW_PAYLOAD_GC_GRACE_HOURS = int(os.getenv('RAW_PAYLOAD_GC_GRACE_HOURS', 48))
+
+def encode_event(event):
+    """
+    Canonical compact JSON encoding of an event and its content hash
+
+    Args:
+        event: Single event/match from the API response
+
+    Returns:
+        Tuple of (utf-8 bytes, sha1 hex digest)
+    """
+    content = json.dumps(event, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return content, hashlib.sha1(content).hexdigest()
+
+def referenced_hashes(client, table_name='tennis_matches'):
+    """Set of payload hashes referenced by match rows"""
+    rows = select_all(client, table_name, 'match_id,raw_data_hash', 'match_id')
+    return {row['raw_data_hash'] for row in rows if row.get('raw_data_hash')}
+
+class PayloadStore(abc.ABC):
+    """
+    Base class: tracks which hashes are already stored and buffers new payloads
+
+    Usage:
+        store = get_payload_store(supabase)
+        if store is not None:
+            row['raw_data_hash'] = store.add(event)
+        ...
+        store.flush()   # before the rows that reference the payloads
+        store.save()
+    """
+
+    def __init__(self, known_hashes_file=KNOWN_HASHES_FILE):
+        self.known_hashes_file = known_hashes_file
+        self.known_hashes = set()
+        self.pending = {}
+        self.written_count = 0
+        self.reused_count = 0
+
+        if known_hashes_file and os.path.exists(known_hashes_file):
+            try:
+                with open(known_hashes_file, 'r', encoding='utf-8') as f:
+                    self.known_hashes = set(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"⚠ Could not read {known_hashes_file}, starting fresh: {e}")
+
+    def add(self, event, encoded=None):
+        """
+        Queue an event's payload unless its hash is already stored
+
+        Args:
+            event: Single event/match from the API response
+            encoded: Optional precomputed (content, hash) from encode_event
+
+        Returns:
+            The payload hash to store in raw_data_hash
+        """
+        content, content_hash = encoded or encode_event(event)
+        if content_hash in self.known_hashes or content_hash in self.pending:
+            self.reused_count += 1
+        else:
+            self.pending[content_hash] = content
+        return content_hash
+
+    def flush(self):
+        """
+        Write queued payloads
+
+        Returns:
+            Set of hashes that failed to be written
+        """
+        if not self.pending:
+            return set()
+        failed = self._write(self.pending)
+        stored = set(self.pending) - failed
+        self.known_hashes.update(stored)
+        self.written_count += len(stored)
+        self.pending = {}
+        return failed
+
+    def save(self):
+        """Persist the set of stored hashes"""
+        if not self.known_hashes_file:
+            return
+        folder = os.path.dirname(self.known_hashes_file)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp_path = f"{self.known_hashes_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(sorted(self.known_hashes), f, separators=(',', ':'))
+        os.replace(tmp_path, self.known_hashes_file)
+
+    def collect_garbage(self, referenced, grace_hours=RAW_PAYLOAD_GC_GRACE_HOURS, dry_run=False):
+        """
+        Delete stored payloads that no match row references
+
+        Args:
+            referenced: Set of hashes still referenced (see referenced_hashes)
+            grace_hours: Payloads stored more recently than this are kept
+            dry_run: Only count what would be deleted
+
+        Returns:
+            Number of payloads deleted (or that would be deleted)
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=grace_hours)
+        unreferenced = [content_hash for content_hash in self._stored_before(cutoff)
+                        if content_hash not in referenced and content_hash not in self.pending]
+        if dry_run or not unreferenced:
+            return len(unreferenced)
+        deleted = self._delete(unreferenced)
+        # Forget them, so a payload that shows up again is written again
+        self.known_hashes.difference_update(deleted)
+        return len(deleted)
+
+    @abc.abstractmethod
+    def _write(self, payloads):
+        """Store {hash: content} payloads, returns the set of hashes that failed"""
+
+    @abc.abstractmethod
+    def _stored_before(self, cutoff):
+        """Hashes of the payloads stored before a UTC datetime"""
+
+    @abc.abstractmethod
+    def _delete(self, hashes):
+        """Delete payloads, returns the hashes that were deleted"""
+
+    @abc.abstractmethod
+    def get(self, content_hash):
+        """Stored payload of a hash, None if missing"""
+
+class TablePayloadStore(PayloadStore):
+    """Payloads stored once per hash in the Supabase raw_payloads table"""
+
+    def __init__(self, client, table_name=RAW_PAYLOAD_TABLE, known_hashes_file=KNOWN_HASHES_FILE):
+        super().__init__(known_hashes_file)
+        self.client = client
+        self.table_name = table_name
+
+    def _write(self, payloads):
+        rows = [
+            {'hash': content_hash, 'payload': json.loads(content)}
+            for content_hash, content in payloads.items()
+        ]
+        # Existing hashes are left untouched
+        _, failed_rows = upsert_in_chunks(self.client, self.table_name, rows, on_conflict='hash',
+                                          ignore_duplicates=True)
+        for failed in failed_rows:
+            print(f"✗ Failed to store raw payload {failed['row']['hash']}: {failed['error']}")
+        return {failed['row']['hash'] for failed in failed_rows}
+
+    def get(self, content_hash):
+        """Fetch a stored payload by hash, None if missing"""
+        response = self.client.table(self.table_name).select('payload').eq('hash', content_hash).execute()
+        return response.data[0]['payload'] if response.data else None
+
+    def _stored_before(self, cutoff):
+        rows = select_all(self.client, self.table_name, 'hash,first_seen_at', 'hash')
+        return [row['hash'] for row in rows
+                if not row.get('first_seen_at') or _parse_time(row['first_seen_at']) < cutoff]
+
+    def _delete(self, hashes):
+        deleted = set()
+        for chunk in chunked(hashes, 200):
+            try:
+                self.client.table(self.table_name).delete().in_('hash', chunk).execute()
+                deleted.update(chunk)
+            except Exception as e:
+                print(f"✗ Failed to delete {len(chunk)} raw payload(s): {e}")
+        return deleted
+
+class LocalPayloadStore(PayloadStore):
+    """Payloads stored once per hash as gzip blobs: RAW_BLOB_DIR/ab/abcdef....json.gz"""
+
+    def __init__(self, folder=BLOB_FOLDER, known_hashes_file=None):
+        super().__init__(known_hashes_file)
+        self.folder = folder
+
+    def _path(self, content_hash):
+        return os.path.join(self.folder, content_hash[:2], f"{content_hash}.json.gz")
+
+    def _write(self, payloads):
+        failed = set()
+        for content_hash, content in payloads.items():
+            path = self._path(content_hash)
+            if os.path.exists(path):
+                continue
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.tmp"
+                with gzip.open(tmp_path, 'wb') as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"✗ Failed to store raw payload {content_hash}: {e}")
+                failed.add(content_hash)
+        return failed
+
+    def get(self, content_hash):
+        """Read a stored payload by hash, None if missing"""
+        path = self._path(content_hash)
+        if not os.path.exists(path):
+            return None
+        with gzip.open(path, 'rb') as f:
+            return json.loads(f.read().decode('utf-8'))
+
+    def _stored_before(self, cutoff):
+        cutoff = cutoff.timestamp()
+        return [os.path.basename(path)[:-len('.json.gz')]
+                for path in glob.glob(os.path.join(self.folder, '*', '*.json.gz'))
+                if os.path.getmtime(path) < cutoff]
+
+    def _delete(self, hashes):
+        deleted = set()
+        for content_hash in hashes:
+            try:
+                os.remove(self._path(content_hash))
+                deleted.add(content_hash)
+            except OSError as e:
+                print(f"✗ Failed to delete raw payload {content_hash}: {e}")
+        return deleted
+
+def _parse_time(value):
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def get_payload_store(client, mode=None):
+    """
+    Payload store for RAW_DATA_MODE
+
+    Args:
+        client: Supabase client (used by the 'table' mode)
+        mode: Override RAW_DATA_MODE ('inline', 'table' or 'local')
+
+    Returns:
+        PayloadStore, or None for inline raw_data
+    """
+    mode = mode or RAW_DATA_MODE
+    if mode == 'table':
+        return TablePayloadStore(client)
+    if mode == 'local':
+        return LocalPayloadStore()
+    if mode != 'inline':
+        print(f"⚠ Unknown RAW_DATA_MODE '{mode}', storing raw_data inline")
+    return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the raw payload store")
+    parser.add_argument('action', choices=['gc'])
+    parser.add_argument('--dry-run', action='store_true', help="Only count the unreferenced payloads")
+    parser.add_argument('--grace-hours', type=int, default=RAW_PAYLOAD_GC_GRACE_HOURS,
+                        help="Keep payloads stored more recently than this")
+    args = parser.parse_args(argv)
+
+    from clients import get_supabase
+    client = get_supabase()
+    store = get_payload_store(client)
+    if store is None:
+        print("⊘ RAW_DATA_MODE is inline, there is no payload store to collect")
+        return
+
+    start = time.perf_counter()
+    count = store.collect_garbage(referenced_hashes(client), args.grace_hours, args.dry_run)
+    if args.dry_run:
+        print(f"{count} unreferenced raw payload(s) would be deleted")
+        return
+    store.save()
+    print(f"✓ Deleted {count} unreferenced raw payload(s) in {time.perf_counter() - start:.2f}s")
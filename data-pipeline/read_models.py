@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Precomputed JSON read models for the frontend
+
+After each sync the pipeline publishes denormalized snapshots that app.js
+fetches as static files instead of querying and joining tables in the
+browser:
+    leaderboard.json   teams ordered by current_points, with rank/points movement
+                       per TEAM_HISTORY_WINDOWS window (`change` is the rank change
+                       over LEADERBOARD_CHANGE_WINDOW)
+    matches.json       upcoming and recent matches of rostered players,
+                       tagged with the owning team, points at stake and points earned
+    players.json       every player with team assignment, points and match count,
+                       plus the team list for the dropdown
+
+Each snapshot records a hash of its inputs in manifest.json and is only
+rebuilt and rewritten when those inputs changed, so unchanged files keep
+their content (and their CDN cache entry). Small tables are hashed in full;
+the large ones (players, match_points) are fingerprinted by cheap change
+markers (row count plus the latest change they follow) and only read when a
+snapshot is actually rebuilt. Player names and genders are fingerprinted
+from the local player snapshot, which every players write goes through, so
+a rename or gender correction from the API rebuilds players.json; only an
+edit made directly in Supabase needs `--force`.
+
+manifest.json also carries published_at (UTC) of the last publish that wrote
+a snapshot; app.js only serves snapshots published within its freshness limit
+and queries Supabase otherwise. A publish that changes nothing leaves every
+file untouched, so it does not produce a commit.
+
+Files go to READ_MODELS_DIR (default `data/`, run from the repository root
+so Vercel serves them as /data/*.json).
+
+Usage:
+    python read_models.py
+    python read_models.py --force
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+from player_snapshot import get_player_snapshot
+from supabase_batch import chunked, select_all, select_in
+from team_history import LEADERBOARD_CHANGE_WINDOW, TeamPointsHistory
+
+READ_MODELS_DIR = os.getenv('READ_MODELS_DIR', 'data')
+MANIFEST_FILE = 'manifest.json'
+MATCH_LIMIT = 50
+
+# tennis_matches columns shown on match cards (processed_at and raw data would change the
+# input hash on every sync without changing what is shown); tiebreaks exist for sets 1-3 only
+MATCH_CARD_COLUMNS = ','.join(
+    ['match_id', 'tournament_name', 'match_date', 'start_timestamp', 'round_name', 'round_type',
+     'category_slug', 'tournament_type', 'winner_code', 'status_description']
+    + [f'{side}_{column}' for side in ('player1', 'player2') for column in ('id', 'name', 'short_name')]
+    + [f'{side}_set{set_number}_{kind}' for side in ('player1', 'player2') for set_number in range(1, 6)
+       for kind in ('score', 'tiebreak') if kind == 'score' or set_number <= 3]
+)
+
+def rows_hash(rows):
+    """sha1 of rows in canonical JSON"""
+    content = json.dumps(rows, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+def format_set_scores(match, prefix):
+    """Set scores as shown on a match card, tiebreaks as <sup> (same as app.js formatTennisSetScores)"""
+    sets = []
+    for set_number in range(1, 6):
+        score = match.get(f'{prefix}_set{set_number}_score')
+        if score is None:
+            continue
+        tiebreak = match.get(f'{prefix}_set{set_number}_tiebreak')
+        sets.append(f"{score}<sup>{tiebreak}</sup>" if tiebreak is not None else str(score))
+    return ' '.join(sets)
+
+class ReadModelInputs:
+    """
+    Source rows for the snapshots, each table read at most once per publish
+
+    Every input is hashed so a snapshot can tell whether its inputs changed:
+    inputs with a _marker_<name> method by their change marker, the others
+    by their rows.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.rows = {}
+        self.hashes = {}
+
+    def get(self, name):
+        if name not in self.rows:
+            self.rows[name] = getattr(self, f"_read_{name}")()
+        return self.rows[name]
+
+    def input_hash(self, name):
+        """Hash of an input's change marker, or of its rows if it has none"""
+        if name not in self.hashes:
+            marker = getattr(self, f"_marker_{name}", None)
+            self.hashes[name] = rows_hash(marker() if marker else self.get(name))
+        return self.hashes[name]
+
+    def fingerprint(self, names):
+        """Combined hash of several inputs"""
+        return hashlib.sha1(''.join(self.input_hash(name) for name in names).encode('utf-8')).hexdigest()
+
+    def _count(self, table_name, column):
+        response = self.client.table(table_name).select(column, count='exact').limit(1).execute()
+        return response.count
+
+    def _marker_players(self):
+        # Rankings syncs add players; the newest id catches a delete plus an insert,
+        # the snapshot's names and genders catch updated players
+        newest = (self.client.table('players').select('player_id')
+                  .order('player_id', desc=True).limit(1).execute())
+        written = sorted((player_id, entry['record'].get('name'), entry['record'].get('gender'))
+                         for player_id, entry in get_player_snapshot().players.items())
+        return [self._count('players', 'player_id'), newest.data, rows_hash(written)]
+
+    def _marker_match_points(self):
+        # match_points only changes when a finished match is synced again (and scored),
+        # which also moves the team totals
+        latest = (self.client.table('tennis_matches').select('processed_at')
+                  .eq('status_type', 'finished')
+                  .order('processed_at', desc=True).limit(1).execute())
+        team_points = sum(team.get('current_points') or 0 for team in self.get('teams'))
+        return [self._count('match_points', 'match_id'), latest.data, team_points]
+
+    def _read_teams(self):
+        return select_all(self.client, 'teams', 'id,name,current_points', 'id')
+
+    def _read_team_movement(self):
+        # Local history, no database read
+        return TeamPointsHistory().movement()
+
+    def _read_team_names(self):
+        # Separate input so point updates do not rebuild snapshots that only show team names
+        return [{'id': team['id'], 'name': team.get('name')} for team in self.get('teams')]
+
+    def _read_teams_players(self):
+        return select_all(self.client, 'teams_players', 'player_id,team_id', 'player_id')
+
+    def _read_players(self):
+        return select_all(self.client, 'players', 'player_id,name,gender', 'player_id')
+
+    def _read_match_points(self):
+        return select_all(self.client, 'match_points', 'match_id,player_id,points_earned', 'match_id')
+
+    def _read_points_reference(self):
+        return select_all(self.client, 'atp_points_reference',
+                          'category_slug,tournament_type,round_name,round_type,points_for_win', 'category_slug')
+
+    def _matches(self, status_type, descending):
+        player_ids = sorted({row['player_id'] for row in self.get('teams_players')})
+        if not player_ids:
+            return []
+        # Top MATCH_LIMIT per player column and chunk of players (keeps URLs short);
+        # the overall top MATCH_LIMIT is among them
+        matches = {}
+        for column in ('player1_id', 'player2_id'):
+            for chunk in chunked(player_ids, 200):
+                response = (self.client.table('tennis_matches')
+                            .select(MATCH_CARD_COLUMNS)
+                            .eq('status_type', status_type)
+                            .in_(column, chunk)
+                            .order('start_timestamp', desc=descending)
+                            .limit(MATCH_LIMIT)
+                            .execute())
+                for match in response.data:
+                    matches[match['match_id']] = match
+        ordered = sorted(matches.values(), key=lambda match: match.get('start_timestamp') or 0, reverse=descending)
+        return ordered[:MATCH_LIMIT]
+
+    def _read_upcoming_matches(self):
+        return self._matches('notstarted', descending=False)
+
+    def _read_recent_matches(self):
+        return self._matches('finished', descending=True)
+
+    def _read_recent_match_points(self):
+        match_ids = [match['match_id'] for match in self.get('recent_matches')]
+        return select_in(self.client, 'match_points', 'match_id,player_id,points_earned', 'match_id', match_ids)
+
+    def team_map(self):
+        """player_id -> {'teamId', 'teamName'}"""
+        team_names = {team['id']: team.get('name') for team in self.get('team_names')}
+        return {row['player_id']: {'teamId': row['team_id'], 'teamName': team_names.get(row['team_id']) or 'Unknown Team'}
+                for row in self.get('teams_players')}
+
+def build_leaderboard(inputs):
+    teams = sorted(inputs.get('teams'), key=lambda team: -(team.get('current_points') or 0))
+    movement = inputs.get('team_movement')
+    leaderboard = []
+    for team in teams:
+        team_movement = movement.get(str(team['id']), {})
+        leaderboard.append({
+            'id': team['id'],
+            'name': team.get('name') or 'Unknown User',
+            'points': team.get('current_points') or 0,
+            'change': team_movement.get(LEADERBOARD_CHANGE_WINDOW, {}).get('rank', 0),
+            'movement': team_movement,
+        })
+    return {'changeWindow': LEADERBOARD_CHANGE_WINDOW, 'teams': leaderboard}
+
+def _match_player(match, prefix, name_column, team_map):
+    team = team_map.get(match.get(f'{prefix}_id')) or {}
+    return {'id': match.get(f'{prefix}_id'), 'name': match.get(name_column) or 'Unknown Player',
+            'teamId': team.get('teamId'), 'teamName': team.get('teamName')}
+
+def build_matches(inputs):
+    team_map = inputs.team_map()
+
+    points_for_win = {
+        f"{ref['category_slug']}|{ref['tournament_type']}|{ref['round_name']}|{ref['round_type']}": ref['points_for_win']
+        for ref in inputs.get('points_reference')
+    }
+    upcoming = []
+    for match in inputs.get('upcoming_matches'):
+        key = f"{match.get('category_slug')}|{match.get('tournament_type')}|{match.get('round_name')}|{match.get('round_type')}"
+        upcoming.append({
+            'id': match['match_id'],
+            'tournament': match.get('tournament_name') or 'Unknown Tournament',
+            'date': match.get('match_date'),
+            'startTimestamp': match.get('start_timestamp'),
+            'homePlayer': _match_player(match, 'player1', 'player1_name', team_map),
+            'awayPlayer': _match_player(match, 'player2', 'player2_name', team_map),
+            'round': match.get('round_name') or 'TBD',
+            'pointsAtStake': points_for_win.get(key) or 0,
+        })
+
+    points_earned = {(row['match_id'], row['player_id']): row.get('points_earned')
+                     for row in inputs.get('recent_match_points')}
+    recent = []
+    for match in inputs.get('recent_matches'):
+        recent.append({
+            'id': match['match_id'],
+            'tournament': match.get('tournament_name') or 'Unknown Tournament',
+            'date': match.get('match_date'),
+            'startTimestamp': match.get('start_timestamp'),
+            'homePlayer': _match_player(match, 'player1', 'player1_short_name', team_map),
+            'awayPlayer': _match_player(match, 'player2', 'player2_short_name', team_map),
+            'round': match.get('round_name') or 'TBD',
+            'homeScore': format_set_scores(match, 'player1'),
+            'awayScore': format_set_scores(match, 'player2'),
+            'homePoints': points_earned.get((match['match_id'], match.get('player1_id'))) or 0,
+            'awayPoints': points_earned.get((match['match_id'], match.get('player2_id'))) or 0,
+            'winner': 'home' if match.get('winner_code') == 1 else 'away',
+            'statusDescription': match.get('status_description'),
+        })
+    return {'upcoming': upcoming, 'recent': recent}
+
+def build_players(inputs):
+    team_map = inputs.team_map()
+
+    points = {}
+    matches = {}
+    for row in inputs.get('match_points'):
+        points[row['player_id']] = points.get(row['player_id'], 0) + (row.get('points_earned') or 0)
+        matches.setdefault(row['player_id'], set()).add(row['match_id'])
+
+    players = []
+    for player in inputs.get('players'):
+        team = team_map.get(player['player_id']) or {}
+        players.append({
+            'id': player['player_id'],
+            'name': player.get('name'),
+            'gender': player.get('gender') or 'M',
+            'team': team.get('teamName') or 'Free Agent',
+            'teamId': team.get('teamId'),
+            'points': points.get(player['player_id'], 0),
+            'matches': len(matches.get(player['player_id'], ())),
+        })
+    players.sort(key=lambda player: -player['points'])
+
+    teams = sorted(inputs.get('team_names'), key=lambda team: team['name'] or '')
+    return {'teams': teams, 'players': players}
+
+# Snapshot name -> (inputs, builder)
+READ_MODELS = {
+    'leaderboard': (('teams', 'team_movement'), build_leaderboard),
+    'matches': (('team_names', 'teams_players', 'points_reference', 'upcoming_matches', 'recent_matches',
+                 'recent_match_points'), build_matches),
+    'players': (('team_names', 'teams_players', 'players', 'match_points'), build_players),
+}
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'), ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def publish_read_models(client, folder=None, names=None, force=False):
+    """
+    Rebuild the snapshots whose inputs changed
+
+    Args:
+        client: Supabase client
+        folder: Output folder (defaults to READ_MODELS_DIR)
+        names: Snapshot names to consider (defaults to all of READ_MODELS)
+        force: If True, rebuild every snapshot
+
+    Returns:
+        Dictionary of snapshot name -> 'written' or 'unchanged'
+    """
+    folder = folder or READ_MODELS_DIR
+    os.makedirs(folder, exist_ok=True)
+    manifest_path = os.path.join(folder, MANIFEST_FILE)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠ Could not read read-model manifest, rebuilding everything: {e}")
+
+    inputs = ReadModelInputs(client)
+    results = {}
+    for name in names or READ_MODELS:
+        input_names, build = READ_MODELS[name]
+        fingerprint = inputs.fingerprint(input_names)
+        path = os.path.join(folder, f"{name}.json")
+        if not force and manifest.get(name, {}).get('inputs') == fingerprint and os.path.exists(path):
+            results[name] = 'unchanged'
+            print(f"⊘ {name}.json unchanged")
+            continue
+
+        generated_at = datetime.now().isoformat()
+        _write_json(path, {'generated_at': generated_at, **build(inputs)})
+        manifest[name] = {'inputs': fingerprint, 'generated_at': generated_at}
+        results[name] = 'written'
+        print(f"✓ Wrote {path}")
+
+    # Only a publish that changed a snapshot touches the manifest, so the frontend
+    # can tell how current the snapshots are without unchanged runs being committed
+    if 'written' in results.values():
+        manifest['published_at'] = datetime.now(timezone.utc).isoformat()
+        _write_json(manifest_path, manifest)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish the frontend's JSON read models")
+    parser.add_argument('--output', default=None, help="Output folder (default: READ_MODELS_DIR)")
+    parser.add_argument('--force', action='store_true', help="Rebuild every snapshot")
+    args = parser.parse_args(argv)
+
+    from clients import get_supabase
+    publish_read_models(get_supabase(), args.output, force=args.force)
+
+if __name__ == "__main__":
+    main()
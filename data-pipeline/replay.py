@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Offline replay/backfill of archived match payloads into tennis_matches
+
+Reads the raw archive, saved matches_YYYY-MM-DD.json files or api_pulls
+dumps (normalized by feed_adapters), runs
+the ATP/WTA singles filter and transform_match_data in a process pool (one worker
+per day/file) and feeds the rows into the normal chunked sync. No RapidAPI
+calls are made.
+
+api_pulls ids belong to the other provider and would create duplicate
+matches next to the Tennis API rows, so api_pulls files are only replayed
+with --dry-run (for checking the filter and transform or benchmarking).
+
+Usage:
+    python replay.py --from 2026-01-01 --to 2026-01-28
+    python replay.py --dir tennis_data
+    python replay.py --dir tennis_data --dry-run
+    python replay.py --dir api_pulls --dry-run
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from event_filter import EventFilter
+from feed_adapters import detect_feed, iter_feed_events
+from raw_archive import RawArchive, ARCHIVE_FOLDER
+
+LEGACY_FOLDER = "tennis_data"
+PULLS_FOLDER = "api_pulls"
+
+def date_range(start_date, end_date):
+    """List of 'YYYY-MM-DD' strings from start_date to end_date inclusive"""
+    start = datetime.strptime(start_date, '%Y-%m-%d')
+    end = datetime.strptime(end_date, '%Y-%m-%d')
+    return [(start + timedelta(days=i)).strftime('%Y-%m-%d') for i in range((end - start).days + 1)]
+
+def sources_for_dates(dates, archive_folder=ARCHIVE_FOLDER, legacy_folder=LEGACY_FOLDER,
+                      pulls_folder=PULLS_FOLDER, include_pulls=False):
+    """
+    Pick a source per date, preferring the raw archive over legacy dumps and
+    legacy dumps over api_pulls
+
+    Args:
+        include_pulls: Fall back to api_pulls dumps (dry runs only, their ids do not match)
+
+    Returns:
+        List of (kind, reference, folder) tuples
+    """
+    archived = set(RawArchive(archive_folder).dates())
+    sources = []
+    for date_str in dates:
+        legacy_path = os.path.join(legacy_folder, f"matches_{date_str}.json")
+        pulls_path = os.path.join(pulls_folder, f"tennis_matches_{date_str}.json")
+        if date_str in archived:
+            sources.append(('archive', date_str, archive_folder))
+        elif os.path.exists(legacy_path):
+            sources.append(('file', legacy_path, None))
+        elif include_pulls and os.path.exists(pulls_path):
+            sources.append(('file', pulls_path, None))
+        else:
+            print(f"⊘ No archived payload for {date_str}")
+    return sources
+
+def sources_for_directory(folder):
+    """
+    Every replayable payload in a directory (a raw archive, or a folder of
+    matches_*.json or api_pulls tennis_matches_*.json files)
+
+    Returns:
+        List of (kind, reference, folder) tuples
+    """
+    archive = RawArchive(folder)
+    sources = [('archive', date_str, folder) for date_str in archive.dates()]
+    for pattern in ('matches_*.json', 'tennis_matches_*.json'):
+        sources += [('file', path, None) for path in sorted(glob.glob(os.path.join(folder, pattern)))]
+    return sources
+
+def replay_source(source):
+    """
+    Filter and transform one day/file (runs in a worker process)
+
+    Args:
+        source: (kind, reference, folder, raw_mode) tuple, raw_mode is
+                'inline' (raw_data), 'ref' (raw_data_hash) or 'skip'
+
+    Returns:
+        Tuple of (label, transformed rows, events read, rejection counts by reason,
+        {hash: payload} for 'ref' mode)
+    """
+    from match_transform import transform_match_batch
+    from raw_store import encode_event
+
+    kind, reference, folder, raw_mode = source
+    if kind == 'archive':
+        events = RawArchive(folder).read_day(reference)
+    else:
+        events = iter_feed_events(reference)
+
+    event_filter = EventFilter()
+    included = []
+    total_count = 0
+    for event in events:
+        total_count += 1
+        if event_filter(event):
+            included.append(event)
+
+    rows = transform_match_batch(included, include_raw=raw_mode == 'inline')
+
+    payloads = {}
+    if raw_mode == 'ref':
+        for row, event in zip(rows, included):
+            content, content_hash = encode_event(event)
+            payloads[content_hash] = content
+            row['raw_data_hash'] = content_hash
+
+    return reference, rows, total_count, event_filter.rejections, payloads
+
+def is_pulls_source(source):
+    """True if a source is an api_pulls dump"""
+    kind, reference, _ = source
+    if kind != 'file':
+        return False
+    try:
+        return detect_feed(reference).name == 'api_pulls'
+    except (OSError, ValueError):
+        return False
+
+def replay(sources, table_name='tennis_matches', workers=None, dry_run=False, include_raw=True):
+    """
+    Replay archived payloads through filter, transform and sync
+
+    Args:
+        sources: List of (kind, reference, folder) tuples
+        table_name: Supabase table name
+        workers: Worker processes (defaults to the CPU count)
+        dry_run: If True, only filter and transform, nothing is written
+        include_raw: If False, rows are sent without raw_data/raw_data_hash (the stored columns are left as is)
+
+    Returns:
+        Dictionary with event, row, upsert (stored by the writer), unconfirmed and failure counts
+    """
+    if not dry_run:
+        pulls = [source for source in sources if is_pulls_source(source)]
+        if pulls:
+            print(f"⊘ Skipping {len(pulls)} api_pulls file(s): their ids come from another provider, "
+                  f"replay them with --dry-run only")
+            sources = [source for source in sources if source not in pulls]
+
+    summary = {'sources': len(sources), 'events': 0, 'rows': 0, 'upserted': 0, 'unconfirmed': 0, 'failed': 0}
+    rejections = Counter()
+    if not sources:
+        print("Nothing to replay")
+        return summary
+
+    payload_store = None
+    if not dry_run:
+        from clients import get_supabase
+        from fetch_api_matches import sync_match_records
+        from write_spool import wait_and_warn
+        from raw_store import get_payload_store
+        if include_raw:
+            payload_store = get_payload_store(get_supabase())
+
+    if not include_raw:
+        raw_mode = 'skip'
+    elif payload_store is not None:
+        raw_mode = 'ref'
+    else:
+        raw_mode = 'inline'
+
+    # Rows count as upserted once the writer stored them, not when they are spooled
+    written = []
+    accepted = 0
+    start = time.monotonic()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(replay_source, (*source, raw_mode)) for source in sources]
+        for future in as_completed(futures):
+            label, rows, total_count, source_rejections, payloads = future.result()
+            summary['events'] += total_count
+            summary['rows'] += len(rows)
+            rejections.update(source_rejections)
+            print(f"✓ {label}: {total_count} events, {len(rows)} ATP/WTA singles")
+
+            if dry_run or not rows:
+                continue
+
+            # Payloads first, so every raw_data_hash points at a stored payload
+            if payload_store is not None:
+                for content_hash, content in payloads.items():
+                    payload_store.add(None, (content, content_hash))
+                failed_hashes = payload_store.flush()
+                if failed_hashes:
+                    held_back = [row for row in rows if row.get('raw_data_hash') in failed_hashes]
+                    print(f"⚠ {len(failed_hashes)} raw payload(s) could not be stored, "
+                          f"holding back {len(held_back)} match(es)")
+                    summary['failed'] += len(held_back)
+                    rows = [row for row in rows if row.get('raw_data_hash') not in failed_hashes]
+
+            upserted, failed_rows = sync_match_records(rows, table_name, on_written=written.extend)
+            accepted += len(upserted)
+            summary['failed'] += len(failed_rows)
+
+    if not dry_run:
+        wait_and_warn()
+        summary['upserted'] = len(written)
+        summary['unconfirmed'] = accepted - len(written)
+    if payload_store is not None:
+        payload_store.save()
+
+    elapsed = time.monotonic() - start
+    print(f"\n{'='*60}")
+    print("REPLAY SUMMARY")
+    print(f"{'='*60}")
+    print(f"Sources replayed: {summary['sources']}")
+    print(f"Events read: {summary['events']}")
+    print(f"ATP/WTA Singles rows: {summary['rows']}")
+    for reason, count in rejections.most_common():
+        print(f"  ⊘ {reason}: {count}")
+    if dry_run:
+        print("Dry run: nothing written")
+    else:
+        print(f"✓ Upserted: {summary['upserted']}")
+        if summary['unconfirmed']:
+            print(f"⚠ Not written yet: {summary['unconfirmed']} (left in the write spool or given up)")
+        print(f"✗ Failed: {summary['failed']}")
+    print(f"Elapsed: {elapsed:.2f}s")
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay archived match payloads without calling RapidAPI")
+    parser.add_argument('--from', dest='start_date', help="First date (YYYY-MM-DD)")
+    parser.add_argument('--to', dest='end_date', help="Last date (YYYY-MM-DD), defaults to --from")
+    parser.add_argument('--dir', dest='folder', help="Raw archive or folder of saved match payloads")
+    parser.add_argument('--table', default='tennis_matches', help="Supabase table name")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--dry-run', action='store_true', help="Filter and transform only, write nothing")
+    parser.add_argument('--no-raw-data', action='store_true', help="Do not rewrite the raw_data column")
+    args = parser.parse_args(argv)
+
+    if args.folder:
+        sources = sources_for_directory(args.folder)
+    elif args.start_date:
+        try:
+            dates = date_range(args.start_date, args.end_date or args.start_date)
+        except ValueError:
+            print("❌ Invalid date format. Please use YYYY-MM-DD (e.g., '2026-01-20')")
+            sys.exit(1)
+        sources = sources_for_dates(dates, include_pulls=args.dry_run)
+    else:
+        parser.error("either --from or --dir is required")
+
+    replay(sources, table_name=args.table, workers=args.workers, dry_run=args.dry_run,
+           include_raw=not args.no_raw_data)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+On-disk cache of RapidAPI responses with a freshness policy per endpoint
+
+Every successful events or rankings response is stored gzip-compressed under
+RESPONSE_CACHE_DIR, one file per endpoint. Whether a stored response can be
+served instead of calling the API depends on the data, decided when it is read:
+    past date, every event finished/canceled   forever, if fetched after that date ended
+    past date with unfinished events           RESPONSE_CACHE_LIVE_TTL
+    today                                      RESPONSE_CACHE_LIVE_TTL
+    future date                                RESPONSE_CACHE_FUTURE_TTL
+    rankings                                   for the ranking date they were fetched for
+so reruns and overlapping windows only spend requests on dates that can still change.
+
+RESPONSE_CACHE_BYPASS=1 (or --no-cache) skips reads; fresh responses are
+still stored. Hits and misses are counted per fetch stage in the run metrics.
+"""
+
+import glob
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from change_detection import STATE_FOLDER
+from metrics import get_metrics
+
+RESPONSE_CACHE_DIR = os.getenv('RESPONSE_CACHE_DIR', os.path.join(STATE_FOLDER, 'response_cache'))
+RESPONSE_CACHE_LIVE_TTL = int(os.getenv('RESPONSE_CACHE_LIVE_TTL', 300))
+RESPONSE_CACHE_FUTURE_TTL = int(os.getenv('RESPONSE_CACHE_FUTURE_TTL', 6 * 3600))
+# Cached event dates older than this are deleted when a new date is stored
+RESPONSE_CACHE_RETENTION_DAYS = int(os.getenv('RESPONSE_CACHE_RETENTION_DAYS', 90))
+
+FINAL_STATUS_TYPES = ('finished', 'canceled')
+
+def all_events_final(matches_data):
+    """True if an events response has events and every one is in a final state"""
+    events = matches_data.get('events') or []
+    return bool(events) and all((event.get('status') or {}).get('type') in FINAL_STATUS_TYPES
+                                for event in events)
+
+def date_end_timestamp(date_str):
+    """Unix timestamp of the local midnight that ends a date"""
+    return (datetime.strptime(date_str, '%Y-%m-%d') + timedelta(days=1)).timestamp()
+
+class ResponseCache:
+    """
+    Freshness-aware store of events and rankings responses
+
+    Usage:
+        cache = get_response_cache()
+        matches = cache.get_events(date_str)
+        if matches is None:
+            matches = ... request ...
+            cache.put_events(date_str, matches)
+    """
+
+    def __init__(self, folder=RESPONSE_CACHE_DIR, bypass=None):
+        self.folder = folder
+        if bypass is None:
+            bypass = os.getenv('RESPONSE_CACHE_BYPASS', '').lower() in ('1', 'true', 'yes')
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _events_path(self, date_str):
+        return os.path.join(self.folder, f"events_{date_str}.json.gz")
+
+    def _rankings_path(self, ranking_type, ranking_date):
+        return os.path.join(self.folder, f"rankings_{ranking_type}_{ranking_date}.json.gz")
+
+    def _read(self, path):
+        if not os.path.exists(path):
+            return None
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠ Ignoring unreadable cached response {path}: {e}")
+            return None
+
+    def _write(self, path, entry):
+        os.makedirs(self.folder, exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(entry, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def _record(self, stage, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        get_metrics().count(stage, 'cache_hits' if hit else 'cache_misses')
+
+    def events_ttl(self, date_str, final, today=None):
+        """
+        Seconds a cached events response for a date stays fresh
+
+        Args:
+            date_str: Date of the events (YYYY-MM-DD)
+            final: Whether every event was finished when the response was fetched
+            today: Current date (YYYY-MM-DD, defaults to today)
+
+        Returns:
+            TTL in seconds, None for a response that never expires
+        """
+        today = today or date.today().isoformat()
+        if date_str < today:
+            return None if final else RESPONSE_CACHE_LIVE_TTL
+        if date_str == today:
+            return RESPONSE_CACHE_LIVE_TTL
+        return RESPONSE_CACHE_FUTURE_TTL
+
+    def get_events(self, date_str, now=None):
+        """
+        Cached events response for a date if it is still fresh
+
+        Returns:
+            Events response dictionary, or None on a miss (or when bypassed)
+        """
+        if self.bypass:
+            return None
+        entry = self._read(self._events_path(date_str))
+        if entry is not None:
+            now = now or time.time()
+            today = datetime.fromtimestamp(now).date().isoformat()
+            # Events can still be added to a date until it is over
+            final = entry.get('final') and entry['fetched_at'] >= date_end_timestamp(date_str)
+            ttl = self.events_ttl(date_str, final, today)
+            if ttl is None or now - entry['fetched_at'] < ttl:
+                self._record('fetch_matches', True)
+                print(f"✓ Cached response for {date_str} ({'final' if ttl is None else 'fresh'})")
+                return entry['data']
+        self._record('fetch_matches', False)
+        return None
+
+    def put_events(self, date_str, matches_data, now=None):
+        """Store an events response for a date"""
+        if not matches_data:
+            return
+        self._write(self._events_path(date_str), {
+            'fetched_at': now or time.time(),
+            'final': all_events_final(matches_data),
+            'data': matches_data,
+        })
+        self.prune()
+
+    def get_rankings(self, ranking_type, ranking_date=None):
+        """
+        Cached rankings response fetched for a ranking date
+
+        Returns:
+            Rankings response dictionary, or None on a miss (or when bypassed)
+        """
+        if self.bypass:
+            return None
+        ranking_date = ranking_date or date.today().isoformat()
+        entry = self._read(self._rankings_path(ranking_type, ranking_date))
+        if entry is not None:
+            self._record('fetch_rankings', True)
+            print(f"✓ Cached {ranking_type.upper()} rankings for {ranking_date}")
+            return entry['data']
+        self._record('fetch_rankings', False)
+        return None
+
+    def put_rankings(self, ranking_type, rankings_data, ranking_date=None, now=None):
+        """Store a rankings response, replacing the ones of earlier ranking dates"""
+        if not rankings_data:
+            return
+        ranking_date = ranking_date or date.today().isoformat()
+        path = self._rankings_path(ranking_type, ranking_date)
+        self._write(path, {'fetched_at': now or time.time(), 'data': rankings_data})
+        for old_path in glob.glob(os.path.join(self.folder, f"rankings_{ranking_type}_*.json.gz")):
+            if old_path != path:
+                os.remove(old_path)
+
+    def prune(self, retention_days=RESPONSE_CACHE_RETENTION_DAYS):
+        """Delete cached events responses of dates older than retention_days"""
+        cutoff = (date.today() - timedelta(days=retention_days)).isoformat()
+        for path in glob.glob(os.path.join(self.folder, 'events_*.json.gz')):
+            date_str = os.path.basename(path)[len('events_'):-len('.json.gz')]
+            if date_str < cutoff:
+                os.remove(path)
+
+    def print_summary(self):
+        if self.hits or self.misses:
+            print(f"Response cache: {self.hits} hit(s), {self.misses} miss(es)"
+                  f"{' (bypassed)' if self.bypass else ''}")
+
+_cache = None
+
+def get_response_cache():
+    """Shared ResponseCache, created on first use"""
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache()
+    return _cache
@@ -0,0 +1,276 @@
+"""
+Incremental team scoring for changed matches
+
+Only the matches written in the current run are scored. For each finished
+match the winner earns points_for_win from atp_points_reference (looked up
+by category_slug, tournament_type, round_name, round_type) and the loser
+earns 0; both get a match_points row. Every team holding a player whose
+match_points changed (found through teams_players for those players only)
+has its current_points recomputed as the sum of its players' match_points,
+so updating a team twice gives the same total. Teams that no changed match
+touches are never read or written.
+
+The affected team ids are saved to DIRTY_TEAMS_FILE before match_points is
+written and removed once their total is stored; teams left over by a failed
+or interrupted run are recomputed by the next one.
+
+After a scoring run that changed them, the points of all teams are appended
+to the local team points history (team_history.py) for leaderboard movement;
+the nightly run records them every time (force_history).
+
+SCORING_MODE selects how teams are scored after a fetch:
+    edge    the process_unlogged_matches and update_all_team_points functions (default)
+    local   this module
+    off     no scoring
+Switching an existing database from edge to local is safe (totals are
+recomputed from match_points), but switching back to edge is not: matches
+scored locally were never logged by process_unlogged_matches, which would
+score them a second time. Mark them as logged before switching back.
+"""
+
+import json
+import os
+from collections import defaultdict
+
+from change_detection import STATE_FOLDER
+from supabase_batch import upsert_in_chunks, select_in
+from team_history import record_team_points
+
+SCORING_MODE = os.getenv('SCORING_MODE', 'edge')
+DIRTY_TEAMS_FILE = os.path.join(STATE_FOLDER, 'dirty_teams.json')
+POINTS_REFERENCE_TABLE = 'atp_points_reference'
+MATCH_POINTS_TABLE = 'match_points'
+ROSTER_TABLE = 'teams_players'
+TEAMS_TABLE = 'teams'
+
+# tennis_matches columns scoring reads, enough to keep for matches scored after a long sync
+SCORING_COLUMNS = ('match_id', 'status_type', 'winner_code', 'player1_id', 'player2_id',
+                   'category_slug', 'tournament_type', 'round_name', 'round_type')
+
+def reference_key(row):
+    """Points lookup key for a tennis_matches or atp_points_reference row"""
+    return (row.get('category_slug'), row.get('tournament_type'), row.get('round_name'), row.get('round_type'))
+
+def load_points_reference(client):
+    """
+    Load atp_points_reference
+
+    Returns:
+        Dictionary of {reference_key: points_for_win}
+    """
+    response = (client.table(POINTS_REFERENCE_TABLE)
+                .select('category_slug, tournament_type, round_name, round_type, points_for_win')
+                .execute())
+    return {reference_key(row): row.get('points_for_win') or 0 for row in response.data}
+
+def is_scorable(record):
+    """True if a tennis_matches row is a finished match with a winner"""
+    return record.get('status_type') == 'finished' and record.get('winner_code') in (1, 2)
+
+def build_roster_index(roster_rows):
+    """
+    Invert teams_players rows into player_id -> team ids
+
+    Args:
+        roster_rows: List of {'team_id', 'player_id'} rows
+
+    Returns:
+        Dictionary of {player_id: set of team_ids}
+    """
+    index = defaultdict(set)
+    for row in roster_rows:
+        index[row['player_id']].add(row['team_id'])
+    return index
+
+def match_point_rows(record, points_reference):
+    """
+    match_points rows earned in one match
+
+    Args:
+        record: tennis_matches row
+        points_reference: Dictionary from load_points_reference
+
+    Returns:
+        List of {'match_id', 'player_id', 'points_earned'} rows, empty unless the match is finished
+    """
+    if not is_scorable(record):
+        return []
+    if record.get('player1_id') is None or record.get('player2_id') is None:
+        return []
+
+    points = points_reference.get(reference_key(record), 0)
+    winner = record['winner_code']
+    return [
+        {'match_id': record['match_id'], 'player_id': record['player1_id'],
+         'points_earned': points if winner == 1 else 0},
+        {'match_id': record['match_id'], 'player_id': record['player2_id'],
+         'points_earned': points if winner == 2 else 0},
+    ]
+
+class TeamPointsEngine:
+    """
+    Scores changed matches and updates only the affected teams
+
+    Usage:
+        engine = TeamPointsEngine(supabase)
+        summary = engine.score_matches(upserted_records)
+    """
+
+    def __init__(self, client, points_reference=None, dirty_teams_file=DIRTY_TEAMS_FILE):
+        self.client = client
+        self.points_reference = points_reference
+        self.dirty_teams_file = dirty_teams_file
+
+    def _load_dirty_teams(self):
+        if not os.path.exists(self.dirty_teams_file):
+            return set()
+        try:
+            with open(self.dirty_teams_file, 'r', encoding='utf-8') as f:
+                return set(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"⚠ Could not read {self.dirty_teams_file}, starting fresh: {e}")
+            return set()
+
+    def _save_dirty_teams(self, team_ids):
+        folder = os.path.dirname(self.dirty_teams_file)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp_path = f"{self.dirty_teams_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(sorted(team_ids), f)
+        os.replace(tmp_path, self.dirty_teams_file)
+
+    def recompute_teams(self, team_ids):
+        """
+        Store each team's current_points as the sum of its players' match_points
+
+        Args:
+            team_ids: Ids of the teams to recompute
+
+        Returns:
+            Set of team ids whose total was stored
+        """
+        roster = select_in(self.client, ROSTER_TABLE, 'team_id, player_id', 'team_id', team_ids)
+        player_points = defaultdict(int)
+        for row in select_in(self.client, MATCH_POINTS_TABLE, 'match_id, player_id, points_earned', 'player_id',
+                             {row['player_id'] for row in roster}):
+            player_points[row['player_id']] += row.get('points_earned') or 0
+
+        totals = {team_id: 0 for team_id in team_ids}
+        for row in roster:
+            totals[row['team_id']] += player_points[row['player_id']]
+
+        updated = set()
+        for team_id, total in totals.items():
+            try:
+                self.client.table(TEAMS_TABLE).update({'current_points': total}).eq('id', team_id).execute()
+                updated.add(team_id)
+            except Exception as e:
+                print(f"✗ Failed to update points for team {team_id}: {e}")
+        return updated
+
+    def score_matches(self, records):
+        """
+        Score a set of changed tennis_matches rows
+
+        Args:
+            records: tennis_matches rows written in this run
+
+        Returns:
+            Dictionary with scored match, match_points row and team counts
+        """
+        summary = {'matches': 0, 'match_points': 0, 'teams': 0, 'failed': 0}
+        dirty_teams = self._load_dirty_teams()
+        if dirty_teams:
+            print(f"↻ {len(dirty_teams)} team(s) left over from an earlier run")
+
+        # Last version of each match wins
+        by_match = {record['match_id']: record for record in records if record.get('match_id') is not None}
+        finished = [record for record in by_match.values() if is_scorable(record)]
+        summary['matches'] = len(finished)
+
+        changed_rows = []
+        if finished:
+            if self.points_reference is None:
+                self.points_reference = load_points_reference(self.client)
+            new_rows = [row for record in finished for row in match_point_rows(record, self.points_reference)]
+
+            # Only rows that differ from what was already scored for these matches
+            stored = select_in(self.client, MATCH_POINTS_TABLE, 'match_id, player_id, points_earned', 'match_id',
+                               [record['match_id'] for record in finished])
+            stored_points = {(row['match_id'], row['player_id']): row.get('points_earned') for row in stored}
+            changed_rows = [row for row in new_rows
+                            if stored_points.get((row['match_id'], row['player_id'])) != row['points_earned']]
+
+        if changed_rows:
+            # Teams are marked dirty before match_points changes, so a crash in between is repaired next run
+            roster_index = build_roster_index(
+                select_in(self.client, ROSTER_TABLE, 'team_id, player_id', 'player_id',
+                          {row['player_id'] for row in changed_rows})
+            )
+            for row in changed_rows:
+                dirty_teams.update(roster_index.get(row['player_id'], ()))
+            self._save_dirty_teams(dirty_teams)
+
+            written, failed_rows = upsert_in_chunks(self.client, MATCH_POINTS_TABLE, changed_rows,
+                                                    on_conflict='match_id,player_id')
+            summary['match_points'] = len(written)
+            summary['failed'] = len(failed_rows)
+            for failed in failed_rows:
+                print(f"✗ Failed to store match points for match {failed['row']['match_id']}, "
+                      f"player {failed['row']['player_id']}: {failed['error']}")
+        elif finished:
+            print(f"⊘ {len(finished)} finished match(es) already scored")
+
+        if not dirty_teams:
+            if not finished:
+                print("⊘ No finished matches changed, scoring skipped")
+            return summary
+
+        updated = self.recompute_teams(sorted(dirty_teams))
+        summary['teams'] = len(updated)
+        summary['failed'] += len(dirty_teams) - len(updated)
+        self._save_dirty_teams(dirty_teams - updated)
+
+        print(f"✓ Scored {summary['matches']} match(es): {summary['match_points']} match_points row(s), "
+              f"{summary['teams']} team(s) updated")
+        return summary
+
+def score_changed_matches(client, records, mode=None, force_history=False):
+    """
+    Score the matches changed in a run according to SCORING_MODE
+
+    Args:
+        client: Supabase client
+        records: tennis_matches rows written in this run
+        mode: Override SCORING_MODE ('local', 'edge' or 'off')
+        force_history: Record the team points history even if nothing changed
+                       (once per nightly run, so every day has a snapshot)
+
+    Returns:
+        Scoring summary dictionary, None when nothing was scored
+    """
+    mode = mode or SCORING_MODE
+    if mode == 'off':
+        return None
+    summary = None
+    if not records:
+        print("⊘ No matches changed, scoring skipped")
+        if not force_history:
+            return None
+    elif mode == 'edge':
+        client.functions.invoke('process_unlogged_matches')
+        client.functions.invoke('update_all_team_points')
+        summary = None
+    else:
+        if mode != 'local':
+            print(f"⚠ Unknown SCORING_MODE '{mode}', scoring locally")
+        summary = TeamPointsEngine(client).score_matches(records)
+        if not summary['teams'] and not force_history:
+            return summary
+
+    try:
+        record_team_points(client, force=force_history)
+    except Exception as e:
+        print(f"⚠ Could not record team points history: {e}")
+    return summary
@@ -0,0 +1,201 @@
+"""
+Chunked upsert helpers for Supabase/PostgREST tables
+
+A failing chunk is only bisected for row-level errors (constraint
+violations, bad values, other 4xx). Connection errors, timeouts and 5xx
+responses are retried UPSERT_RETRIES times with exponential backoff and then
+reported for the whole chunk, so an outage costs a few requests instead of
+one per row.
+"""
+
+import os
+import time
+
+from metrics import get_metrics
+
+DEFAULT_BATCH_SIZE = 500
+UPSERT_RETRIES = int(os.getenv('UPSERT_RETRIES', 3))
+UPSERT_BACKOFF_BASE = float(os.getenv('UPSERT_BACKOFF_BASE', 1))
+
+# SQLSTATE classes of errors that say nothing about the rows: connection
+# exception, transaction rollback, insufficient resources, operator intervention
+TRANSIENT_SQLSTATE_CLASSES = ('08', '40', '53', '57')
+
+def is_transient_error(error):
+    """
+    True if a failed request should be retried rather than blamed on its rows
+
+    Args:
+        error: Exception raised by a postgrest request
+
+    Returns:
+        True for connection errors, timeouts, 429/5xx responses and transient
+        SQLSTATE classes, False for row-level errors
+    """
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    if type(error).__module__.split('.')[0] in ('httpx', 'httpcore'):
+        return True
+    # postgrest APIError: SQLSTATE / PGRST code, or the HTTP status for non-JSON responses
+    code = getattr(error, 'code', None)
+    if isinstance(code, str) and code.isdigit() and len(code) == 3:
+        code = int(code)
+    if isinstance(code, int):
+        return code == 429 or code >= 500
+    if isinstance(code, str):
+        if code.startswith('PGRST'):
+            return code.startswith('PGRST0')
+        return code[:2] in TRANSIENT_SQLSTATE_CLASSES
+    return False
+
+def chunked(rows, size):
+    """
+    Split a list of rows into consecutive chunks
+
+    Args:
+        rows: List of records
+        size: Maximum number of records per chunk
+
+    Yields:
+        Lists of at most `size` records
+    """
+    size = max(1, int(size))
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+def upsert_in_chunks(client, table_name, rows, on_conflict, batch_size=DEFAULT_BATCH_SIZE,
+                     ignore_duplicates=False, retries=None):
+    """
+    Upsert rows with one request per chunk instead of one per row.
+    A chunk failing on row-level errors is split in half repeatedly so that
+    only the rows that actually fail end up in the failed list; transient
+    errors are retried with backoff instead.
+
+    Args:
+        client: Supabase client
+        table_name: Supabase table name
+        rows: List of records (every record must have the same keys)
+        on_conflict: Comma separated conflict columns for the upsert
+        batch_size: Number of rows sent per request
+        ignore_duplicates: If True, keep existing rows instead of updating them
+        retries: Retries of a chunk on transient errors (defaults to UPSERT_RETRIES)
+
+    Returns:
+        Tuple of (upserted_rows, failed_rows) where failed_rows is a list
+        of {'row': record, 'error': message, 'transient': bool} dictionaries
+    """
+    if retries is None:
+        retries = UPSERT_RETRIES
+    upserted = []
+    failed = []
+    metrics = get_metrics()
+    stage = f"upsert_{table_name}"
+    start = time.perf_counter()
+
+    chunks = list(chunked(rows, batch_size))
+    for index, chunk in enumerate(chunks, start=1):
+        failed_before = len(failed)
+        _upsert_bisect(client, table_name, chunk, on_conflict, ignore_duplicates, upserted, failed, retries)
+        failed_in_chunk = len(failed) - failed_before
+        if failed_in_chunk:
+            print(f"⚠ Chunk {index}/{len(chunks)} ({len(chunk)} rows): {failed_in_chunk} row(s) failed")
+        else:
+            print(f"✓ Chunk {index}/{len(chunks)}: upserted {len(chunk)} rows into {table_name}")
+
+    metrics.add_time(stage, time.perf_counter() - start)
+    metrics.count(stage, 'rows', len(upserted))
+    metrics.count(stage, 'errors', len(failed))
+    return upserted, failed
+
+def _upsert_bisect(client, table_name, rows, on_conflict, ignore_duplicates, upserted, failed, retries):
+    """Upsert rows, retrying transient errors and halving the batch on row errors until the bad rows are isolated"""
+    metrics = get_metrics()
+    for attempt in range(retries + 1):
+        metrics.count(f"upsert_{table_name}", 'requests')
+        try:
+            client.table(table_name).upsert(rows, on_conflict=on_conflict,
+                                            ignore_duplicates=ignore_duplicates).execute()
+            upserted.extend(rows)
+            return
+        except Exception as e:
+            error = e
+            if not is_transient_error(e):
+                break
+            if attempt == retries:
+                # Still failing: the rows are fine, the database is not
+                failed.extend({'row': row, 'error': str(e), 'transient': True} for row in rows)
+                return
+            delay = UPSERT_BACKOFF_BASE * 2 ** attempt
+            metrics.count(f"upsert_{table_name}", 'retries')
+            print(f"⚠ Upsert into {table_name} failed ({e}), retrying in {delay:.0f}s")
+            time.sleep(delay)
+
+    if len(rows) == 1:
+        failed.append({'row': rows[0], 'error': str(error), 'transient': False})
+        return
+
+    middle = len(rows) // 2
+    _upsert_bisect(client, table_name, rows[:middle], on_conflict, ignore_duplicates, upserted, failed, retries)
+    _upsert_bisect(client, table_name, rows[middle:], on_conflict, ignore_duplicates, upserted, failed, retries)
+
+def select_in(client, table_name, columns, column, values, chunk_size=200, page_size=1000):
+    """
+    Select all rows whose `column` is in `values`
+    Values are sent in chunks (to keep URLs short) and every chunk is paged
+    past PostgREST's max-rows limit.
+
+    Args:
+        client: Supabase client
+        table_name: Supabase table name
+        columns: Comma separated columns to select
+        column: Column to filter on
+        values: Iterable of values to match
+        chunk_size: Values per request
+        page_size: Rows per page
+
+    Returns:
+        List of row dictionaries
+    """
+    values = list(dict.fromkeys(values))
+    rows = []
+    for chunk in chunked(values, chunk_size):
+        start = 0
+        while True:
+            response = (client.table(table_name)
+                        .select(columns)
+                        .in_(column, chunk)
+                        .range(start, start + page_size - 1)
+                        .execute())
+            rows.extend(response.data)
+            if len(response.data) < page_size:
+                break
+            start += page_size
+    return rows
+
+def select_all(client, table_name, columns, order_by, page_size=1000):
+    """
+    Select every row of a table, paging past PostgREST's max-rows limit
+
+    Args:
+        client: Supabase client
+        table_name: Supabase table name
+        columns: Comma separated columns to select
+        order_by: Column that gives the pages a stable order
+        page_size: Rows per page
+
+    Returns:
+        List of row dictionaries
+    """
+    rows = []
+    start = 0
+    while True:
+        response = (client.table(table_name)
+                    .select(columns)
+                    .order(order_by)
+                    .range(start, start + page_size - 1)
+                    .execute())
+        rows.extend(response.data)
+        if len(response.data) < page_size:
+            break
+        start += page_size
+    return rows
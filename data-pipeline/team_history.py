@@ -0,0 +1,238 @@
+"""
+Team points history and precomputed leaderboard movement
+
+Each team's points and leaderboard rank are appended as one line to
+TEAM_HISTORY_FILE (JSON lines, {"ts", "teams": {id: [points, rank]}}) when a
+scoring run changed them, and once per nightly run regardless, so live polls
+that change nothing do not flood the history. Rank and points changes against
+the snapshot nearest to the start of each window are computed once per
+publish, so the leaderboard looks up a team's movement in a dictionary
+instead of reading history.
+
+TEAM_HISTORY_WINDOWS configures the windows as name=seconds pairs; a window of
+0 seconds compares with the previous snapshot (the last recorded change):
+    run=0,day=86400,week=604800   (default)
+A window has no baseline (movement 0) unless a snapshot lies within
+TEAM_HISTORY_TOLERANCE (a fraction of the window) of its start.
+
+Storage stays bounded: every snapshot of the last TEAM_HISTORY_FULL_DAYS is
+kept, older ones are thinned to the last snapshot of each day, and snapshots
+older than TEAM_HISTORY_MAX_DAYS are dropped.
+"""
+
+import bisect
+import json
+import os
+import time
+from datetime import datetime
+
+from change_detection import STATE_FOLDER
+from supabase_batch import select_all
+
+TEAM_HISTORY_FILE = os.path.join(STATE_FOLDER, 'team_points_history.jsonl')
+TEAM_HISTORY_FULL_DAYS = int(os.getenv('TEAM_HISTORY_FULL_DAYS', 14))
+TEAM_HISTORY_MAX_DAYS = int(os.getenv('TEAM_HISTORY_MAX_DAYS', 400))
+LEADERBOARD_CHANGE_WINDOW = os.getenv('LEADERBOARD_CHANGE_WINDOW', 'day')
+TEAM_HISTORY_TOLERANCE = float(os.getenv('TEAM_HISTORY_TOLERANCE', 0.25))
+
+def parse_windows(value):
+    """
+    Parse 'name=seconds,...' into an ordered {name: seconds} dictionary
+
+    Entries without '=' or with a malformed number are ignored.
+    """
+    windows = {}
+    for item in value.split(','):
+        name, _, seconds = item.partition('=')
+        try:
+            windows[name.strip()] = int(seconds)
+        except ValueError:
+            continue
+    return windows
+
+TEAM_HISTORY_WINDOWS = parse_windows(os.getenv('TEAM_HISTORY_WINDOWS', 'run=0,day=86400,week=604800'))
+
+def rank_teams(team_points):
+    """
+    Leaderboard ranks from points (tied teams share a rank: 1, 2, 2, 4)
+
+    Args:
+        team_points: {team_id: points}
+
+    Returns:
+        {team_id: rank}
+    """
+    ordered = sorted(team_points.items(), key=lambda item: -item[1])
+    ranks = {}
+    for position, (team_id, points) in enumerate(ordered, start=1):
+        if position > 1 and points == ordered[position - 2][1]:
+            ranks[team_id] = ranks[ordered[position - 2][0]]
+        else:
+            ranks[team_id] = position
+    return ranks
+
+class TeamPointsHistory:
+    """
+    Append-only points/rank snapshots of every team
+
+    Usage:
+        history = TeamPointsHistory()
+        history.append({team_id: current_points, ...}, only_if_changed=True)
+        history.movement()[team_id]['day']   # {'rank': +2, 'points': 150}
+    """
+
+    def __init__(self, path=TEAM_HISTORY_FILE):
+        self.path = path
+        self.snapshots = []
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        if line.strip():
+                            self.snapshots.append(json.loads(line))
+            except (OSError, ValueError) as e:
+                print(f"⚠ Could not read team history {path}, starting fresh: {e}")
+                self.snapshots = []
+        self.timestamps = [snapshot['ts'] for snapshot in self.snapshots]
+
+    def append(self, team_points, ts=None, only_if_changed=False):
+        """
+        Record the current points and ranks of every team
+
+        Args:
+            team_points: {team_id: points}
+            ts: Snapshot time (defaults to now)
+            only_if_changed: Skip the snapshot if it equals the latest one
+
+        Returns:
+            True if a snapshot was recorded
+        """
+        ts = ts if ts is not None else time.time()
+        ranks = rank_teams(team_points)
+        snapshot = {'ts': ts, 'teams': {str(team_id): [points, ranks[team_id]]
+                                         for team_id, points in team_points.items()}}
+        if only_if_changed and self.snapshots and self.snapshots[-1]['teams'] == snapshot['teams']:
+            return False
+        self.snapshots.append(snapshot)
+        self.timestamps.append(ts)
+
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        if self.compact(ts):
+            self._rewrite()
+        else:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(snapshot, separators=(',', ':')) + "\n")
+        return True
+
+    def compact(self, now=None):
+        """
+        Thin old snapshots to one per day and drop expired ones
+
+        Returns:
+            True if any snapshot was removed
+        """
+        now = now if now is not None else time.time()
+        full_cutoff = now - TEAM_HISTORY_FULL_DAYS * 86400
+        max_cutoff = now - TEAM_HISTORY_MAX_DAYS * 86400
+
+        kept = []
+        for index, snapshot in enumerate(self.snapshots):
+            if snapshot['ts'] < max_cutoff:
+                continue
+            if snapshot['ts'] < full_cutoff and index + 1 < len(self.snapshots):
+                # Keep only the last snapshot of each old day
+                day = datetime.fromtimestamp(snapshot['ts']).date()
+                if datetime.fromtimestamp(self.snapshots[index + 1]['ts']).date() == day:
+                    continue
+            kept.append(snapshot)
+
+        if len(kept) == len(self.snapshots):
+            return False
+        self.snapshots = kept
+        self.timestamps = [snapshot['ts'] for snapshot in kept]
+        return True
+
+    def _rewrite(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for snapshot in self.snapshots:
+                f.write(json.dumps(snapshot, separators=(',', ':')) + "\n")
+        os.replace(tmp_path, self.path)
+
+    def baseline(self, seconds, tolerance=None):
+        """
+        Snapshot a window compares against
+
+        Args:
+            seconds: Window length, 0 for the previous snapshot
+            tolerance: Fraction of the window the snapshot may be away from its start
+                       (defaults to TEAM_HISTORY_TOLERANCE)
+
+        Returns:
+            Snapshot dictionary, None if no snapshot is close enough to the start of the window
+        """
+        if len(self.snapshots) < 2:
+            return None
+        if seconds <= 0:
+            return self.snapshots[-2]
+        tolerance = TEAM_HISTORY_TOLERANCE if tolerance is None else tolerance
+        target = self.timestamps[-1] - seconds
+        # Nearest of the snapshots on either side of the start (never the latest one itself)
+        position = bisect.bisect_right(self.timestamps, target, 0, len(self.timestamps) - 1)
+        candidates = [index for index in (position - 1, position) if 0 <= index < len(self.snapshots) - 1]
+        nearest = min(candidates, key=lambda index: abs(self.timestamps[index] - target))
+        if abs(self.timestamps[nearest] - target) > seconds * tolerance:
+            return None
+        return self.snapshots[nearest]
+
+    def movement(self, windows=None):
+        """
+        Rank and points change of every team in the latest snapshot, per window
+
+        Args:
+            windows: {name: seconds} (defaults to TEAM_HISTORY_WINDOWS)
+
+        Returns:
+            {team_id (str): {window: {'rank': places gained, 'points': points gained}}};
+            windows without a baseline or teams missing from it report 0
+        """
+        if not self.snapshots:
+            return {}
+        windows = windows or TEAM_HISTORY_WINDOWS
+        latest = self.snapshots[-1]['teams']
+        baselines = {name: self.baseline(seconds) for name, seconds in windows.items()}
+
+        movement = {}
+        for team_id, (points, rank) in latest.items():
+            team_movement = {}
+            for name, baseline in baselines.items():
+                previous = baseline['teams'].get(team_id) if baseline else None
+                if previous is None:
+                    team_movement[name] = {'rank': 0, 'points': 0}
+                else:
+                    team_movement[name] = {'rank': previous[1] - rank, 'points': points - previous[0]}
+            movement[team_id] = team_movement
+        return movement
+
+def record_team_points(client, path=TEAM_HISTORY_FILE, force=False):
+    """
+    Append the current points of every team to the history
+
+    Args:
+        client: Supabase client
+        force: Record even if no team's points changed since the latest snapshot
+
+    Returns:
+        Number of teams recorded (0 if nothing changed)
+    """
+    teams = select_all(client, 'teams', 'id,current_points', 'id')
+    recorded = TeamPointsHistory(path).append({team['id']: team.get('current_points') or 0 for team in teams},
+                                              only_if_changed=not force)
+    if not recorded:
+        print("⊘ Team points unchanged, history not recorded")
+        return 0
+    print(f"✓ Recorded points history for {len(teams)} team(s)")
+    return len(teams)
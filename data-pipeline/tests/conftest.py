@@ -0,0 +1,14 @@
+"""Shared fixtures: pipeline modules on the path and state kept in a temporary folder"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path, monkeypatch):
+    """Run every test from an empty folder, so .pipeline_state starts empty"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,34 @@
+import glob
+import io
+import json
+import os
+
+import pytest
+
+from event_stream import iter_events
+
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                         'tennis_data', 'matches_*.json')))
+
+@pytest.mark.skipif(not FIXTURES, reason="no tennis_data fixtures")
+@pytest.mark.parametrize('chunk_size', [65536, 7])
+def test_matches_json_load_on_a_fixture(chunk_size):
+    with open(FIXTURES[0], 'rb') as f:
+        raw = f.read()
+    tee = io.BytesIO()
+
+    events = list(iter_events(io.BytesIO(raw), tee=tee, chunk_size=chunk_size))
+
+    assert events == json.loads(raw)['events']
+    assert tee.getvalue() == raw
+
+def test_reads_split_inside_keys_strings_and_characters():
+    document = {'meta': 'x' * 40, 'events': [{'id': 1, 'name': 'Müller'}, {'id': 2, 'tags': ['a', {'b': '[]'}]}]}
+    raw = json.dumps(document, ensure_ascii=False).encode('utf-8')
+
+    # Every chunk size moves the buffer boundaries, including through the two-byte ü
+    for chunk_size in range(1, 12):
+        assert list(iter_events(io.BytesIO(raw), chunk_size=chunk_size)) == document['events']
+
+def test_payload_without_events():
+    assert list(iter_events(io.BytesIO(b'{"error": "rate limited"}'), chunk_size=4)) == []
@@ -0,0 +1,38 @@
+import pytest
+
+import clients
+import player_snapshot
+import ranking_history
+from fake_supabase import FakeSupabase
+from fetch_api_rankings import process_rankings
+from player_snapshot import PlayerSnapshot
+from write_spool import WriteSpool, set_write_spool
+
+RANKINGS = {'rankings': [{'ranking': rank, 'points': 1000 - rank, 'team': {'id': rank, 'name': f"Player {rank}"}}
+                         for rank in (1, 2, 3)]}
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """FakeSupabase rejecting the players row of player 2, behind a spool in tmp_path"""
+    client = FakeSupabase(fail_on=lambda table_name, action, payload: table_name == 'players' and any(
+        row['player_id'] == 2 for row in payload))
+    previous_client = clients.set_supabase(client)
+    spool = WriteSpool(str(tmp_path / 'spool.sqlite3'))
+    previous_spool = set_write_spool(spool)
+    monkeypatch.setattr(player_snapshot, '_snapshot', PlayerSnapshot('players.json'))
+    monkeypatch.setattr(ranking_history, '_histories', {})
+    yield client
+    spool.stop()
+    set_write_spool(previous_spool)
+    clients.set_supabase(previous_client)
+
+@pytest.mark.parametrize('bulk', [True, False])
+def test_rankings_wait_for_their_players(client, bulk):
+    stored = process_rankings(RANKINGS, 'atp', '2026-10-12', bulk=bulk)
+
+    # Player 2 never made it in, so neither does its ranking
+    assert stored == 2
+    assert sorted(row['player_id'] for row in client.tables['players']) == [1, 3]
+    assert sorted(row['player_id'] for row in client.tables['player_rankings']) == [1, 3]
+    assert player_snapshot.get_player_snapshot().get(2) is None
+    assert ranking_history.get_ranking_history('atp').top_n('2026-10-12', 5) == [(1, 1, 999), (3, 3, 997)]
@@ -0,0 +1,52 @@
+from fake_supabase import FakeSupabase
+from match_enrichment import ENRICH_MAX_ATTEMPTS, EnrichmentIndex, enrich_matches
+
+STATISTICS = {'statistics': [{'period': 'ALL', 'groups': [
+    {'statisticsItems': [{'key': 'aces', 'homeValue': 7, 'awayValue': 3}]}]}]}
+
+def finished(match_id):
+    return {'match_id': match_id, 'status_type': 'finished', 'winner_code': 1}
+
+def test_enriches_finished_matches_once():
+    client = FakeSupabase()
+    index = EnrichmentIndex('index.json')
+    calls = []
+
+    def fetch(match_ids):
+        calls.append(match_ids)
+        return {match_id: STATISTICS for match_id in match_ids}
+
+    summary = enrich_matches(client, [finished(1), finished(2)], index=index, fetch=fetch)
+    enrich_matches(client, [finished(1)], index=index, fetch=fetch)
+
+    assert summary['enriched'] == 2
+    assert calls == [[1, 2]]
+    assert client.tables['match_statistics'][0]['totals'] == {'aces': {'home': 7, 'away': 3}}
+
+def test_failed_requests_back_off_without_blocking_the_queue():
+    client = FakeSupabase()
+    index = EnrichmentIndex('index.json')
+    summary = enrich_matches(client, [finished(1)], index=index, fetch=lambda match_ids: {1: None})
+    assert summary['failed'] == 1
+
+    # Match 1 is not due yet, so match 2 is fetched on its own
+    requested = []
+
+    def fetch(match_ids):
+        requested.extend(match_ids)
+        return {match_id: STATISTICS for match_id in match_ids}
+
+    enrich_matches(client, [finished(2)], index=index, fetch=fetch, max_per_run=1)
+    assert requested == [2]
+    assert index.next_batch(10) == []
+    assert index.next_batch(10, now=float('inf')) == [1]
+
+def test_every_failure_counts_towards_giving_up():
+    # Request errors, missing statistics and failed writes all go through failed()
+    index = EnrichmentIndex('index.json')
+    index.enqueue([1])
+    for attempt in range(ENRICH_MAX_ATTEMPTS):
+        assert index.failed(1, now=0) == (attempt == ENRICH_MAX_ATTEMPTS - 1)
+
+    assert index.pending == {}
+    assert index.done == {'1': ''}
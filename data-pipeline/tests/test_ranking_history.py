@@ -0,0 +1,23 @@
+from ranking_history import RankingHistory
+
+def ranking(ranks):
+    return [{'player_id': player_id, 'rank': rank, 'points': 1000 - rank} for player_id, rank in ranks.items()]
+
+def test_movers_keep_gainers_and_losers_apart(tmp_path):
+    history = RankingHistory('atp', folder=str(tmp_path))
+    history.append('2026-10-05', ranking({1: 1, 2: 2, 3: 3, 4: 4, 5: 5, 6: 6}))
+    history.append('2026-10-12', ranking({2: 1, 1: 2, 3: 3, 5: 4, 4: 5, 6: 6}))
+
+    movers = history.movers('2026-10-05', '2026-10-12', n=5)
+
+    assert movers == {'up': [(2, 2, 1, 1), (5, 5, 4, 1)], 'down': [(1, 1, 2, -1), (4, 4, 5, -1)]}
+
+def test_movers_are_ordered_by_size_and_limited_to_n(tmp_path):
+    history = RankingHistory('atp', folder=str(tmp_path))
+    history.append('2026-10-05', ranking({1: 10, 2: 20, 3: 30, 4: 40}))
+    history.append('2026-10-12', ranking({1: 5, 2: 2, 3: 29, 4: 50}))
+
+    movers = history.movers('2026-10-05', '2026-10-12', n=2)
+
+    assert [entry[0] for entry in movers['up']] == [2, 1]
+    assert movers['down'] == [(4, 40, 50, -10)]
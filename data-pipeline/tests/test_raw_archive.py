@@ -0,0 +1,30 @@
+from raw_archive import RawArchive
+
+def event(match_id, score=0):
+    return {'id': match_id, 'homeScore': {'current': score},
+            'tournament': {'name': f"Tournament {match_id % 7}", 'category': {'name': 'ATP'}},
+            'homeTeam': {'name': f"Player {match_id}", 'country': {'alpha3': 'FRA'}},
+            'awayTeam': {'name': f"Player {match_id + 1000}", 'country': {'alpha3': 'ESP'}},
+            'status': {'type': 'finished', 'description': 'Ended'}}
+
+def test_round_trip_across_a_dictionary_rebuild(tmp_path):
+    archive = RawArchive(str(tmp_path / 'raw_archive'))
+
+    # Too small a sample for a dictionary: compressed without one
+    small_day = [event(1), event(2)]
+    assert archive.append_day('2026-10-01', small_day) == (2, 0)
+
+    # Enough events: the next day builds dictionary version 1 and uses it
+    big_day = [event(match_id) for match_id in range(100, 160)]
+    assert archive.append_day('2026-10-02', big_day) == (60, 0)
+    assert archive.append_day('2026-10-02', big_day) == (0, 60)
+    changed = event(100, score=2)
+    assert archive.append_day('2026-10-02', [changed]) == (1, 0)
+
+    # A fresh reader finds the dictionary of every record
+    reader = RawArchive(str(tmp_path / 'raw_archive'))
+    assert list(reader.read_day('2026-10-01')) == small_day
+    assert list(reader.read_day('2026-10-02')) == big_day[1:] + [changed]
+    assert reader.read_match('2026-10-02', 100, version=0) == big_day[0]
+    assert [entry[4] for versions in reader._load_index('2026-10-01').values() for entry in versions] == [0, 0]
+    assert {entry[4] for versions in reader._load_index('2026-10-02').values() for entry in versions} == {1}
@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+import player_snapshot
+from fake_supabase import FakeSupabase
+from player_snapshot import PlayerSnapshot
+from read_models import publish_read_models
+
+@pytest.fixture
+def snapshot(monkeypatch):
+    snapshot = PlayerSnapshot('players.json')
+    monkeypatch.setattr(player_snapshot, '_snapshot', snapshot)
+    return snapshot
+
+def test_unchanged_publish_touches_nothing(snapshot):
+    client = FakeSupabase({'teams': [{'id': 1, 'name': 'Aces', 'current_points': 3}]})
+    publish_read_models(client, 'data')
+    modified = {name: os.stat(os.path.join('data', name)).st_mtime_ns for name in os.listdir('data')}
+
+    assert set(publish_read_models(client, 'data').values()) == {'unchanged'}
+    assert {name: os.stat(os.path.join('data', name)).st_mtime_ns for name in os.listdir('data')} == modified
+
+def test_renamed_player_rebuilds_players(snapshot):
+    record = {'player_id': 7, 'name': 'J. Doe', 'gender': 'M'}
+    client = FakeSupabase({'players': [record]})
+    snapshot.commit([record])
+    publish_read_models(client, 'data')
+
+    renamed = {**record, 'name': 'Jane Doe', 'gender': 'F'}
+    client.tables['players'] = [renamed]
+    snapshot.commit([renamed])
+    results = publish_read_models(client, 'data')
+
+    assert results['players'] == 'written'
+    assert results['leaderboard'] == 'unchanged'
@@ -0,0 +1,30 @@
+from datetime import date, datetime, timedelta
+
+from response_cache import ResponseCache
+
+FINISHED = {'events': [{'id': 1, 'status': {'type': 'finished'}}]}
+DAY = (date.today() - timedelta(days=5)).isoformat()
+
+def timestamp(days_after, hour):
+    """Local unix time `days_after` days after DAY at `hour`"""
+    return (datetime.fromisoformat(DAY) + timedelta(days=days_after, hours=hour)).timestamp()
+
+def test_date_fetched_before_midnight_is_not_cached_forever():
+    cache = ResponseCache('cache', bypass=False)
+    # Every event finished, but more can still be added before the day is over
+    cache.put_events(DAY, FINISHED, now=timestamp(0, 22))
+
+    assert cache.get_events(DAY, now=timestamp(0, 22) + 60) == FINISHED
+    assert cache.get_events(DAY, now=timestamp(2, 12)) is None
+
+def test_date_fetched_after_midnight_is_cached_forever():
+    cache = ResponseCache('cache', bypass=False)
+    cache.put_events(DAY, FINISHED, now=timestamp(1, 1))
+
+    assert cache.get_events(DAY, now=timestamp(4, 12)) == FINISHED
+
+def test_date_without_events_is_never_final():
+    cache = ResponseCache('cache', bypass=False)
+    cache.put_events(DAY, {'events': []}, now=timestamp(1, 1))
+
+    assert cache.get_events(DAY, now=timestamp(4, 12)) is None
@@ -0,0 +1,72 @@
+from fake_supabase import FakeSupabase
+from scoring import TeamPointsEngine
+
+REFERENCE = [{'category_slug': 'atp', 'tournament_type': None, 'round_name': 'Final', 'round_type': None,
+              'points_for_win': 100}]
+ROSTER = [{'team_id': 1, 'player_id': 10}, {'team_id': 2, 'player_id': 10}, {'team_id': 2, 'player_id': 20}]
+
+def match(match_id, winner_code, status_type='finished'):
+    return {'match_id': match_id, 'status_type': status_type, 'winner_code': winner_code,
+            'player1_id': 10, 'player2_id': 20, 'category_slug': 'atp', 'tournament_type': None,
+            'round_name': 'Final', 'round_type': None}
+
+def make_client(**tables):
+    return FakeSupabase({'atp_points_reference': REFERENCE, 'teams_players': ROSTER,
+                         'teams': [{'id': 1, 'current_points': 0}, {'id': 2, 'current_points': 0}],
+                         **tables})
+
+def team_points(client):
+    return {team['id']: team['current_points'] for team in client.tables['teams']}
+
+def test_scores_winner_into_every_team_holding_the_player():
+    client = make_client()
+    summary = TeamPointsEngine(client).score_matches([match(1, 1)])
+
+    assert summary['match_points'] == 2
+    assert team_points(client) == {1: 100, 2: 100}
+
+def test_rescoring_the_same_match_is_idempotent():
+    client = make_client()
+    TeamPointsEngine(client).score_matches([match(1, 1)])
+    TeamPointsEngine(client).score_matches([match(1, 1)])
+
+    assert team_points(client) == {1: 100, 2: 100}
+
+def test_changed_winner_moves_points_without_double_counting():
+    client = make_client()
+    TeamPointsEngine(client).score_matches([match(1, 1)])
+    TeamPointsEngine(client).score_matches([match(1, 2)])
+
+    assert team_points(client) == {1: 0, 2: 100}
+
+def test_totals_are_recomputed_not_incremented():
+    # A total that drifted (or was already incremented by a crashed run) is repaired
+    client = make_client(teams=[{'id': 1, 'current_points': 999}, {'id': 2, 'current_points': 999}])
+    TeamPointsEngine(client).score_matches([match(1, 1)])
+
+    assert team_points(client) == {1: 100, 2: 100}
+
+def test_unfinished_matches_are_not_scored():
+    client = make_client()
+    summary = TeamPointsEngine(client).score_matches([match(1, None, status_type='inprogress')])
+
+    assert summary['matches'] == 0
+    assert 'match_points' not in client.tables
+    assert team_points(client) == {1: 0, 2: 0}
+
+def test_teams_left_dirty_by_a_failed_update_are_retried_next_run():
+    client = make_client()
+    client.fail_on = lambda table_name, action, payload: table_name == 'teams' and action == 'update'
+    summary = TeamPointsEngine(client).score_matches([match(1, 1)])
+    assert summary['teams'] == 0
+    assert team_points(client) == {1: 0, 2: 0}
+
+    # match_points is already stored, so nothing new is scored, but the teams are still repaired
+    client.fail_on = None
+    summary = TeamPointsEngine(client).score_matches([match(1, 1)])
+    assert summary['match_points'] == 0
+    assert summary['teams'] == 2
+    assert team_points(client) == {1: 100, 2: 100}
+
+    summary = TeamPointsEngine(client).score_matches([])
+    assert summary['teams'] == 0
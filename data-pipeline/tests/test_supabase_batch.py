@@ -0,0 +1,39 @@
+import pytest
+
+import supabase_batch
+from fake_supabase import FakeSupabase
+from supabase_batch import upsert_in_chunks
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(supabase_batch, 'UPSERT_BACKOFF_BASE', 0)
+
+def rows(count):
+    return [{'match_id': match_id} for match_id in range(1, count + 1)]
+
+def test_bad_row_is_bisected_out_of_its_chunk():
+    client = FakeSupabase(fail_on=lambda table_name, action, payload: any(row['match_id'] == 3 for row in payload))
+    upserted, failed = upsert_in_chunks(client, 'tennis_matches', rows(8), on_conflict='match_id', batch_size=4)
+
+    assert sorted(row['match_id'] for row in upserted) == [1, 2, 4, 5, 6, 7, 8]
+    assert [(failure['row']['match_id'], failure['transient']) for failure in failed] == [(3, False)]
+    assert sorted(row['match_id'] for row in client.tables['tennis_matches']) == [1, 2, 4, 5, 6, 7, 8]
+    # The clean chunk is one request, the bad one is halved down to the failing row
+    assert len(client.requests) < 8
+
+def test_transient_error_is_retried_not_reported():
+    outages = [ConnectionError('connection reset')]
+    client = FakeSupabase(fail_on=lambda table_name, action, payload: outages.pop() if outages else None)
+    upserted, failed = upsert_in_chunks(client, 'tennis_matches', rows(4), on_conflict='match_id', retries=2)
+
+    assert failed == []
+    assert len(upserted) == 4
+    assert len(client.requests) == 2
+
+def test_lasting_outage_fails_the_chunk_as_transient_without_bisecting():
+    client = FakeSupabase(fail_on=lambda table_name, action, payload: TimeoutError('timed out'))
+    upserted, failed = upsert_in_chunks(client, 'tennis_matches', rows(4), on_conflict='match_id', retries=1)
+
+    assert upserted == []
+    assert len(failed) == 4 and all(failure['transient'] for failure in failed)
+    assert len(client.requests) == 2
@@ -0,0 +1,32 @@
+from team_history import TeamPointsHistory
+
+DAY = 86400
+
+def history_at(timestamps):
+    history = TeamPointsHistory('history.jsonl')
+    for points, ts in enumerate(timestamps):
+        history.append({1: points * 10, 2: 5}, ts=ts)
+    return history
+
+def test_baseline_is_the_snapshot_nearest_to_the_window_start():
+    now = 100 * DAY
+    history = history_at([now - DAY - 3600, now - DAY + 600, now - 3600, now])
+    assert history.baseline(DAY)['ts'] == now - DAY + 600
+
+def test_baseline_outside_the_tolerance_is_ignored():
+    now = 100 * DAY
+    # Only a 3 day old snapshot: no baseline for the day window instead of a 3 day change
+    history = history_at([now - 3 * DAY, now])
+    assert history.baseline(DAY) is None
+    assert history.movement({'day': DAY})['1'] == {'day': {'rank': 0, 'points': 0}}
+
+def test_run_window_compares_with_the_previous_snapshot():
+    history = history_at([0, 10, 20])
+    assert history.baseline(0)['ts'] == 10
+
+def test_unchanged_points_are_only_recorded_when_forced():
+    history = TeamPointsHistory('history.jsonl')
+    assert history.append({1: 10}, ts=1, only_if_changed=True)
+    assert not history.append({1: 10}, ts=2, only_if_changed=True)
+    assert history.append({1: 10}, ts=3)
+    assert [snapshot['ts'] for snapshot in TeamPointsHistory('history.jsonl').snapshots] == [1, 3]
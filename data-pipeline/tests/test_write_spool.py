@@ -0,0 +1,75 @@
+import pytest
+
+from fake_supabase import FakeSupabase
+from write_spool import SPOOL_MAX_ATTEMPTS, WriteSpool
+
+@pytest.fixture
+def spool(tmp_path, monkeypatch):
+    """Spool without the background writer, so tests drive the writes themselves"""
+    spool = WriteSpool(str(tmp_path / 'spool.sqlite3'))
+    monkeypatch.setattr(spool, 'start', lambda client: None)
+    return spool
+
+def match(match_id, version=1):
+    return {'match_id': match_id, 'version': version}
+
+def fail_rows(*bad):
+    """fail_on rejecting any upsert that contains one of the given (match_id, version) pairs"""
+    return lambda table_name, action, payload: action == 'upsert' and any(
+        (row['match_id'], row['version']) in bad for row in payload)
+
+def test_outage_keeps_rows_spooled(spool):
+    client = FakeSupabase(fail_on=lambda table_name, action, payload: ConnectionError('connection refused'))
+    acked = []
+    spool.append(client, 'tennis_matches', [match(1), match(2)], 'match_id', on_written=acked.extend)
+
+    assert spool.wait(timeout=0) == 2
+    assert acked == []
+
+    client.fail_on = None
+    assert spool.wait() == 0
+    assert acked == [match(1), match(2)]
+
+def test_row_error_writes_the_good_rows_and_acks_only_them(spool):
+    client = FakeSupabase(fail_on=fail_rows((2, 1)))
+    acked = []
+    spool.append(client, 'tennis_matches', [match(1), match(2), match(3)], 'match_id', on_written=acked.extend)
+
+    spool.write_batch(client)
+    spool.run_callbacks()
+
+    assert sorted(row['match_id'] for row in client.tables['tennis_matches']) == [1, 3]
+    assert acked == [match(1), match(3)]
+    assert spool.pending_count() == 1
+
+def test_dead_rows_are_never_acked(spool):
+    client = FakeSupabase(fail_on=fail_rows((1, 1)))
+    acked = []
+    spool.append(client, 'tennis_matches', [match(1)], 'match_id', on_written=acked.extend)
+
+    for _ in range(SPOOL_MAX_ATTEMPTS):
+        spool.write_batch(client)
+    spool.run_callbacks()
+
+    assert spool.pending_count() == 0
+    assert spool.dead_rows_count() == 1
+    assert acked == []
+
+    # A requeued dead row is written, but its original caller is long gone
+    client.fail_on = None
+    assert spool.requeue_dead() == 1
+    assert spool.wait() == 0
+    assert acked == []
+    assert client.tables['tennis_matches'] == [match(1)]
+
+def test_failing_row_is_not_written_after_a_newer_version(spool):
+    client = FakeSupabase(fail_on=fail_rows((1, 1)))
+    spool.append(client, 'tennis_matches', [match(1, version=1)], 'match_id')
+    spool.write_batch(client)
+    assert not client.tables.get('tennis_matches')
+
+    # The newer version is written in place of the failing one, never followed by it
+    spool.append(client, 'tennis_matches', [match(1, version=2)], 'match_id')
+    assert spool.wait() == 0
+    assert client.tables['tennis_matches'] == [match(1, version=2)]
+    assert spool.dead_rows_count() == 0
@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+Durable write-behind spool for Supabase upserts
+
+Sync writes (tennis_matches, players, player_rankings) are appended to a
+local SQLite spool (SPOOL_FILE) and return immediately; a background writer
+upserts them in batches of SPOOL_BATCH_SIZE in the order they were spooled,
+so players still land before the rankings that reference them.
+
+A failing batch is bisected (supabase_batch.upsert_in_chunks) and the error
+of each failing row decides what happens:
+    transient     outage: the batch stays spooled and is retried with
+                  exponential backoff (SPOOL_BACKOFF_BASE up to SPOOL_BACKOFF_MAX)
+    row-level     the other rows are written; a failing row keeps its place
+                  (so an older version never lands after a newer one) and
+                  moves to dead_rows after SPOOL_MAX_ATTEMPTS attempts
+Rows still spooled when a run ends (or crashes) are replayed at the start of
+the next run, so a transient outage never requires refetching.
+
+Callers only commit local state (match fingerprints, player snapshot,
+ranking history) for rows the writer acknowledged: spool_upsert takes an
+on_written callback, called with the rows once they are stored. Callbacks run
+when the thread that spooled the rows waits for the spool (wait_for_spool),
+never in the writer or another stage's thread.
+Rows that end up in dead_rows, or are still spooled when the process exits,
+are never acknowledged, so their state is left for the next run to retry.
+
+WRITE_SPOOL=off writes synchronously instead (previous behaviour).
+
+Usage:
+    python write_spool.py status
+    python write_spool.py flush
+    python write_spool.py requeue-dead
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from change_detection import STATE_FOLDER
+from metrics import get_metrics
+from supabase_batch import upsert_in_chunks, DEFAULT_BATCH_SIZE
+
+WRITE_SPOOL = os.getenv('WRITE_SPOOL', 'on')
+SPOOL_FILE = os.path.join(STATE_FOLDER, 'write_spool.sqlite3')
+SPOOL_BATCH_SIZE = int(os.getenv('SPOOL_BATCH_SIZE', os.getenv('UPSERT_BATCH_SIZE', DEFAULT_BATCH_SIZE)))
+SPOOL_BACKOFF_BASE = float(os.getenv('SPOOL_BACKOFF_BASE', 1))
+SPOOL_BACKOFF_MAX = float(os.getenv('SPOOL_BACKOFF_MAX', 60))
+SPOOL_MAX_ATTEMPTS = int(os.getenv('SPOOL_MAX_ATTEMPTS', 5))
+# Longest a run waits for the spool to drain before leaving the rest for the next run
+SPOOL_DRAIN_TIMEOUT = float(os.getenv('SPOOL_DRAIN_TIMEOUT', 300))
+
+SCHEMA = """
+create table if not exists spool (
+    id integer primary key autoincrement,
+    table_name text not null,
+    on_conflict text not null,
+    row text not null,
+    attempts integer not null default 0,
+    last_error text,
+    spooled_at real not null,
+    origin integer
+);
+create table if not exists dead_rows (
+    id integer primary key,
+    table_name text not null,
+    on_conflict text not null,
+    row text not null,
+    attempts integer not null,
+    last_error text,
+    spooled_at real not null,
+    failed_at real not null,
+    origin integer
+);
+"""
+
+def conflict_key(row, on_conflict):
+    """Values of a row's conflict columns"""
+    return tuple(row.get(column.strip()) for column in on_conflict.split(','))
+
+class SpoolOutage(Exception):
+    """Supabase could not be reached; the batch stays spooled"""
+
+class WriteSpool:
+    """
+    SQLite-backed queue of rows waiting to be upserted
+
+    Usage:
+        spool = get_write_spool()
+        spool.append(client, 'tennis_matches', rows, 'match_id')   # returns at once
+        ...
+        spool.wait()   # before reading the rows back
+    """
+
+    def __init__(self, path=SPOOL_FILE):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute('pragma journal_mode=wal')
+        self._db.executescript(SCHEMA)
+        # One connection shared by the caller threads and the writer
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._client = None
+        # origin (id of the first spool entry of a row) -> (spooling thread, on_written callback),
+        # for this process only
+        self._callbacks = {}
+        # (spooling thread, callback, row) of acknowledged rows, run when that thread waits
+        self._acknowledged = []
+        self.written_count = 0
+        self.dead_count = 0
+
+    def append(self, client, table_name, rows, on_conflict, on_written=None):
+        """
+        Durably spool rows and wake the background writer
+
+        Args:
+            on_written: Optional callback taking a list of rows, called once they are stored
+
+        Returns:
+            Number of rows spooled
+        """
+        if not rows:
+            return 0
+        now = time.time()
+        with self._lock:
+            with self._db:
+                self._db.execute('begin')
+                for row in rows:
+                    cursor = self._db.execute(
+                        'insert into spool (table_name, on_conflict, row, spooled_at) values (?, ?, ?, ?)',
+                        (table_name, on_conflict, json.dumps(row, separators=(',', ':')), now))
+                    if on_written is not None:
+                        self._callbacks[cursor.lastrowid] = (threading.get_ident(), on_written)
+        get_metrics().count('spool', 'rows_spooled', len(rows))
+        self._client = client
+        self.start(client)
+        self._wake.set()
+        return len(rows)
+
+    def pending_count(self):
+        with self._lock:
+            return self._db.execute('select count(*) from spool').fetchone()[0]
+
+    def dead_rows_count(self):
+        with self._lock:
+            return self._db.execute('select count(*) from dead_rows').fetchone()[0]
+
+    def _next_group(self, batch_size):
+        """
+        Oldest spooled rows that share a table and conflict columns
+
+        Returns:
+            Tuple of (table_name, on_conflict, entries as (id, origin, key, row), latest entry per key)
+        """
+        with self._lock:
+            rows = self._db.execute(
+                'select id, coalesce(origin, id), table_name, on_conflict, row, attempts from spool '
+                'order by id limit ?', (batch_size,)).fetchall()
+        if not rows:
+            return None, None, [], {}
+        table_name, on_conflict = rows[0][2], rows[0][3]
+        entries = []
+        latest = {}
+        for entry_id, origin, entry_table, entry_conflict, row_json, attempts in rows:
+            if (entry_table, entry_conflict) != (table_name, on_conflict):
+                break
+            row = json.loads(row_json)
+            key = conflict_key(row, on_conflict)
+            entries.append((entry_id, origin, key, row))
+            # PostgREST rejects a conflict key twice in one upsert; the newest row wins
+            latest[key] = (entry_id, attempts, row)
+        return table_name, on_conflict, entries, latest
+
+    def write_batch(self, client, batch_size=None):
+        """
+        Upsert the next group of spooled rows
+
+        Returns:
+            Number of spool entries handled (0 when the spool is empty)
+
+        Raises:
+            SpoolOutage: Supabase is unreachable, nothing was removed
+        """
+        with self._write_lock:
+            table_name, on_conflict, entries, latest = self._next_group(batch_size or SPOOL_BATCH_SIZE)
+            if not entries:
+                return 0
+            rows = [row for _, _, row in latest.values()]
+            metrics = get_metrics()
+            # No retries here: an outage is backed off by flush, with the rows kept spooled
+            _, failed = upsert_in_chunks(client, table_name, rows, on_conflict, batch_size=len(rows), retries=0)
+            outage = [failure for failure in failed if failure['transient']]
+            if outage:
+                metrics.count('spool', 'outages')
+                raise SpoolOutage(outage[0]['error'])
+
+            failed_keys = {conflict_key(failure['row'], on_conflict): failure['error'] for failure in failed}
+            now = time.time()
+            with self._lock:
+                with self._db:
+                    self._db.execute('begin')
+                    dead_ids = set()
+                    for key, error in failed_keys.items():
+                        entry_id, attempts, _ = latest[key]
+                        if attempts + 1 >= SPOOL_MAX_ATTEMPTS:
+                            dead_ids.add(entry_id)
+                            self._db.execute(
+                                'insert into dead_rows (id, table_name, on_conflict, row, attempts, last_error, '
+                                'spooled_at, failed_at, origin) '
+                                'select id, table_name, on_conflict, row, attempts + 1, ?, spooled_at, ?, '
+                                'coalesce(origin, id) from spool where id = ?', (error, now, entry_id))
+                            self._db.execute('delete from spool where id = ?', (entry_id,))
+                            self.dead_count += 1
+                            metrics.count('spool', 'dead_rows')
+                            print(f"✗ Giving up on a {table_name} row after {attempts + 1} attempts: {error}")
+                        else:
+                            # Keeps its place, so later versions of the row are not overtaken
+                            self._db.execute('update spool set attempts = attempts + 1, last_error = ? where id = ?',
+                                             (error, entry_id))
+                    # Older versions of a row are done once the newest is written (or given up with it)
+                    retry_ids = {latest[key][0] for key in failed_keys}
+                    self._db.executemany('delete from spool where id = ?',
+                                         [(entry_id,) for entry_id, _, _, _ in entries if entry_id not in retry_ids])
+                    for entry_id, origin, key, row in entries:
+                        if key not in failed_keys:
+                            callback = self._callbacks.pop(origin, None)
+                            if callback is not None:
+                                self._acknowledged.append((*callback, row))
+                        elif entry_id not in retry_ids or entry_id in dead_ids:
+                            # Never acknowledged: superseded by a failing version, or given up
+                            self._callbacks.pop(origin, None)
+
+            written = len(rows) - len(failed_keys)
+            self.written_count += written
+            metrics.count('spool', 'rows_written', written)
+            if failed_keys:
+                metrics.count('spool', 'row_errors', len(failed_keys))
+            return len(entries)
+
+    def run_callbacks(self):
+        """
+        Call the on_written callbacks of acknowledged rows spooled by the calling thread
+
+        Returns:
+            Number of rows acknowledged
+        """
+        thread_id = threading.get_ident()
+        with self._lock:
+            acknowledged = [entry for entry in self._acknowledged if entry[0] == thread_id]
+            self._acknowledged = [entry for entry in self._acknowledged if entry[0] != thread_id]
+        # One call per callback, with its rows in spool order
+        by_callback = {}
+        for _, callback, row in acknowledged:
+            by_callback.setdefault(callback, []).append(row)
+        for callback, rows in by_callback.items():
+            callback(rows)
+        return len(acknowledged)
+
+    def flush(self, client, timeout=SPOOL_DRAIN_TIMEOUT, stop=None):
+        """
+        Write spooled rows until the spool is empty, backing off during outages
+
+        Args:
+            client: Supabase client
+            timeout: Seconds to keep retrying before giving up for this run
+            stop: Optional threading.Event that ends the backoff early
+
+        Returns:
+            Number of rows still spooled
+        """
+        deadline = time.monotonic() + timeout
+        delay = SPOOL_BACKOFF_BASE
+        while True:
+            try:
+                if not self.write_batch(client):
+                    break
+                delay = SPOOL_BACKOFF_BASE
+            except SpoolOutage as e:
+                if time.monotonic() + delay > deadline:
+                    break
+                print(f"⚠ Supabase unreachable, retrying spooled writes in {delay:.0f}s: {e}")
+                if stop is not None:
+                    if stop.wait(delay):
+                        break
+                else:
+                    time.sleep(delay)
+                delay = min(delay * 2, SPOOL_BACKOFF_MAX)
+        return self.pending_count()
+
+    def start(self, client):
+        """Start the background writer (once)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._client = client
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='write-spool', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(1.0)
+            self._wake.clear()
+            if self._client is not None:
+                self.flush(self._client, timeout=float('inf'), stop=self._stop)
+
+    def wait(self, timeout=SPOOL_DRAIN_TIMEOUT):
+        """
+        Block until every spooled row is written or the timeout passes
+
+        Returns:
+            Number of rows still spooled
+        """
+        if self._thread is None or not self._thread.is_alive():
+            remaining = self.flush(self._client, timeout) if self._client is not None else self.pending_count()
+            self.run_callbacks()
+            return remaining
+        deadline = time.monotonic() + timeout
+        self._wake.set()
+        while time.monotonic() < deadline:
+            remaining = self.pending_count()
+            if not remaining:
+                break
+            time.sleep(0.1)
+        self.run_callbacks()
+        return self.pending_count()
+
+    def stop(self):
+        """Stop the background writer; spooled rows stay for the next run"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def requeue_dead(self):
+        """Move dead rows back into the spool with fresh attempts"""
+        with self._lock:
+            with self._db:
+                self._db.execute('begin')
+                count = self._db.execute('select count(*) from dead_rows').fetchone()[0]
+                self._db.execute('insert into spool (table_name, on_conflict, row, spooled_at, origin) '
+                                 'select table_name, on_conflict, row, spooled_at, origin from dead_rows order by id')
+                self._db.execute('delete from dead_rows')
+        return count
+
+_spool = None
+_spool_lock = threading.Lock()
+
+def get_write_spool():
+    """Shared WriteSpool, opened on first use"""
+    global _spool
+    with _spool_lock:
+        if _spool is None:
+            _spool = WriteSpool()
+    return _spool
+
+def set_write_spool(spool):
+    """
+    Replace the shared spool (for example with one in a temporary folder)
+
+    Returns:
+        The previous spool, or None if none was opened yet
+    """
+    global _spool
+    with _spool_lock:
+        previous = _spool
+        _spool = spool
+    return previous
+
+def spool_upsert(client, table_name, rows, on_conflict, batch_size=DEFAULT_BATCH_SIZE, on_written=None):
+    """
+    Drop-in for upsert_in_chunks that goes through the write spool
+
+    Args:
+        on_written: Optional callback taking the list of rows that were stored; with the
+                    spool on it runs from wait_for_spool, with it off before this returns
+
+    Returns:
+        Tuple of (accepted rows, failed rows); with the spool on every row is
+        accepted once it is durably spooled and failed is empty
+    """
+    if WRITE_SPOOL == 'off':
+        upserted, failed = upsert_in_chunks(client, table_name, rows, on_conflict=on_conflict, batch_size=batch_size)
+        if on_written is not None and upserted:
+            on_written(upserted)
+        return upserted, failed
+    get_write_spool().append(client, table_name, rows, on_conflict, on_written)
+    return rows, []
+
+def replay_spool(client, timeout=SPOOL_DRAIN_TIMEOUT):
+    """
+    Write rows left over from earlier runs before anything new is spooled
+
+    Returns:
+        Number of rows still spooled
+    """
+    if WRITE_SPOOL == 'off':
+        return 0
+    spool = get_write_spool()
+    pending = spool.pending_count()
+    if not pending:
+        return 0
+    print(f"↻ Replaying {pending} spooled write(s) from an earlier run")
+    spool._client = client
+    remaining = spool.flush(client, timeout)
+    print(f"✓ Replayed {pending - remaining} spooled write(s), {remaining} still spooled")
+    return remaining
+
+def wait_for_spool(timeout=SPOOL_DRAIN_TIMEOUT):
+    """
+    Wait until spooled writes reached Supabase (before reading them back),
+    then run the on_written callbacks of the rows that were stored
+
+    Raises:
+        RuntimeError: rows are still spooled after the timeout; they are replayed next run
+    """
+    if WRITE_SPOOL == 'off' or _spool is None:
+        return
+    remaining = _spool.wait(timeout)
+    if remaining:
+        raise RuntimeError(f"{remaining} write(s) still spooled after {timeout:.0f}s, they are replayed next run")
+
+def print_spool_summary():
+    """Print the rows the spool wrote and gave up on in this run (nothing if it was not used)"""
+    if WRITE_SPOOL == 'off' or _spool is None:
+        return
+    print(f"Write spool: {_spool.written_count} row(s) written, {_spool.dead_count} given up, "
+          f"{_spool.pending_count()} still spooled")
+    if _spool.dead_count:
+        print("  ✗ Rows given up are kept in dead_rows, retry them with `python main.py spool requeue-dead`")
+
+def wait_and_warn(timeout=SPOOL_DRAIN_TIMEOUT):
+    """
+    wait_for_spool for callers that carry on after a timeout: the rows still
+    spooled are reported and left for the next run
+
+    Returns:
+        True if every spooled row was written
+    """
+    try:
+        wait_for_spool(timeout)
+        return True
+    except RuntimeError as e:
+        print(f"⚠ {e}")
+        return False
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and flush the write-behind spool")
+    parser.add_argument('action', choices=['status', 'flush', 'requeue-dead'])
+    args = parser.parse_args(argv)
+
+    spool = get_write_spool()
+    if args.action == 'requeue-dead':
+        print(f"✓ Requeued {spool.requeue_dead()} dead row(s)")
+    elif args.action == 'flush':
+        from clients import get_supabase
+        replay_spool(get_supabase())
+    print(f"Spooled: {spool.pending_count()}, dead: {spool.dead_rows_count()} ({spool.path})")
+
+if __name__ == "__main__":
+    main()